@@ -8,7 +8,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'created_date', 'published_date', 'category']
+    list_display = ['title', 'author', 'created_date', 'published_date', 'category', 'views']
     list_filter = ['created_date', 'published_date', 'category']
     search_fields = ['title', 'content']
     date_hierarchy = 'created_date'
@@ -0,0 +1,225 @@
+"""
+JSON API только для чтения: посты, категории и одобренные комментарии
+
+    GET api/posts/?fields=id,title&limit=20&cursor=...&category=1
+    GET api/posts/?ids=3,1,2                 — несколько постов по id
+    GET api/posts/<id>/
+    GET api/posts/<id>/comments/?cursor=...
+    GET api/posts/export/?fields=...         — все посты потоком
+    GET api/categories/
+
+fields — какие поля вернуть (из базы читаются только они). Страницы
+листаются курсором: next из ответа передаётся как cursor и указывает
+на последнюю выданную запись, поэтому следующая страница — это запрос
+по индексу, а не OFFSET, и не сдвигается при добавлении новых постов.
+"""
+import base64
+import functools
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .middleware import public_view
+from .models import Category, Comment, Post
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 2000
+
+# Поле API -> поле запроса values()
+POST_FIELDS = {
+    'id': 'pk',
+    'title': 'title',
+    'excerpt': 'excerpt',
+    'content': 'content',
+    'content_html': 'content_html',
+    'author': 'author__username',
+    'category': 'category_id',
+    'image': 'image',
+    'published_date': 'published_date',
+    'updated_date': 'updated_date',
+    'views': 'views',
+}
+DEFAULT_POST_FIELDS = ['id', 'title', 'excerpt', 'author', 'category', 'published_date']
+
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'author': 'author',
+    'text': 'text',
+    'created_date': 'created_date',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _json(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def _fields(request, allowed, default):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise BadRequest(f"Неизвестные поля: {', '.join(unknown)}; доступны: {', '.join(allowed)}")
+    return fields
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest("limit должен быть числом")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _rows(queryset, fields, mapping, extra=()):
+    """values() только нужных полей (и полей сортировки extra) -> словари с именами API"""
+    lookups = list(dict.fromkeys([mapping[field] for field in fields] + list(extra)))
+    for values in queryset.values(*lookups):
+        yield values, {field: _output(field, values[mapping[field]]) for field in fields}
+
+
+def _output(field, value):
+    if field == 'image':
+        return default_storage.url(value) if value else None
+    return value
+
+
+def encode_cursor(date, pk):
+    raw = json.dumps([date.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date, pk = json.loads(raw)
+        date = parse_datetime(date)
+    except (ValueError, TypeError):
+        raise BadRequest("Неверный cursor")
+    if date is None or not isinstance(pk, int):
+        raise BadRequest("Неверный cursor")
+    return date, pk
+
+
+def _page(request, queryset, date_field, fields, mapping):
+    """Страница по курсору при сортировке (date_field, pk) по убыванию"""
+    limit = _limit(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{date_field}__lt': date}) | Q(**{date_field: date, 'pk__lt': pk}))
+    queryset = queryset.order_by(f'-{date_field}', '-pk')[:limit + 1]
+    rows = list(_rows(queryset, fields, mapping, extra=(date_field, 'pk')))
+    next_cursor = None
+    if len(rows) > limit:
+        values, _ = rows[limit - 1]
+        next_cursor = encode_cursor(values[date_field], values['pk'])
+        rows = rows[:limit]
+    return _json({'results': [row for _, row in rows], 'next': next_cursor})
+
+
+def _published_posts():
+    return Post.objects.filter(published_date__lte=timezone.now())
+
+
+def _api_view(view):
+    """Ошибки запроса -> 400 с JSON; только публичные GET-представления"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _error("Только GET", status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exc:
+            return _error(str(exc))
+        except Http404:
+            return _error("Не найдено", status=404)
+    return public_view(wrapper)
+
+
+@_api_view
+def post_list(request):
+    fields = _fields(request, POST_FIELDS, DEFAULT_POST_FIELDS)
+    posts = _published_posts()
+
+    ids = request.GET.get('ids')
+    if ids is not None:
+        try:
+            ids = [int(pk) for pk in ids.split(',') if pk.strip()]
+        except ValueError:
+            raise BadRequest("ids — список чисел через запятую")
+        if len(ids) > MAX_LIMIT:
+            raise BadRequest(f"Не больше {MAX_LIMIT} ids за запрос")
+        # Один запрос на все id; ответ в порядке запрошенных id, отсутствующие пропускаются
+        found = {values['pk']: row for values, row in _rows(posts.filter(pk__in=ids), fields, POST_FIELDS, ('pk',))}
+        return _json({'results': [found[pk] for pk in dict.fromkeys(ids) if pk in found], 'next': None})
+
+    category = request.GET.get('category')
+    if category is not None:
+        try:
+            category = int(category)
+        except ValueError:
+            raise BadRequest("category должен быть числом")
+        posts = posts.filter(category_id=category)
+    return _page(request, posts, 'published_date', fields, POST_FIELDS)
+
+
+@_api_view
+def post_detail(request, pk):
+    fields = _fields(request, POST_FIELDS, POST_FIELDS)
+    for _, row in _rows(_published_posts().filter(pk=pk), fields, POST_FIELDS):
+        return _json(row)
+    raise Http404
+
+
+@_api_view
+def post_comments(request, pk):
+    if not _published_posts().filter(pk=pk).exists():
+        raise Http404
+    fields = _fields(request, COMMENT_FIELDS, COMMENT_FIELDS)
+    comments = Comment.objects.filter(post_id=pk, approved=True)
+    return _page(request, comments, 'created_date', fields, COMMENT_FIELDS)
+
+
+@_api_view
+def category_list(request):
+    categories = Category.objects.order_by('name').values('id', 'name', 'description')
+    return _json({'results': list(categories)})
+
+
+def _export_rows(queryset, fields):
+    """JSON-массив по частям: строки читаются из базы порциями через iterator()"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lookups = list(dict.fromkeys(POST_FIELDS[field] for field in fields))
+    yield '['
+    first = True
+    for values in queryset.values(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = {field: _output(field, values[POST_FIELDS[field]]) for field in fields}
+        yield ('' if first else ',') + encoder.encode(row)
+        first = False
+    yield ']'
+
+
+@_api_view
+def post_export(request):
+    """Все опубликованные посты одним JSON-массивом; память и задержка не зависят от числа постов"""
+    fields = _fields(request, POST_FIELDS, DEFAULT_POST_FIELDS)
+    posts = _published_posts().order_by('pk')
+    response = StreamingHttpResponse(_export_rows(posts, fields), content_type='application/json; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="posts.json"'
+    return response
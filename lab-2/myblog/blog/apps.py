@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        from . import autocomplete
+        autocomplete.connect_signals()
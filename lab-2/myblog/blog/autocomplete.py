@@ -0,0 +1,214 @@
+"""
+Подсказки при наборе: префиксный индекс заголовков постов и названий категорий
+
+Индекс хранится в памяти процесса: отсортированный список слов и для
+каждого слова массив номеров записей, где оно встречается. Префикс
+ищется двоичным поиском по словам, поэтому ответ не зависит от числа
+записей, а только от числа выдаваемых подсказок. Индекс строится при
+первом обращении и дальше обновляется сигналами сохранения и удаления
+Post и Category. Пост с датой публикации в будущем попадёт в подсказки
+при следующем построении индекса (после перезапуска процесса).
+"""
+import array
+import bisect
+import itertools
+import threading
+
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import Category, Post
+
+MAX_RESULTS = 10
+# Число записей под префиксом оценивается по стольким первым словам
+ESTIMATE_WORDS = 64
+# Записи кандидатов проверяются порциями такого размера
+SCAN_BATCH = 256
+# Слово запроса с не большим числом записей проверяется по множеству своих
+# записей (строится на C быстрее), а не поиском начала слова в подписи
+MEMBERS_LIMIT = 8192
+
+POST = 'post'
+CATEGORY = 'category'
+
+
+def normalize(text):
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+class PrefixIndex:
+    """
+    Поиск записей (вид, id, подпись) по началам слов подписи
+
+    Запрос 'рец пас' находит 'Простой рецепт пасты': каждое слово запроса
+    должно быть началом какого-нибудь слова подписи. Методы add, remove
+    и search потокобезопасны.
+    """
+
+    def __init__(self):
+        self._words = []       # отсортированные различные слова
+        self._postings = {}    # слово -> array номеров записей
+        self._labels = []      # номер записи -> подпись (None — запись удалена)
+        self._keys = []        # номер записи -> ' ' + нормализованная подпись
+        self._refs = []        # номер записи -> (вид, id)
+        self._entries = {}     # (вид, id) -> номер записи
+        self._free = []        # номера удалённых записей для повторного использования
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, kind, pk, label):
+        """Добавить запись или заменить подпись существующей"""
+        with self._lock:
+            self._remove((kind, pk))
+            key = ' ' + normalize(label)
+            if self._free:
+                entry = self._free.pop()
+                self._labels[entry] = label
+                self._keys[entry] = key
+                self._refs[entry] = (kind, pk)
+            else:
+                entry = len(self._labels)
+                self._labels.append(label)
+                self._keys.append(key)
+                self._refs.append((kind, pk))
+            self._entries[kind, pk] = entry
+            for word in set(key.split()):
+                postings = self._postings.get(word)
+                if postings is None:
+                    bisect.insort(self._words, word)
+                    postings = self._postings[word] = array.array('i')
+                postings.append(entry)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._remove((kind, pk))
+
+    def _remove(self, ref):
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return
+        for word in set(self._keys[entry].split()):
+            postings = self._postings[word]
+            postings.remove(entry)
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+        self._labels[entry] = None
+        self._keys[entry] = None
+        self._refs[entry] = None
+        self._free.append(entry)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Не больше limit записей [(вид, id, подпись)], подходящих под запрос"""
+        tokens = set(normalize(query).split())
+        if not tokens or limit <= 0:
+            return []
+        with self._lock:
+            ranges = {}
+            for token in tokens:
+                lo, hi = self._word_range(token)
+                if lo == hi:
+                    return []  # под слово запроса не подходит ни одно слово
+                ranges[token] = lo, hi
+            # Кандидаты берутся у слова запроса с наименьшим числом записей;
+            # остальные слова проверяются по множеству своих записей, а частые —
+            # поиском начала слова в подписи кандидата, без построения множеств
+            if len(ranges) == 1:
+                return self._collect(*ranges[tokens.pop()], [], [], limit)
+            estimates = {token: self._estimate(*ranges[token]) for token in ranges}
+            best = min(estimates, key=estimates.get)
+            members = [self._members(*ranges[token]) for token in ranges
+                       if token != best and estimates[token] <= MEMBERS_LIMIT]
+            checked = [' ' + token for token in ranges if token != best and estimates[token] > MEMBERS_LIMIT]
+            return self._collect(*ranges[best], members, checked, limit)
+
+    def _members(self, lo, hi):
+        return set(itertools.chain.from_iterable(self._postings[self._words[i]] for i in range(lo, hi)))
+
+    def _collect(self, lo, hi, members, checked, limit):
+        """
+        Записи слов [lo, hi), входящие во все множества members и с подписями,
+        содержащими все начала слов checked, — в порядке слов
+        """
+        keys = self._keys
+        results = []
+        found = set()  # запись может встретиться у нескольких слов диапазона
+        for i in range(lo, hi):
+            postings = self._postings[self._words[i]]
+            for start in range(0, len(postings), SCAN_BATCH):
+                batch = postings[start:start + SCAN_BATCH]
+                for entries in members:
+                    batch = [entry for entry in batch if entry in entries]
+                for prefix in checked:
+                    batch = [entry for entry in batch if prefix in keys[entry]]
+                for entry in batch:
+                    if entry not in found:
+                        found.add(entry)
+                        results.append((*self._refs[entry], self._labels[entry]))
+                        if len(results) == limit:
+                            return results
+        return results
+
+    def _estimate(self, lo, hi):
+        """Примерное число записей слов [lo, hi): по первым ESTIMATE_WORDS словам, время не зависит от hi - lo"""
+        sample = min(hi - lo, ESTIMATE_WORDS)
+        return sum(len(self._postings[self._words[i]]) for i in range(lo, lo + sample)) * (hi - lo) / sample
+
+    def _word_range(self, prefix):
+        """Границы [lo, hi) слов, начинающихся с prefix, в отсортированном списке"""
+        lo = bisect.bisect_left(self._words, prefix)
+        return lo, bisect.bisect_left(self._words, prefix + '\U0010ffff', lo)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Индекс процесса; при первом обращении строится по базе"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = PrefixIndex()
+                for pk, name in Category.objects.values_list('pk', 'name').iterator():
+                    index.add(CATEGORY, pk, name)
+                posts = Post.objects.filter(published_date__lte=timezone.now())
+                for pk, title in posts.values_list('pk', 'title').iterator():
+                    index.add(POST, pk, title)
+                _index = index
+    return _index
+
+
+def _post_saved(sender, instance, **kwargs):
+    if _index is None:
+        return  # индекс ещё не построен — изменение попадёт в него при построении
+    if instance.published_date is not None and instance.published_date <= timezone.now():
+        _index.add(POST, instance.pk, instance.title)
+    else:
+        _index.remove(POST, instance.pk)
+
+
+def _post_deleted(sender, instance, **kwargs):
+    if _index is not None:
+        _index.remove(POST, instance.pk)
+
+
+def _category_saved(sender, instance, **kwargs):
+    if _index is not None:
+        _index.add(CATEGORY, instance.pk, instance.name)
+
+
+def _category_deleted(sender, instance, **kwargs):
+    if _index is not None:
+        _index.remove(CATEGORY, instance.pk)
+
+
+def connect_signals():
+    """Вызывается из BlogConfig.ready()"""
+    post_save.connect(_post_saved, sender=Post, dispatch_uid='blog_autocomplete_post_saved')
+    post_delete.connect(_post_deleted, sender=Post, dispatch_uid='blog_autocomplete_post_deleted')
+    post_save.connect(_category_saved, sender=Category, dispatch_uid='blog_autocomplete_category_saved')
+    post_delete.connect(_category_deleted, sender=Category, dispatch_uid='blog_autocomplete_category_deleted')
@@ -0,0 +1,111 @@
+"""
+Счётчики просмотров постов с буфером в памяти процесса
+
+Просмотр не пишет в базу сразу: приращения копятся в словаре и раз
+в FLUSH_INTERVAL секунд (или при MAX_PENDING постах в буфере)
+записываются одним UPDATE с CASE по id. Несброшенные приращения
+процесса теряются при его аварийном завершении — для счётчика
+просмотров это допустимо.
+
+Популярность — просмотры с экспоненциальным затуханием (период
+полураспада HALF_LIFE) по схеме forward decay: вес просмотра в момент t
+равен exp(λ·(t − LANDMARK)) и со временем не меняется, поэтому старые
+значения не нужно пересчитывать, а порядок по сумме весов совпадает
+с порядком по затухшей популярности. Суммы хранятся логарифмом —
+иначе exp(λ·t) переполнится через несколько лет.
+"""
+import atexit
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, PositiveIntegerField, Value, When
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Post
+
+FLUSH_INTERVAL = 10.0
+MAX_PENDING = 1000
+
+HALF_LIFE = 3 * 24 * 3600  # сек
+DECAY_RATE = math.log(2) / HALF_LIFE
+LANDMARK = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+POPULAR_CACHE_KEY = 'blog:popular:{}'
+POPULAR_CACHE_TIMEOUT = 60
+
+
+def log_weight(count, moment=None):
+    """Логарифм суммарного веса count просмотров в момент moment"""
+    moment = moment or timezone.now()
+    return math.log(count) + DECAY_RATE * (moment - LANDMARK).total_seconds()
+
+
+def _log_add(field, value):
+    """log(exp(field) + exp(value)) в SQL без переполнения"""
+    high = Greatest(F(field), Value(value))
+    low = Least(F(field), Value(value))
+    return Case(
+        When(**{f'{field}__isnull': True}, then=Value(value)),
+        default=high + Ln(Value(1.0) + Exp(low - high)),
+        output_field=FloatField(),
+    )
+
+
+class ViewCounter:
+    """Буфер приращений просмотров; add() потокобезопасен"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, post_id, count=1):
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + count
+            due = (len(self._pending) >= self.max_pending
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Записать накопленные просмотры одним UPDATE; возвращает число постов"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        now = timezone.now()
+        views = Case(*(When(pk=pk, then=F('views') + Value(count)) for pk, count in pending.items()),
+                     default=F('views'), output_field=PositiveIntegerField())
+        popularity = Case(*(When(pk=pk, then=_log_add('popularity', log_weight(count, now)))
+                            for pk, count in pending.items()),
+                          default=F('popularity'), output_field=FloatField())
+        Post.objects.filter(pk__in=pending).update(views=views, popularity=popularity)
+        return len(pending)
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
+
+
+def popular_posts(limit=5):
+    """
+    Самые популярные опубликованные посты: [(id, заголовок, просмотры)]
+
+    Рейтинг пересчитывается не чаще раза в POPULAR_CACHE_TIMEOUT секунд
+    и берётся из кеша; запрос идёт по индексу на popularity.
+    """
+    key = POPULAR_CACHE_KEY.format(limit)
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = list(Post.objects.filter(
+            published_date__lte=timezone.now(), popularity__isnull=False,
+        ).order_by('-popularity').values_list('pk', 'title', 'views')[:limit])
+        cache.set(key, ranking, POPULAR_CACHE_TIMEOUT)
+    return ranking
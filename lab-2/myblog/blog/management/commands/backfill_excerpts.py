@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заполнение анонсов и HTML текста у постов, сохранённых до их появления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Постов в одной порции')
+        parser.add_argument('--all', action='store_true', help='Пересчитать все посты, а не только без анонса')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.order_by('pk').only('pk', 'content')
+        if not options['all']:
+            posts = posts.filter(content_html='')
+
+        # Порции по возрастанию pk: в памяти не больше batch_size текстов,
+        # bulk_update не вызывает save() и не меняет updated_date
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.render_content()
+            Post.objects.bulk_update(batch, ['excerpt', 'content_html'], batch_size=batch_size)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'Обработано постов: {updated}')
+
+        self.stdout.write(self.style.SUCCESS(f'Анонсы заполнены у {updated} постов'))
@@ -0,0 +1,82 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from blog.autocomplete import POST, PrefixIndex
+
+SYLLABLES = ['ка', 'ро', 'ми', 'ле', 'то', 'на', 'пас', 'рец', 'сти', 'вер', 'дор', 'шу', 'гра', 'ло', 'бе']
+# Частые слова настоящих заголовков: встречаются в большой доле записей
+COMMON_WORDS = ['как', 'сделать', 'пост', 'в', 'блоге', 'на', 'для', 'и', 'рецепт', 'своими', 'руками']
+
+
+class Command(BaseCommand):
+    help = 'Замер памяти и скорости индекса подсказок на синтетических заголовках'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000, help='Число заголовков')
+        parser.add_argument('--queries', type=int, default=10_000, help='Число запросов для замера')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['count']
+        vocabulary = list({''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(50_000)})
+
+        uniform = [' '.join(rng.choices(vocabulary, k=rng.randint(3, 7))).capitalize() for _ in range(count)]
+        self.measure('Равномерный словарь', uniform, rng, options['queries'], memory=True)
+
+        # Заголовки вида 'Как сделать 12 пост в блоге': запросы из частых слов
+        # дают длинные списки записей у каждого слова запроса
+        skewed = []
+        for i in range(count):
+            words = rng.sample(COMMON_WORDS, rng.randint(2, 5)) + rng.choices(vocabulary, k=rng.randint(0, 2))
+            words.insert(rng.randint(0, len(words)), str(i))
+            skewed.append(' '.join(words).capitalize())
+        self.measure('Частые слова', skewed, rng, options['queries'])
+
+    def measure(self, title, titles, rng, query_count, memory=False):
+        self.stdout.write(f'{title}: заголовков {len(titles)}, различных слов: '
+                          f'{len({word for t in titles[:100_000] for word in t.lower().split()})} в первых 100 тыс.')
+
+        # Память индекса без самих строк заголовков: они уже есть у вызывающего кода
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        index = PrefixIndex()
+        for pk, label in enumerate(titles, 1):
+            index.add(POST, pk, label)
+        build_time = time.perf_counter() - start
+        if memory:
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(f'Построение: {build_time:.1f} сек, память индекса: {size / 2 ** 20:.0f} МБ '
+                              f'({size / len(titles):.0f} байт на заголовок)')
+        else:
+            self.stdout.write(f'Построение: {build_time:.1f} сек')
+
+        queries = []
+        for _ in range(query_count):
+            words = rng.choice(titles).split()
+            word = rng.choice(words).lower()
+            query = word[:rng.randint(1, len(word))]
+            if rng.random() < 0.3:
+                query = f'{rng.choice(words).lower()} {query}'
+            elif rng.random() < 0.05:
+                query = f'zzz {query}'  # слово, под которое ничего не подходит
+            queries.append(query)
+
+        timings = []
+        found = 0
+        for query in queries:
+            start = time.perf_counter()
+            found += len(index.search(query))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        self.stdout.write(f'Запросов: {len(queries)}, в среднем подсказок: {found / len(queries):.1f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Время ответа: среднее {mean * 1e6:.0f} мкс, медиана {timings[len(timings) // 2] * 1e6:.0f} мкс, '
+            f'99-й перцентиль {timings[int(len(timings) * 0.99)] * 1e6:.0f} мкс, '
+            f'максимум {timings[-1] * 1e6:.0f} мкс'))
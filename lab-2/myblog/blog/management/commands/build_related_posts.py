@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import build_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт похожих постов (TF-IDF по заголовку и тексту)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=5, help='Сколько похожих постов хранить для каждого')
+        parser.add_argument('--same-category', action='store_true', help='Искать похожие только в той же категории')
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать все посты, а не только изменённые (нужно после смены --top)')
+
+    def handle(self, *args, **options):
+        changed, recomputed = build_related_posts(options['top'], options['same_category'], options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Изменённых постов: {changed}, пересчитано списков похожих: {recomputed}'))
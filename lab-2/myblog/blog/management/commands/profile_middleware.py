@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+PROBE = 'blog.middleware.TimingProbeMiddleware'
+FAST_PATH = 'blog.middleware.AnonymousFastPathMiddleware'
+VIEW = 'представление'
+
+DEFAULT_URLS = ['/', '/category/1/', '/search/?q=пост', '/search/autocomplete/?q=пас']
+
+
+def _client(middleware):
+    """Клиент с пробами между всеми middleware; цепочка строится при первом запросе и дальше не меняется"""
+    probed = [PROBE]
+    for name in middleware:
+        probed += [name, PROBE]
+    client = Client(HTTP_HOST='localhost')
+    with override_settings(MIDDLEWARE=probed):
+        client.get('/')
+    return client
+
+
+def _account(totals, middleware, marks):
+    entered = len(marks) // 2
+    entries, exits = marks[:entered], marks[entered:][::-1]
+    for i in range(entered - 1):
+        totals[middleware[i]] += (entries[i + 1] - entries[i]) + (exits[i] - exits[i + 1])
+    # Самое внутреннее звено: представление или middleware, ответивший сам
+    inner = VIEW if entered == len(middleware) + 1 else middleware[entered - 1]
+    totals[inner] += exits[entered - 1] - entries[entered - 1]
+    totals['всего'] += exits[0] - entries[0]
+
+
+def measure(configurations, urls, requests):
+    """
+    Среднее время (сек) каждого middleware и представления на один анонимный запрос
+
+    configurations — {название: список middleware}. Запросы к разным
+    конфигурациям чередуются, чтобы фоновые колебания нагрузки
+    сказывались на всех одинаково.
+    """
+    clients = {title: _client(middleware) for title, middleware in configurations.items()}
+    totals = {title: defaultdict(float) for title in configurations}
+    for url in urls:
+        for client in clients.values():
+            client.get(url)  # прогрев: загрузка шаблонов, индекс подсказок
+    for _ in range(requests):
+        for url in urls:
+            for title, client in clients.items():
+                _account(totals[title], configurations[title], client.get(url).wsgi_request.timing_marks)
+    count = requests * len(urls)
+    return {title: {name: value / count for name, value in values.items()}
+            for title, values in totals.items()}
+
+
+class Command(BaseCommand):
+    help = 'Время каждого middleware на анонимных GET-запросах без короткого пути и с ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=DEFAULT_URLS)
+        parser.add_argument('--requests', type=int, default=200, help='Повторов каждого адреса')
+
+    def handle(self, *args, **options):
+        full = list(settings.MIDDLEWARE)
+        without_fast_path = [name for name in full if name != FAST_PATH]
+        results = measure({'before': without_fast_path, 'after': full}, options['urls'], options['requests'])
+        before, after = results['before'], results['after']
+
+        self.stdout.write(f"{'':58s} {'без':>8s} {'с коротким путём':>17s}")
+        for name in full + [VIEW]:
+            label = name.rsplit('.', 1)[-1]
+            if name == FAST_PATH:
+                label += ' (вместе с представлением)'
+            self.stdout.write(f"{label:58s} {before.get(name, 0) * 1e6:6.0f} мкс {after.get(name, 0) * 1e6:13.0f} мкс")
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Весь запрос':58s} {before['всего'] * 1e6:6.0f} мкс {after['всего'] * 1e6:13.0f} мкс"))
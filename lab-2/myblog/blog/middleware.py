@@ -0,0 +1,76 @@
+"""
+Короткий путь запроса для анонимных читателей
+
+Анонимный GET к представлению, помеченному @public_view, обслуживается
+сразу из AnonymousFastPathMiddleware: без сессий, CSRF, аутентификации
+и сообщений — у читателя без cookie сессии им нечего делать. Запросы с
+cookie сессии, POST и непомеченные представления идут обычным путём.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+
+def public_view(view):
+    """
+    Пометить представление как публичное: для анонимного GET его можно
+    вызвать в обход сессий, CSRF и аутентификации
+
+    Такое представление не должно обращаться к request.session, выводить
+    {% csrf_token %} и зависеть от пользователя (request.user — всегда
+    AnonymousUser).
+    """
+    view.public = True
+    return view
+
+
+class AnonymousFastPathMiddleware:
+    """Ставится после CommonMiddleware и до SessionMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return self.get_response(request)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+        if not getattr(match.func, 'public', False):
+            return self.get_response(request)
+
+        request.resolver_match = match
+        request.user = AnonymousUser()
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        # Ответ зависит от отсутствия cookie сессии; заголовок XFrameOptionsMiddleware — как на обычном пути
+        patch_vary_headers(response, ('Cookie',))
+        if not getattr(response, 'xframe_options_exempt', False):
+            response.headers.setdefault('X-Frame-Options', getattr(settings, 'X_FRAME_OPTIONS', 'DENY').upper())
+        return response
+
+
+class TimingProbeMiddleware:
+    """
+    Отметки времени входа и выхода запроса (для команды profile_middleware)
+
+    Пробы ставятся между всеми middleware; разница соседних отметок —
+    время, проведённое в middleware между ними. Отметки копятся в
+    request.timing_marks: сначала входы сверху вниз, затем выходы снизу
+    вверх.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        marks = request.__dict__.setdefault('timing_marks', [])
+        marks.append(time.perf_counter())
+        response = self.get_response(request)
+        marks.append(time.perf_counter())
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 10:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='related_computed_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Похожие посты пересчитаны'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_posts', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post', verbose_name='Похожий пост')),
+            ],
+            options={
+                'verbose_name': 'Похожий пост',
+                'verbose_name_plural': 'Похожие посты',
+                'ordering': ['post', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('post', 'rank'), name='blog_relatedpost_post_rank')],
+            },
+        ),
+    ]
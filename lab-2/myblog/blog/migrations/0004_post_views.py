@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_related_posts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры'),
+        ),
+    ]
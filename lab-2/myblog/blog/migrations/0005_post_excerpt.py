@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 10:29
+
+from django.db import migrations, models
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# Копия логики Post.render_content на момент миграции: миграция не должна
+# зависеть от текущего кода моделей
+EXCERPT_WORDS = 30
+BATCH_SIZE = 500
+
+
+def render_content(content):
+    return Truncator(content).words(EXCERPT_WORDS, truncate=' …'), linebreaks(content, autoescape=True)
+
+
+def backfill(apps, schema_editor):
+    """Заполнить анонсы и HTML у существующих постов порциями по pk"""
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.order_by('pk').only('pk', 'content')
+    last_pk = 0
+    while batch := list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        for post in batch:
+            post.excerpt, post.content_html = render_content(post.content)
+        Post.objects.bulk_update(batch, ['excerpt', 'content_html'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_views'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Содержание (HTML)'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Анонс'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
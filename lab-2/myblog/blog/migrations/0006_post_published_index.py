@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['published_date', 'id'], name='blog_post_published_idx'),
+        ),
+    ]
@@ -1,6 +1,16 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 30
+
+
+def render_content(content):
+    """Текст поста -> (анонс, HTML)"""
+    return Truncator(content).words(EXCERPT_WORDS, truncate=' …'), linebreaks(content, autoescape=True)
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name='Название категории')
@@ -16,15 +26,36 @@ class Category(models.Model):
 class Post(models.Model):
     title = models.CharField(max_length=200, verbose_name='Заголовок')
     content = models.TextField(verbose_name='Содержание')
+    # Заполняются из content при сохранении: спискам не нужно грузить и резать весь текст
+    excerpt = models.TextField(blank=True, editable=False, verbose_name='Анонс')
+    content_html = models.TextField(blank=True, editable=False, verbose_name='Содержание (HTML)')
     created_date = models.DateTimeField(default=timezone.now, verbose_name='Дата создания')
     published_date = models.DateTimeField(blank=True, null=True, verbose_name='Дата публикации')
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Автор')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, verbose_name='Категория')
     image = models.ImageField(upload_to='post_images/', blank=True, null=True, verbose_name='Изображение')
+    updated_date = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    related_computed_date = models.DateTimeField(blank=True, null=True, editable=False,
+                                                 verbose_name='Похожие посты пересчитаны')
+    views = models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры')
+    # Логарифм просмотров с затуханием (см. blog/counters.py); NULL — просмотров не было
+    popularity = models.FloatField(blank=True, null=True, editable=False, db_index=True,
+                                   verbose_name='Популярность')
     
     def publish(self):
         self.published_date = timezone.now()
         self.save()
+
+    def render_content(self):
+        """Заполнить excerpt и content_html по content"""
+        self.excerpt, self.content_html = render_content(self.content)
+
+    def save(self, *args, **kwargs):
+        self.render_content()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt', 'content_html'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.title
@@ -32,6 +63,10 @@ class Post(models.Model):
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # Списки постов и страницы API по курсору: сортировка (published_date, id)
+            models.Index(fields=['published_date', 'id'], name='blog_post_published_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -52,3 +87,22 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created_date']
+
+
+class RelatedPost(models.Model):
+    """Предрассчитанный похожий пост (см. blog/related.py и команду build_related_posts)"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_posts')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+', verbose_name='Похожий пост')
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Сходство')
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.2f})'
+
+    class Meta:
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank'),
+        ]
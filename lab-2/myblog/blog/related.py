@@ -0,0 +1,151 @@
+"""
+Похожие посты: TF-IDF по заголовку и тексту, k ближайших соседей по косинусу
+
+Векторы постов — разреженные словари {термин: вес}, нормированные
+по длине. Сходство поста со всеми остальными считается через обратный
+индекс (термин -> [(пост, вес)]): проходятся только посты с общими
+терминами — то же умножение разреженной матрицы документов на вектор,
+что X @ x в scipy.sparse, но без зависимости от SciPy.
+
+Результат хранится в таблице RelatedPost; пересчитываются только
+изменённые посты и те, чьи списки соседей они могут затронуть.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import Post, RelatedPost
+
+TOKEN_RE = re.compile(r'\w{3,}')
+TITLE_WEIGHT = 3  # слово заголовка весит как три слова текста
+BATCH_SIZE = 500
+
+
+def tokenize(title, content):
+    terms = Counter(TOKEN_RE.findall(content.lower()))
+    for term in TOKEN_RE.findall(title.lower()):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+
+class TfidfIndex:
+    """
+    TF-IDF векторы набора постов и обратный индекс для поиска соседей
+
+    documents — {id: (заголовок, текст, id категории)}. Термины, которые
+    встречаются больше чем в max_df доле постов, не учитываются: они
+    почти не различают посты, а их списки в индексе самые длинные.
+    """
+
+    def __init__(self, documents, max_df=0.5):
+        counts = {pk: tokenize(title, content) for pk, (title, content, _) in documents.items()}
+        total = len(counts)
+        df = Counter(term for terms in counts.values() for term in terms)
+        limit = max(2, max_df * total)
+        idf = {term: math.log((1 + total) / (1 + n)) + 1 for term, n in df.items() if n <= limit}
+
+        self.categories = {pk: category for pk, (_, _, category) in documents.items()}
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for pk, terms in counts.items():
+            vector = {term: (1 + math.log(tf)) * idf[term] for term, tf in terms.items() if term in idf}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            vector = {term: weight / norm for term, weight in vector.items()}
+            self.vectors[pk] = vector
+            for term, weight in vector.items():
+                self.postings[term].append((pk, weight))
+
+    def similarities(self, pk, same_category=False):
+        """Косинусное сходство поста pk со всеми постами, у которых есть общие термины"""
+        scores = defaultdict(float)
+        for term, weight in self.vectors[pk].items():
+            for other, other_weight in self.postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        if same_category:
+            category = self.categories[pk]
+            scores = {other: score for other, score in scores.items() if self.categories[other] == category}
+        return scores
+
+    def neighbours(self, pk, top, same_category=False):
+        """top самых похожих постов: [(id, сходство)] по убыванию сходства"""
+        scores = self.similarities(pk, same_category)
+        return heapq.nlargest(top, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _stale_posts(index, top, same_category):
+    """Посты, чьи списки соседей могли устареть с прошлого расчёта"""
+    published = set(index.vectors)
+    changed = published & set(Post.objects.filter(
+        Q(related_computed_date__isnull=True) | Q(updated_date__gt=F('related_computed_date'))
+    ).values_list('pk', flat=True))
+    stale = set(changed)
+
+    # Сосед изменился, снят с публикации или удалён (тогда в местах пропуск)
+    stale.update(RelatedPost.objects.filter(
+        Q(related__in=changed) | Q(related__published_date__isnull=True) |
+        Q(related__published_date__gt=timezone.now())
+    ).values_list('post_id', flat=True))
+    stale.update(Post.objects.annotate(
+        stored=Count('related_posts'), last_rank=Max('related_posts__rank'),
+    ).filter(last_rank__gte=F('stored')).values_list('pk', flat=True))
+
+    # Изменённый пост мог оказаться ближе нынешних соседей другого поста:
+    # сходство симметрично, поэтому хватает сходств самих изменённых постов
+    bounds = {post_id: (stored, lowest) for post_id, stored, lowest in RelatedPost.objects.values('post_id').annotate(
+        stored=Count('id'), lowest=Min('score')).values_list('post_id', 'stored', 'lowest')}
+    for pk in changed:
+        for other, score in index.similarities(pk, same_category).items():
+            stored, lowest = bounds.get(other, (0, 0.0))
+            if stored < top or score > lowest:
+                stale.add(other)
+    return changed, stale & published
+
+
+def build_related_posts(top=5, same_category=False, full=False):
+    """
+    Пересчитать похожие посты для опубликованных постов
+
+    full=True — пересчитать все посты (нужно после смены top или
+    same_category и чтобы учесть дрейф IDF). Возвращает
+    (изменённых постов, пересчитанных постов).
+    """
+    started = timezone.now()
+    documents = {
+        pk: (title, content, category_id)
+        for pk, title, content, category_id in Post.objects.filter(published_date__lte=started).values_list(
+            'pk', 'title', 'content', 'category_id').iterator()
+    }
+    index = TfidfIndex(documents)
+    if full:
+        changed = stale = set(documents)
+    else:
+        changed, stale = _stale_posts(index, top, same_category)
+
+    rows = [
+        RelatedPost(post_id=pk, related_id=other, rank=rank, score=score)
+        for pk in stale
+        for rank, (other, score) in enumerate(index.neighbours(pk, top, same_category))
+    ]
+    with transaction.atomic():
+        if full:
+            RelatedPost.objects.all().delete()
+        else:
+            for chunk in _chunks(stale):
+                RelatedPost.objects.filter(post__in=chunk).delete()
+        RelatedPost.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        # Отметка — время начала расчёта: правки во время расчёта попадут в следующий
+        for chunk in _chunks(stale):
+            Post.objects.filter(pk__in=chunk).update(related_computed_date=started)
+    return len(changed), len(stale)
@@ -1,3 +1,134 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .counters import view_counter
+from .models import Category, Comment, Post, RelatedPost
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='secret')
+        cls.category = Category.objects.create(name='Кулинария')
+        now = timezone.now()
+        # Два поста с одинаковой датой: курсор должен различать их по id
+        cls.posts = [
+            Post.objects.create(title=f'Пост {i}', content=f'Текст поста {i}', author=cls.author,
+                                category=cls.category if i % 2 else None,
+                                published_date=now - timedelta(hours=i // 2 * 2))
+            for i in range(5)
+        ]
+        cls.draft = Post.objects.create(title='Черновик', content='Ещё не готов', author=cls.author,
+                                        published_date=now + timedelta(days=1))
+        for i in range(3):
+            Comment.objects.create(post=cls.posts[0], author=f'Читатель {i}', text='Комментарий',
+                                   approved=i != 1)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_post_list_default_fields(self):
+        data = self.get('api_post_list').json()
+        self.assertEqual(set(data['results'][0]),
+                         {'id', 'title', 'excerpt', 'author', 'category', 'published_date'})
+        excerpts = {row['id']: row['excerpt'] for row in data['results']}
+        self.assertEqual(excerpts[self.posts[0].pk], 'Текст поста 0')
+        self.assertNotIn(self.draft.pk, [row['id'] for row in data['results']])
+
+    def test_fields(self):
+        data = self.get('api_post_list', fields='id,title,views').json()
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'title', 'views'}] * 5)
+
+        response = self.get('api_post_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_cursor_round_trip(self):
+        expected = list(Post.objects.filter(published_date__lte=timezone.now())
+                        .order_by('-published_date', '-pk').values_list('pk', flat=True))
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.get('api_post_list', **params).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_bad_cursor(self):
+        for cursor in ('не-курсор', 'W10', 'WyJ4IiwgMV0'):
+            response = self.get('api_post_list', cursor=cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'error': 'Неверный cursor'})
+
+    def test_bad_numbers(self):
+        for params in ({'limit': 'x'}, {'category': 'x'}, {'category': '²'}, {'ids': '1,²'}):
+            self.assertEqual(self.get('api_post_list', **params).status_code, 400, params)
+
+    def test_limit_clamped(self):
+        self.assertEqual(len(self.get('api_post_list', limit=0).json()['results']), 1)
+
+    def test_category_filter(self):
+        data = self.get('api_post_list', category=self.category.pk, fields='id,category').json()
+        self.assertEqual({row['category'] for row in data['results']}, {self.category.pk})
+        self.assertEqual(len(data['results']), 2)
+
+    def test_ids(self):
+        ids = [self.posts[3].pk, self.draft.pk, self.posts[1].pk, 999999, self.posts[3].pk]
+        data = self.get('api_post_list', ids=','.join(map(str, ids)), fields='id').json()
+        # Порядок запроса, без повторов, неопубликованные и несуществующие пропущены
+        self.assertEqual([row['id'] for row in data['results']], [self.posts[3].pk, self.posts[1].pk])
+        self.assertIsNone(data['next'])
+
+        response = self.get('api_post_list', ids=','.join(str(i) for i in range(1, 102)))
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail(self):
+        data = self.get('api_post_detail', self.posts[0].pk).json()
+        self.assertEqual(data['content_html'], '<p>Текст поста 0</p>')
+        self.assertEqual(self.get('api_post_detail', self.draft.pk).status_code, 404)
+
+    def test_post_comments(self):
+        data = self.get('api_post_comments', self.posts[0].pk).json()
+        self.assertEqual(sorted(row['author'] for row in data['results']), ['Читатель 0', 'Читатель 2'])
+        self.assertEqual(self.get('api_post_comments', self.draft.pk).status_code, 404)
+
+    def test_export(self):
+        response = self.get('api_post_export', fields='id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['id'] for row in rows], sorted(post.pk for post in self.posts))
+        self.assertEqual(set(rows[0]), {'id', 'title'})
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api_post_list'))
+        self.assertEqual(response.status_code, 405)
+
+
+class RelatedPostsTests(TestCase):
+    def test_unpublished_neighbours_hidden(self):
+        author = User.objects.create_user('author')
+        category = Category.objects.create(name='Кулинария')
+        now = timezone.now()
+        post, shown, hidden = [Post.objects.create(title=f'Пост {i}', content='Текст', author=author,
+                                                   category=category, published_date=now - timedelta(days=1))
+                               for i in range(3)]
+        RelatedPost.objects.create(post=post, related=shown, rank=1, score=0.9)
+        RelatedPost.objects.create(post=post, related=hidden, rank=2, score=0.8)
+        hidden.published_date = now + timedelta(days=1)
+        hidden.save()
 
-# Create your tests here.
+        # Просмотр копится в счётчике — сбросить его в тестовую базу, а не при выходе
+        self.addCleanup(view_counter.flush)
+        response = self.client.get(reverse('post_detail', args=[post.pk]))
+        self.assertEqual([item.related_id for item in response.context['related_posts']], [shown.pk])
@@ -1,9 +1,15 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.post_list, name='post_list'),
     path('post/<int:pk>/', views.post_detail, name='post_detail'),
     path('category/<int:category_id>/', views.category_posts, name='category_posts'),
     path('search/', views.post_search, name='post_search'),  # ← обязательно!
+    path('search/autocomplete/', views.autocomplete, name='autocomplete'),
+    path('api/posts/', api.post_list, name='api_post_list'),
+    path('api/posts/export/', api.post_export, name='api_post_export'),
+    path('api/posts/<int:pk>/', api.post_detail, name='api_post_detail'),
+    path('api/posts/<int:pk>/comments/', api.post_comments, name='api_post_comments'),
+    path('api/categories/', api.category_list, name='api_category_list'),
 ]
\ No newline at end of file
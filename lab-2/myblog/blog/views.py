@@ -1,8 +1,13 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Q
 from django import forms
 from django.utils import timezone
+from .autocomplete import CATEGORY, MAX_RESULTS, get_index
+from .counters import popular_posts, view_counter
+from .middleware import public_view
 from .models import Post, Category, Comment
 
 class CommentForm(forms.ModelForm):
@@ -14,8 +19,12 @@ class CommentForm(forms.ModelForm):
             'text': forms.Textarea(attrs={'placeholder': 'Ваш комментарий...', 'rows': 4}),
         }
 
+@public_view
 def post_list(request):
-    posts = Post.objects.filter(published_date__lte=timezone.now()).order_by('-published_date')
+    # В списках нужен только анонс: полный текст и его HTML не загружаются
+    posts = Post.objects.filter(
+        published_date__lte=timezone.now()
+    ).defer('content', 'content_html').order_by('-published_date')
     paginator = Paginator(posts, 5)
     page = request.GET.get('page')
     try:
@@ -24,11 +33,17 @@ def post_list(request):
         posts = paginator.page(1)
     except EmptyPage:
         posts = paginator.page(paginator.num_pages)
-    return render(request, 'blog/post_list.html', {'posts': posts})
+    return render(request, 'blog/post_list.html', {'posts': posts, 'popular_posts': popular_posts()})
 
 def post_detail(request, pk):
     post = get_object_or_404(Post, pk=pk)
+    if request.method == 'GET':
+        view_counter.add(post.pk)
     comments = post.comments.all()
+    # Похожие посты рассчитаны заранее (команда build_related_posts): один запрос по индексу (post, rank);
+    # снятые с публикации после расчёта отбрасываются
+    related_posts = post.related_posts.filter(related__published_date__lte=timezone.now()) \
+        .select_related('related').only('post', 'rank', 'related__title')
     new_comment = None
 
     if request.method == 'POST':
@@ -44,15 +59,17 @@ def post_detail(request, pk):
     return render(request, 'blog/post_detail.html', {
         'post': post,
         'comments': comments,
-        'comment_form': comment_form
+        'comment_form': comment_form,
+        'related_posts': related_posts,
     })
 
+@public_view
 def category_posts(request, category_id):
     category = get_object_or_404(Category, id=category_id)
     posts = Post.objects.filter(
         category=category,
         published_date__lte=timezone.now()
-    ).order_by('-published_date')
+    ).defer('content', 'content_html').order_by('-published_date')
     paginator = Paginator(posts, 5)
     page = request.GET.get('page')
     try:
@@ -61,15 +78,16 @@ def category_posts(request, category_id):
         posts = paginator.page(1)
     except EmptyPage:
         posts = paginator.page(paginator.num_pages)
-    return render(request, 'blog/category_posts.html', {'category': category, 'posts': posts})
+    return render(request, 'blog/category_post.html', {'category': category, 'posts': posts})
 
+@public_view
 def post_search(request):
     query = request.GET.get('q')
     posts = Post.objects.none()
     if query:
         posts = Post.objects.filter(
             Q(title__icontains=query) | Q(content__icontains=query)
-        ).order_by('-created_date') 
+        ).defer('content', 'content_html').order_by('-created_date')
 
     paginator = Paginator(posts, 5)
     page = request.GET.get('page')
@@ -80,4 +98,20 @@ def post_search(request):
     except EmptyPage:
         posts = paginator.page(paginator.num_pages)
 
-    return render(request, 'blog/post_search.html', {'posts': posts, 'query': query})
\ No newline at end of file
+    return render(request, 'blog/post_search.html', {'posts': posts, 'query': query})
+
+@public_view
+def autocomplete(request):
+    """Подсказки для поля поиска: JSON с постами и категориями, чьи слова начинаются с q"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', MAX_RESULTS)), MAX_RESULTS))
+    except ValueError:
+        limit = MAX_RESULTS
+    results = []
+    for kind, pk, label in get_index().search(request.GET.get('q', ''), limit):
+        if kind == CATEGORY:
+            url = reverse('category_posts', kwargs={'category_id': pk})
+        else:
+            url = reverse('post_detail', kwargs={'pk': pk})
+        results.append({'type': kind, 'id': pk, 'label': label, 'url': url})
+    return JsonResponse({'results': results})
@@ -40,16 +40,22 @@ INSTALLED_APPS = [
     'blog'
 ]
 
+# CommonMiddleware (проверка Host, APPEND_SLASH) стоит выше короткого пути для анонимов:
+# всё, что ниже него, анонимный GET к публичному представлению не проходит
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'blog.middleware.AnonymousFastPathMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сессия читается из кеша, база — только при промахе
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 ROOT_URLCONF = 'myblog.urls'
 
 TEMPLATES = [
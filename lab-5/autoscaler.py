@@ -0,0 +1,256 @@
+import collections
+import concurrent.futures
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger('autoscaler')
+
+
+def _cpu_times():
+    """(занято, всего) тиков CPU по всей системе; None, если /proc/stat недоступен"""
+    try:
+        with open('/proc/stat') as stat:
+            values = [int(v) for v in stat.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return sum(values) - idle, sum(values)
+
+
+class CpuSampler:
+    """Загрузка CPU (0..1) между соседними вызовами sample()"""
+
+    def __init__(self):
+        self._last = _cpu_times()
+
+    def sample(self):
+        current = _cpu_times()
+        if current is None or self._last is None:
+            # Запасной вариант: средняя загрузка за минуту на ядро
+            try:
+                return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+            except OSError:
+                return 0.0
+        busy = current[0] - self._last[0]
+        total = current[1] - self._last[1]
+        self._last = current
+        return busy / total if total else 0.0
+
+
+class ScalingPolicy:
+    """
+    Политика масштабирования (одинаковая для потоков и процессов)
+
+    Поиск восхождением к вершине по пропускной способности:
+    - есть очередь и CPU не насыщен -> увеличиваем пул (вдвое, но не больше очереди)
+    - эффект роста оцениваем не раньше, чем через две средние задержки задачи;
+      если пропускная способность не выросла -> откатываемся и запоминаем
+      этот размер как потолок на cooldown секунд
+    - очереди нет и часть исполнителей простаивает -> уменьшаем до числа занятых
+    """
+
+    def __init__(self, min_workers, max_workers, cpu_limit=0.9, min_gain=0.05, idle_rounds=2, cooldown=5.0):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.cpu_limit = cpu_limit
+        self.min_gain = min_gain
+        self.idle_rounds = idle_rounds
+        self.cooldown = cooldown
+        self._growth = None   # (время роста, пропускная способность до него)
+        self._ceiling = None  # (размер без выигрыша, до какого времени действует)
+        self._idle = 0
+
+    def decide(self, now, workers, busy, queue_depth, throughput, latency, cpu):
+        """Вернуть (новое число исполнителей, причина)"""
+        if self._ceiling is not None and now > self._ceiling[1]:
+            self._ceiling = None
+
+        if self._growth is not None:
+            grown_at, before = self._growth
+            if now - grown_at < 2 * latency:
+                return workers, 'оценка эффекта роста'
+            self._growth = None
+            if before > 0 and throughput < before * (1 + self.min_gain) and workers > self.min_workers:
+                self._ceiling = (workers, now + self.cooldown)
+                return max(self.min_workers, workers - max(1, workers // 4)), \
+                    'рост не увеличил пропускную способность'
+
+        limit = self.max_workers
+        if self._ceiling is not None:
+            limit = min(limit, self._ceiling[0] - 1)
+
+        if queue_depth > 0:
+            self._idle = 0
+            if workers < limit and cpu < self.cpu_limit:
+                self._growth = (now, throughput)
+                return min(limit, workers + max(1, min(workers, queue_depth))), 'задачи ждут в очереди'
+            return workers, 'CPU насыщен или достигнут предел'
+
+        if busy < workers:
+            self._idle += 1
+            if self._idle >= self.idle_rounds:
+                self._idle = 0
+                self._ceiling = None
+                return max(self.min_workers, busy), 'исполнители простаивают'
+        return workers, 'без изменений'
+
+
+class AutoscalingExecutor(concurrent.futures.Executor):
+    """
+    Исполнитель с автоматическим подбором числа исполнителей
+
+    Каждые interval секунд замеряются задержка задач, длина очереди,
+    загрузка CPU и пропускная способность, и ScalingPolicy решает, сколько
+    исполнителей нужно. backend='thread' — пул потоков, backend='process' —
+    каждый исполнитель владеет своим процессом. Решения пишутся в лог
+    'autoscaler' и в список decisions.
+    """
+
+    def __init__(self, backend='thread', min_workers=1, max_workers=None, interval=0.2, policy=None):
+        if backend not in ('thread', 'process'):
+            raise ValueError(f"Неизвестный backend: {backend}")
+        cpus = os.cpu_count() or 1
+        if max_workers is None:
+            max_workers = cpus if backend == 'process' else cpus * 4
+        self.backend = backend
+        self.interval = interval
+        self.policy = policy or ScalingPolicy(min_workers, max_workers)
+        self.decisions = []
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._target = 0
+        self._workers = 0
+        self._busy = 0
+        self._completed = 0
+        self._latency = 0.0  # экспоненциальное скользящее среднее, сек
+        self._shutdown = threading.Event()
+        self._threads = []
+
+        self._resize(self.policy.min_workers)
+        self._controller = threading.Thread(target=self._control_loop, name='autoscaler', daemon=True)
+        self._controller.start()
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self._shutdown.is_set():
+            raise RuntimeError("Нельзя добавлять задачи после shutdown()")
+        future = concurrent.futures.Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def _resize(self, target):
+        with self._lock:
+            self._target = target
+            missing = target - self._workers
+            self._workers = max(self._workers, target)
+        # Лишние исполнители завершатся сами, сверив себя с _target
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for _ in range(max(0, missing)):
+            thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _should_retire(self):
+        with self._lock:
+            if self._workers > self._target:
+                self._workers -= 1
+                return True
+            return False
+
+    def _worker_loop(self):
+        process = None
+        if self.backend == 'process':
+            process = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+        try:
+            while not self._should_retire():
+                try:
+                    future, fn, args, kwargs = self._queue.get(timeout=0.05)
+                except queue.Empty:
+                    if self._shutdown.is_set():
+                        with self._lock:
+                            self._workers -= 1
+                        return
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                with self._lock:
+                    self._busy += 1
+                start = time.perf_counter()
+                try:
+                    if process is not None:
+                        result = process.submit(fn, *args, **kwargs).result()
+                    else:
+                        result = fn(*args, **kwargs)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._busy -= 1
+                    self._completed += 1
+                    self._latency = elapsed if self._completed == 1 else 0.8 * self._latency + 0.2 * elapsed
+        finally:
+            if process is not None:
+                process.shutdown(wait=True)
+
+    def _control_loop(self):
+        cpu = CpuSampler()
+        # История (время, выполнено задач) для оценки пропускной способности
+        history = collections.deque([(time.perf_counter(), 0)], maxlen=1000)
+        while not self._shutdown.wait(self.interval):
+            now = time.perf_counter()
+            with self._lock:
+                completed, busy, workers, latency = self._completed, self._busy, self._target, self._latency
+            history.append((now, completed))
+            # Окно не короче двух средних задержек, иначе длинные задачи дают "нулевую" скорость
+            window = max(self.interval, 2 * latency)
+            start_time, start_completed = next(
+                ((t, c) for t, c in history if now - t <= window), history[-1])
+            throughput = (completed - start_completed) / (now - start_time) if now > start_time else 0.0
+            depth = self._queue.qsize()
+            utilization = cpu.sample()
+
+            target, reason = self.policy.decide(now, workers, busy, depth, throughput, latency, utilization)
+            if target != workers:
+                self.decisions.append((time.time(), workers, target, reason))
+                logger.info("%s: %d -> %d исполнителей (%s; очередь=%d, занято=%d, CPU=%.0f%%, "
+                            "%.1f задач/сек, задержка %.3f сек)", self.backend, workers, target, reason,
+                            depth, busy, utilization * 100, throughput, latency)
+                self._resize(target)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        if cancel_futures:
+            while True:
+                try:
+                    future, *_ = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                future.cancel()
+        self._shutdown.set()
+        if wait:
+            self._controller.join()
+            for thread in self._threads:
+                thread.join()
+
+
+def _demo_task(duration):
+    time.sleep(duration)
+    return duration
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    for backend in ('thread', 'process'):
+        print(f"\n=== АВТОМАСШТАБИРОВАНИЕ: {backend} ===")
+        start = time.perf_counter()
+        with AutoscalingExecutor(backend, max_workers=16) as executor:
+            results = list(executor.map(_demo_task, [0.2] * 64))
+        print(f"Задач: {len(results)}, время: {time.perf_counter() - start:.2f} сек")
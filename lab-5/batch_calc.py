@@ -0,0 +1,184 @@
+import argparse
+import array
+import csv
+import random
+import time
+
+from task1 import calculate
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy — поэлементный цикл по тем же колонкам
+    np = None
+
+# Коды операций в колонке операторов
+OPERATIONS = ('+', '-', '*', '/')
+OP_CODES = {op: code for code, op in enumerate(OPERATIONS)}
+UNKNOWN_OP = -1
+
+# Коды ошибок в отдельной колонке (результат при ошибке — NaN)
+OK = 0
+DIVISION_BY_ZERO = 1
+UNKNOWN_OPERATION = 2
+
+ERROR_MESSAGES = {
+    DIVISION_BY_ZERO: 'Ошибка: деление на ноль',
+    UNKNOWN_OPERATION: 'Неизвестная операция',
+}
+
+
+def encode_operations(operations):
+    """Список строк операторов -> колонка кодов (int8); неизвестные -> UNKNOWN_OP"""
+    if np is not None:
+        # Словарь применяется только к различным строкам (их единицы), коды
+        # элементов берутся по обратным индексам — без цикла Python по элементам
+        distinct, inverse = np.unique(np.asarray(operations, dtype='U'), return_inverse=True)
+        table = np.array([OP_CODES.get(op, UNKNOWN_OP) for op in distinct], dtype=np.int8)
+        return table[inverse.reshape(-1)]
+    return array.array('b', (OP_CODES.get(op, UNKNOWN_OP) for op in operations))
+
+
+def evaluate(codes, a, b):
+    """
+    Вычислить колонку операций целиком
+
+    codes — коды операций (encode_operations), a и b — колонки чисел.
+    Возвращает (results, errors): results (float64) с NaN на месте ошибок
+    и errors (uint8) с кодами OK / DIVISION_BY_ZERO / UNKNOWN_OPERATION —
+    вместо строк ошибок в колонке результатов.
+    """
+    if np is None:
+        return _evaluate_scalar(codes, a, b)
+    codes = np.asarray(codes, dtype=np.int8)
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    # Все четыре операции считаются над колонками целиком, затем для каждой
+    # строки выбирается результат её операции — без ветвлений по элементам
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results = np.select([codes == code for code in range(len(OPERATIONS))],
+                            [a + b, a - b, a * b, a / b], np.nan)
+
+    errors = np.zeros(len(codes), dtype=np.uint8)
+    errors[(codes < 0) | (codes >= len(OPERATIONS))] = UNKNOWN_OPERATION
+    zero = (codes == OP_CODES['/']) & (b == 0)
+    errors[zero] = DIVISION_BY_ZERO
+    results[zero] = np.nan
+    return results, errors
+
+
+def _evaluate_scalar(codes, a, b):
+    results = array.array('d', bytes(8 * len(codes)))
+    errors = bytearray(len(codes))
+    for i, (code, x, y) in enumerate(zip(codes, a, b)):
+        if code == UNKNOWN_OP or code >= len(OPERATIONS):
+            results[i], errors[i] = float('nan'), UNKNOWN_OPERATION
+        elif OPERATIONS[code] == '/' and y == 0:
+            results[i], errors[i] = float('nan'), DIVISION_BY_ZERO
+        else:
+            results[i] = calculate(OPERATIONS[code], x, y)
+    return results, errors
+
+
+def read_chunks(path, chunk_size=1_000_000):
+    """
+    Читать CSV со строками 'операция,a,b' порциями по chunk_size строк
+
+    Генератор колонок (codes, a, b): в памяти одновременно только одна
+    порция, поэтому файл может быть больше оперативной памяти.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        while True:
+            operations, a, b = [], [], []
+            for row in reader:
+                operations.append(row[0])
+                a.append(float(row[1]))
+                b.append(float(row[2]))
+                if len(operations) == chunk_size:
+                    break
+            if not operations:
+                return
+            yield encode_operations(operations), a, b
+
+
+def evaluate_stream(chunks):
+    """Вычислить поток порций (codes, a, b); генератор (results, errors)"""
+    for codes, a, b in chunks:
+        yield evaluate(codes, a, b)
+
+
+def evaluate_file(input_path, output_path, chunk_size=1_000_000):
+    """
+    Вычислить CSV 'операция,a,b' и записать CSV 'результат,код ошибки' порциями
+
+    Возвращает (всего строк, строк с ошибками).
+    """
+    total = failed = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        for results, errors in evaluate_stream(read_chunks(input_path, chunk_size)):
+            writer.writerows(zip(list(results), list(errors)))
+            total += len(errors)
+            failed += int(np.count_nonzero(errors != OK)) if np is not None \
+                else sum(1 for error in errors if error != OK)
+    return total, failed
+
+
+def generate(count, seed=1):
+    """Случайные колонки: операции (включая неизвестные), a, b (с нулями)"""
+    rng = random.Random(seed)
+    operations = rng.choices(OPERATIONS + ('%',), weights=(30, 30, 30, 30, 1), k=count)
+    a = [rng.randint(-1000, 1000) for _ in range(count)]
+    b = [rng.randint(-10, 10) for _ in range(count)]
+    return operations, a, b
+
+
+def benchmark(count=1_000_000):
+    """Поэлементный цикл calculate() против векторного evaluate()"""
+    operations, a, b = generate(count)
+    print(f"=== {count} ОПЕРАЦИЙ ===")
+
+    start = time.perf_counter()
+    scalar = [calculate(op, x, y) for op, x, y in zip(operations, a, b)]
+    scalar_time = time.perf_counter() - start
+    print(f"Цикл calculate(): {scalar_time:.2f} сек")
+
+    # Перевод списков в колонки — разовая стоимость загрузки данных, замеряется отдельно
+    start = time.perf_counter()
+    codes = encode_operations(operations)
+    columns_a = np.asarray(a, dtype=np.float64) if np is not None else array.array('d', a)
+    columns_b = np.asarray(b, dtype=np.float64) if np is not None else array.array('d', b)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    results, errors = evaluate(codes, columns_a, columns_b)
+    vector_time = time.perf_counter() - start
+    engine = 'NumPy' if np is not None else 'без NumPy'
+    print(f"evaluate() ({engine}): {vector_time:.3f} сек, ускорение {scalar_time / vector_time:.1f}x "
+          f"(+ {encode_time:.2f} сек на перевод списков в колонки)")
+
+    for expected, value, error in zip(scalar, results, errors):
+        if error != OK:
+            assert expected == ERROR_MESSAGES[error]
+        else:
+            assert expected == value
+    print(f"Результаты совпадают, ошибок: {sum(1 for error in errors if error != OK)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное вычисление операций из CSV 'операция,a,b'")
+    parser.add_argument('input', nargs='?', help="входной CSV (без него — замер на случайных данных)")
+    parser.add_argument('output', nargs='?', help="выходной CSV 'результат,код ошибки'")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--count', type=int, default=1_000_000, help="операций в замере")
+    args = parser.parse_args(argv)
+    if args.input is None:
+        benchmark(args.count)
+        return
+    if args.output is None:
+        parser.error("укажите выходной файл")
+    total, failed = evaluate_file(args.input, args.output, args.chunk_size)
+    print(f"Вычислено строк: {total}, с ошибками: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import bisect
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
+
+# Основания Миллера — Рабина: с ними тест детерминирован для n < 3.3 * 10^24
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_SMALL_PRIMES = _MR_BASES
+# Решето применяется, только пока простые-делители не больше этого (числа до ~10^12);
+# выше базовый список и проход по нему дороже теста Миллера — Рабина
+SIEVE_LIMIT = 1 << 20
+
+# Общая память процесса-исполнителя (подключается один раз в initializer)
+_numbers = None
+_flags = None
+_segments = []
+# Базовые простые процесса: строятся один раз и переиспользуются порциями
+_primes = []
+_primes_limit = 0
+
+
+def is_prime(n):
+    """Тест Миллера — Рабина (детерминированный для n < 3.3 * 10^24)"""
+    if n < 2:
+        return False
+    for p in _SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _base_primes(limit):
+    """Простые до limit включительно (обычное решето)"""
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[:2] = b'\x00\x00'
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+    return [i for i, flag in enumerate(sieve) if flag]
+
+
+def _primes_upto(limit):
+    """Простые до limit включительно из кэша процесса (расширяется по мере надобности)"""
+    global _primes, _primes_limit
+    if limit > _primes_limit:
+        _primes_limit = max(limit, 2 * _primes_limit)
+        _primes = _base_primes(_primes_limit)
+    return _primes[:bisect.bisect_right(_primes, limit)]
+
+
+def segmented_sieve(low, high):
+    """Флаги простоты для чисел [low, high): bytearray, 1 — простое"""
+    low = max(low, 0)
+    flags = bytearray([1]) * max(0, high - low)
+    for n in range(low, min(high, 2)):
+        flags[n - low] = 0
+    for p in _primes_upto(math.isqrt(max(high - 1, 0))):
+        start = max(p * p, (low + p - 1) // p * p)
+        flags[start - low::p] = bytes(len(range(start, high, p)))
+    return flags
+
+
+def _attach(numbers_name, flags_name):
+    global _numbers, _flags
+    _segments.extend([shared_memory.SharedMemory(numbers_name), shared_memory.SharedMemory(flags_name)])
+    _numbers = _segments[0].buf.cast('q')
+    _flags = _segments[1].buf
+
+
+def _check_chunk(bounds):
+    """
+    Проверить числа [start, end) из общей памяти и записать флаги туда же
+
+    Плотные порции (числа близко друг к другу) небольших чисел
+    проверяются сегментным решетом, разреженные и большие (корень больше
+    SIEVE_LIMIT) — тестом Миллера — Рабина.
+    """
+    start, end = bounds
+    chunk = _numbers[start:end]
+    low, high = min(chunk), max(chunk) + 1
+    if high - low <= 8 * (end - start) and math.isqrt(high - 1) <= SIEVE_LIMIT:
+        sieve = segmented_sieve(low, high)
+        for i, n in enumerate(chunk, start):
+            _flags[i] = sieve[n - low] if n >= 0 else 0
+    else:
+        for i, n in enumerate(chunk, start):
+            _flags[i] = is_prime(n)
+    return end - start
+
+
+def check_primes(numbers, chunk_size=10000, processes=None):
+    """
+    Проверить на простоту много чисел (0 <= n < 2^63) параллельно
+
+    Числа кладутся в общую память один раз, процессам передаются только
+    границы порций, результаты пишутся процессами прямо в общий массив
+    флагов — поэлементной сериализации нет. Возвращает bytes: 1 — простое.
+    """
+    count = len(numbers)
+    if count == 0:
+        return b''
+    numbers_shm = shared_memory.SharedMemory(create=True, size=8 * count)
+    flags_shm = shared_memory.SharedMemory(create=True, size=count)
+    try:
+        view = numbers_shm.buf.cast('q')
+        for i, n in enumerate(numbers):
+            view[i] = n
+        view.release()
+
+        bounds = [(i, min(i + chunk_size, count)) for i in range(0, count, chunk_size)]
+        with multiprocessing.Pool(processes, initializer=_attach,
+                                  initargs=(numbers_shm.name, flags_shm.name)) as pool:
+            for _ in pool.imap_unordered(_check_chunk, bounds):
+                pass
+        return bytes(flags_shm.buf[:count])
+    finally:
+        for shm in (numbers_shm, flags_shm):
+            shm.close()
+            shm.unlink()
+
+
+def _quiet_calculate_prime(n):
+    # calculate_prime печатает каждое число — в замере это только шум
+    from task3 import calculate_prime
+    with contextlib.redirect_stdout(io.StringIO()):
+        return calculate_prime(n)
+
+
+def benchmark(count=20000, low=10_000_000, high=10_100_000):
+    """Сравнение с подходом task3: одна задача на число через pool.starmap"""
+    rng = random.Random(1)
+    numbers = [rng.randrange(low, high) for _ in range(count)]
+    print(f"=== ПРОВЕРКА {count} ЧИСЕЛ В ДИАПАЗОНЕ [{low}, {high}) ===")
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(os.cpu_count()) as pool:
+        baseline = pool.starmap(_quiet_calculate_prime, [(n,) for n in numbers])
+    baseline_time = time.perf_counter() - start
+    print(f"Как в task3 (starmap, пробное деление): {baseline_time:.2f} сек")
+
+    start = time.perf_counter()
+    flags = check_primes(numbers)
+    batch_time = time.perf_counter() - start
+    print(f"Порции + общая память (решето/Миллер — Рабин): {batch_time:.2f} сек")
+
+    assert [bool(f) for f in flags] == baseline, "Результаты расходятся"
+    print(f"Простых: {sum(flags)}, ускорение: {baseline_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import concurrent.futures
+import csv
+import hashlib
+import json
+import math
+import os
+import socket
+import socketserver
+import statistics
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ('sync', 'thread', 'process', 'async')
+# Дополнительный режим: процессы с автоподбором числа исполнителей (autoscaler.py)
+EXTRA_MODES = ('autoscale',)
+
+# Квантили t-распределения Стьюдента для 95% доверительного интервала (по числу степеней свободы)
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042}
+
+
+def _t95(df):
+    for key in sorted(_T95, reverse=True):
+        if df >= key:
+            return _T95[key] if df <= 30 else 1.96
+    return float('inf')
+
+
+# --- функции нагрузок (верхнего уровня, чтобы передаваться в процессы) ---
+
+def sleep_task(duration):
+    """I/O-bound: ожидание"""
+    time.sleep(duration)
+    return duration
+
+
+def echo_task(item):
+    """I/O-bound: запрос к локальному эхо-серверу по TCP"""
+    address, payload = item
+    with socket.create_connection(address) as sock:
+        sock.sendall(payload + b'\n')
+        received = b''
+        while not received.endswith(b'\n'):
+            block = sock.recv(65536)
+            if not block:
+                break
+            received += block
+    return len(received) - 1
+
+
+def hash_task(rounds):
+    """CPU-bound: цепочка sha256 по коротким данным (GIL не отпускается)"""
+    digest = b'benchmark'
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return digest.hex()
+
+
+def mixed_task(item):
+    """Смешанная: ожидание, затем вычисление"""
+    duration, rounds = item
+    time.sleep(duration)
+    return hash_task(rounds)
+
+
+async def async_sleep_task(duration):
+    await asyncio.sleep(duration)
+    return duration
+
+
+async def async_echo_task(item):
+    address, payload = item
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(payload + b'\n')
+    await writer.drain()
+    received = await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    return len(received) - 1
+
+
+async def async_hash_task(rounds):
+    # Вычисления блокируют цикл событий — именно это и показывает замер
+    return hash_task(rounds)
+
+
+async def async_mixed_task(item):
+    duration, rounds = item
+    await asyncio.sleep(duration)
+    return hash_task(rounds)
+
+
+class _EchoHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line)
+
+
+class _EchoTCPServer(socketserver.ThreadingTCPServer):
+    # Очередь listen() по умолчанию (5) переполняется при параллельных
+    # подключениях, и клиент ждёт повторного SYN целую секунду
+    request_queue_size = 128
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class EchoServer:
+    """Локальный многопоточный эхо-сервер; latency — задержка ответа (имитация сети)"""
+
+    def __init__(self, latency=0.01):
+        self._server = _EchoTCPServer(('127.0.0.1', 0), _EchoHandler)
+        self._server.latency = latency
+        self.address = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class Workload:
+    """
+    Нагрузка для замера
+
+    func — функция одного элемента для sync/thread/process, async_func —
+    её асинхронный вариант. items(context) возвращает элементы; context —
+    то, что вернул setup() (например, адрес сервера).
+    """
+
+    def __init__(self, name, func, async_func, items, setup=None):
+        self.name = name
+        self.func = func
+        self.async_func = async_func
+        self._items = items
+        self._setup = setup
+
+    def setup(self):
+        return self._setup() if self._setup is not None else None
+
+    def items(self, context):
+        return self._items(context) if callable(self._items) else list(self._items)
+
+
+def default_workloads(size=20):
+    """sleep, socket, cpu, mixed — по size элементов"""
+    return {
+        'sleep': Workload('sleep', sleep_task, async_sleep_task, [0.05] * size),
+        'socket': Workload('socket', echo_task, async_echo_task,
+                           lambda server: [(server.address, b'x' * 1024)] * size,
+                           setup=lambda: EchoServer(latency=0.02)),
+        'cpu': Workload('cpu', hash_task, async_hash_task, [20000] * size),
+        'mixed': Workload('mixed', mixed_task, async_mixed_task, [(0.03, 10000)] * size),
+    }
+
+
+def run_once(workload, mode, items, workers):
+    """
+    Один прогон нагрузки в заданном режиме; возвращает результаты
+
+    Пул потоков/процессов создаётся внутри прогона: его запуск — часть
+    стоимости подхода. В режиме async одновременно выполняется не больше
+    workers корутин, как и в пулах.
+    """
+    if mode == 'sync':
+        return [workload.func(item) for item in items]
+    if mode == 'thread':
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(workload.func, items))
+    if mode == 'process':
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(workload.func, items))
+    if mode == 'autoscale':
+        from autoscaler import AutoscalingExecutor
+        with AutoscalingExecutor('process', max_workers=workers) as executor:
+            return list(executor.map(workload.func, items))
+    if mode == 'async':
+        async def main():
+            semaphore = asyncio.Semaphore(workers)
+
+            async def limited(item):
+                async with semaphore:
+                    return await workload.async_func(item)
+            return await asyncio.gather(*(limited(item) for item in items))
+        return asyncio.run(main())
+    raise ValueError(f"Неизвестный режим: {mode}")
+
+
+def _rss_bytes(pids):
+    """Суммарная резидентная память процессов (по /proc); None, если /proc нет"""
+    total = 0
+    page = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as statm:
+                total += int(statm.read().split()[1]) * page
+        except (OSError, ValueError, IndexError):
+            if pid == os.getpid():
+                return None
+    return total
+
+
+def _descendants(pid):
+    """Все потомки процесса; дочерние процессы учитываются по всем его потокам"""
+    found = []
+    try:
+        threads = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return found
+    for tid in threads:
+        try:
+            with open(f'/proc/{pid}/task/{tid}/children') as children:
+                for child in children.read().split():
+                    found.append(int(child))
+                    found.extend(_descendants(int(child)))
+        except OSError:
+            continue
+    return found
+
+
+class ResourceSampler:
+    """
+    Пиковая память (этот процесс + дочерние) — опрос каждые interval секунд,
+    и процессорное время за замер (своё и завершившихся дочерних процессов)
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu_time = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _cpu(self):
+        if resource is not None:
+            own = resource.getrusage(resource.RUSAGE_SELF)
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+        times = os.times()
+        return times.user + times.system
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.wait(self.interval):
+            rss = _rss_bytes([pid, *_descendants(pid)])
+            if rss is None:
+                if resource is not None:
+                    # Без /proc — только пик текущего процесса за всё время работы (КБ в Linux)
+                    self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                return
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def __enter__(self):
+        self._cpu_start = self._cpu()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_time = self._cpu() - self._cpu_start
+
+
+def summarize(samples):
+    """Среднее, отклонение и 95% доверительный интервал (t-распределение)"""
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    half = _t95(len(samples) - 1) * stdev / math.sqrt(len(samples)) if len(samples) > 1 else 0.0
+    return {
+        'mean': mean,
+        'stdev': stdev,
+        'ci95_low': mean - half,
+        'ci95_high': mean + half,
+        'min': min(samples),
+        'max': max(samples),
+    }
+
+
+def run_benchmark(workloads, modes=MODES, repeats=5, warmup=1, workers=8, verbose=True):
+    """
+    Замерить каждую нагрузку в каждом режиме
+
+    warmup прогонов отбрасываются (прогрев кешей, импортов, JIT пулов),
+    затем repeats прогонов замеряются по time.perf_counter. Возвращает
+    список строк отчёта (словари).
+    """
+    report = []
+    for workload in workloads:
+        context = workload.setup()
+        try:
+            if hasattr(context, '__enter__'):
+                context.__enter__()
+            items = workload.items(context)
+            for mode in modes:
+                for _ in range(warmup):
+                    run_once(workload, mode, items, workers)
+                times, cpu, peak = [], [], 0
+                for _ in range(repeats):
+                    with ResourceSampler() as sampler:
+                        start = time.perf_counter()
+                        run_once(workload, mode, items, workers)
+                        times.append(time.perf_counter() - start)
+                    cpu.append(sampler.cpu_time)
+                    peak = max(peak, sampler.peak_rss)
+                row = {
+                    'workload': workload.name,
+                    'mode': mode,
+                    'workers': workers,
+                    'items': len(items),
+                    'repeats': repeats,
+                    **summarize(times),
+                    'cpu_time': statistics.fmean(cpu),
+                    'cpu_utilization': statistics.fmean(cpu) / statistics.fmean(times),
+                    'peak_rss_mb': peak / 2 ** 20,
+                }
+                report.append(row)
+                if verbose:
+                    print(f"{row['workload']:7s} {row['mode']:9s} {row['mean']:7.3f} сек "
+                          f"[{row['ci95_low']:.3f}; {row['ci95_high']:.3f}]  "
+                          f"CPU {row['cpu_time']:6.2f} сек ({row['cpu_utilization'] * 100:4.0f}%)  "
+                          f"память {row['peak_rss_mb']:6.1f} МБ")
+        finally:
+            if hasattr(context, '__exit__'):
+                context.__exit__(None, None, None)
+    return report
+
+
+def conclusions(report):
+    """
+    Выводы по данным замера: самый быстрый режим, значимость разницы
+    (не пересекаются ли доверительные интервалы), ускорение относительно
+    sync, затраты CPU и памяти
+    """
+    lines = []
+    for workload in dict.fromkeys(row['workload'] for row in report):
+        rows = sorted((row for row in report if row['workload'] == workload), key=lambda row: row['mean'])
+        best, runner_up = rows[0], rows[1] if len(rows) > 1 else None
+        sync = next((row for row in rows if row['mode'] == 'sync'), None)
+        line = f"{workload}: быстрее всего {best['mode']} ({best['mean']:.3f} сек"
+        if sync is not None and sync is not best:
+            line += f", в {sync['mean'] / best['mean']:.1f} раза быстрее sync"
+        line += ")"
+        if runner_up is not None:
+            if runner_up['mean'] - best['mean'] < 0.05 * best['mean']:
+                line += f"; {runner_up['mode']} практически так же быстр (разница меньше 5%)"
+            elif best['ci95_high'] < runner_up['ci95_low']:
+                line += f"; отрыв от {runner_up['mode']} статистически значим"
+            else:
+                line += f"; разница с {runner_up['mode']} в пределах погрешности"
+        cheapest = min(rows, key=lambda row: row['cpu_time'])
+        smallest = min(rows, key=lambda row: row['peak_rss_mb'])
+        line += f"; меньше всего CPU — {cheapest['mode']}, памяти — {smallest['mode']}"
+        lines.append(line)
+    return lines
+
+
+def write_json(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def write_csv(report, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(report[0]))
+        writer.writeheader()
+        writer.writerows(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение sync/thread/process/async на разных нагрузках")
+    parser.add_argument('--workloads', nargs='+', default=['sleep', 'socket', 'cpu', 'mixed'])
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES + EXTRA_MODES)
+    parser.add_argument('--size', type=int, default=20, help="элементов в нагрузке")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--json', help="сохранить отчёт в JSON")
+    parser.add_argument('--csv', help="сохранить отчёт в CSV")
+    args = parser.parse_args(argv)
+
+    available = default_workloads(args.size)
+    report = run_benchmark([available[name] for name in args.workloads], args.modes,
+                           args.repeats, args.warmup, args.workers)
+    print("\n=== ВЫВОДЫ ===")
+    for line in conclusions(report):
+        print(line)
+    if args.json:
+        write_json(report, args.json)
+    if args.csv:
+        write_csv(report, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import asyncio
+import random
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Маркер конца очереди
+_END = object()
+
+
+class TokenBucket:
+    """
+    Ограничение частоты запросов: rate токенов в секунду, запас не больше capacity
+
+    Ожидающие обслуживаются по очереди (через Lock), поэтому всплеск
+    запросов растягивается во времени, а не проходит разом.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _range_start(content_range):
+    """Начало диапазона из заголовка 'bytes START-END/TOTAL' (None, если не разобрать)"""
+    unit, _, spec = (content_range or '').partition(' ')
+    start = spec.partition('-')[0]
+    return int(start) if unit == 'bytes' and start.isdigit() else None
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Crawler:
+    """
+    Асинхронный загрузчик множества URL
+
+    Параметры:
+    concurrency (int): сколько запросов выполняется одновременно (число рабочих корутин)
+    per_host (int): не больше стольких соединений к одному хосту
+    rate (float): не больше стольких запросов в секунду к одному хосту (None — без ограничения)
+    retries (int): сколько раз повторять запрос после ошибки или ответа из RETRY_STATUSES
+    backoff (float): базовая задержка повтора; n-й повтор ждёт случайное время
+                     в [0, backoff * 2^n] (экспонента с полным джиттером);
+                     Retry-After сервера учитывается, но не дольше последней
+                     из этих границ
+    timeout (float): общий таймаут одного запроса, сек
+    chunk_size (int): тело ответа читается порциями этого размера и не копится в памяти
+    queue_size (int): размер очередей URL и результатов — число URL может быть любым,
+                      в памяти одновременно не больше queue_size
+    """
+
+    def __init__(self, concurrency=10, per_host=4, rate=None, retries=3, backoff=0.2,
+                 timeout=30.0, chunk_size=64 * 1024, queue_size=100):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self._buckets = {}
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'statuses': {}}
+
+    def _bucket(self, host):
+        if self.rate is None:
+            return None
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate)
+        return self._buckets[host]
+
+    async def fetch(self, session, url, name=None, on_chunk=None):
+        """
+        Загрузить один URL с повторами; тело читается потоково
+
+        on_chunk(bytes) вызывается для каждой порции тела (например, чтобы
+        записать её в файл), каждый байт тела передаётся ровно один раз:
+        если соединение оборвалось посреди тела, повтор запрашивает
+        продолжение (Range), а если сервер всё равно отдаёт тело целиком,
+        уже переданное начало пропускается. Возвращает словарь с url, name,
+        status, size, attempts, elapsed и error (None при успехе).
+        """
+        url = url.strip()
+        bucket = self._bucket(urlsplit(url).netloc)
+        start = time.monotonic()
+        error = None
+        status = None
+        delivered = 0
+        attempt = 0
+        for attempt in range(1, self.retries + 2):
+            if bucket is not None:
+                await bucket.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            headers = {'Range': f'bytes={delivered}-'} if delivered else None
+            try:
+                async with session.get(url, headers=headers) as response:
+                    status = response.status
+                    self.stats['statuses'][status] = self.stats['statuses'].get(status, 0) + 1
+                    if status in RETRY_STATUSES:
+                        raise _RetryableStatus(status, response.headers.get('Retry-After'))
+                    skip = 0
+                    if delivered:
+                        first = _range_start(response.headers.get('Content-Range')) if status == 206 else 0
+                        if status not in (200, 206) or first is None or first > delivered:
+                            error = f"HTTP {status}: продолжение тела не получено"
+                            break
+                        skip = delivered - first
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        delivered += len(chunk)
+                        self.stats['bytes'] += len(chunk)
+                        if on_chunk is not None:
+                            on_chunk(chunk)
+                    error = None
+                    break
+            except _RetryableStatus as failure:
+                error = str(failure)
+                retry_after = failure.retry_after
+            except (aiohttp.ClientError, asyncio.TimeoutError) as failure:
+                error = f"{type(failure).__name__}: {failure}" if str(failure) else type(failure).__name__
+            if attempt > self.retries:
+                break
+            self.stats['retries'] += 1
+            delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, min(int(retry_after), self.backoff * 2 ** (self.retries - 1)))
+            await asyncio.sleep(delay)
+
+        if error is not None:
+            self.stats['errors'] += 1
+        return {
+            'url': url,
+            'name': name or url,
+            'status': status,
+            'size': delivered if error is None else 0,
+            'attempts': attempt,
+            'elapsed': time.monotonic() - start,
+            'error': error,
+        }
+
+    async def _produce(self, urls, queue):
+        if hasattr(urls, '__aiter__'):
+            async for item in urls:
+                await queue.put(item)
+        else:
+            for item in urls:
+                await queue.put(item)
+        for _ in range(self.concurrency):
+            await queue.put(_END)
+
+    async def _work(self, session, queue, results):
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            url, name = (item, None) if isinstance(item, str) else item
+            await results.put(await self.fetch(session, url, name))
+
+    async def crawl(self, urls):
+        """
+        Загрузить все URL; асинхронный генератор результатов в порядке готовности
+
+        urls — итерируемый (или асинхронно итерируемый) поток строк URL
+        или пар (url, название).
+        """
+        queue = asyncio.Queue(self.queue_size)
+        results = asyncio.Queue(self.queue_size)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            producer = asyncio.create_task(self._produce(urls, queue))
+            workers = [asyncio.create_task(self._work(session, queue, results))
+                       for _ in range(self.concurrency)]
+
+            async def finish():
+                try:
+                    await asyncio.gather(producer, *workers)
+                finally:
+                    await results.put(_END)
+
+            finisher = asyncio.create_task(finish())
+            try:
+                while (result := await results.get()) is not _END:
+                    yield result
+                await finisher  # пробросить исключение из producer/workers, если было
+            finally:
+                for task in (producer, *workers, finisher):
+                    task.cancel()
+                await asyncio.gather(producer, *workers, finisher, return_exceptions=True)
+
+
+async def start_test_server(host='127.0.0.1', port=0):
+    """
+    Локальная замена httpbin для тестов и замеров
+
+    /delay/{сек}       — ответ после задержки
+    /bytes/{n}         — n байт, отдаются порциями
+    /flaky/{ключ}/{n}  — первые n запросов с этим ключом получают 503
+                         (с Retry-After из параметра retry_after, по умолчанию 0)
+    /broken/{ключ}/{n}/{k} — n байт (байт i равен i % 251); первые k ответов
+                         с этим ключом обрываются на середине тела;
+                         Range поддерживается, если не передан ranges=0
+    /status/{код}      — ответ с заданным кодом
+
+    Возвращает (runner, базовый URL); остановить — await runner.cleanup().
+    """
+    failures = {}
+
+    async def delay(request):
+        await asyncio.sleep(float(request.match_info['seconds']))
+        return web.json_response({'delay': float(request.match_info['seconds'])})
+
+    async def payload(request):
+        size = int(request.match_info['size'])
+        response = web.StreamResponse(headers={'Content-Type': 'application/octet-stream'})
+        response.content_length = size
+        await response.prepare(request)
+        block = b'x' * 64 * 1024
+        while size > 0:
+            await response.write(block[:size])
+            size -= len(block)
+        return response
+
+    async def flaky(request):
+        key = request.match_info['key']
+        failures[key] = failures.get(key, 0) + 1
+        if failures[key] <= int(request.match_info['count']):
+            return web.Response(status=503, headers={'Retry-After': request.query.get('retry_after', '0')})
+        return web.Response(text=f'ok after {failures[key]} attempts')
+
+    async def broken(request):
+        key = request.match_info['key']
+        size = int(request.match_info['size'])
+        failures[key] = failures.get(key, 0) + 1
+        first = 0
+        if request.query.get('ranges') != '0' and request.http_range.start:
+            first = request.http_range.start
+        body = bytes(i % 251 for i in range(first, size))
+        response = web.StreamResponse(status=206 if first else 200)
+        response.content_length = len(body)
+        if first:
+            response.headers['Content-Range'] = f'bytes {first}-{size - 1}/{size}'
+        await response.prepare(request)
+        if failures[key] <= int(request.match_info['count']):
+            await response.write(body[:len(body) // 2])
+            request.transport.close()
+            return response
+        await response.write(body)
+        return response
+
+    async def status(request):
+        return web.Response(status=int(request.match_info['code']))
+
+    app = web.Application()
+    app.router.add_get('/delay/{seconds}', delay)
+    app.router.add_get('/bytes/{size}', payload)
+    app.router.add_get('/flaky/{key}/{count}', flaky)
+    app.router.add_get('/broken/{key}/{size}/{count}', broken)
+    app.router.add_get('/status/{code}', status)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f'http://{bound_host}:{bound_port}'
+
+
+async def _naive_fetch_all(urls):
+    """Подход исходного task4: gather по всем URL, тело целиком через response.text()"""
+    async def fetch(session, url):
+        async with session.get(url) as response:
+            return len(await response.text())
+
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(*(fetch(session, url) for url in urls))
+
+
+async def benchmark():
+    runner, base = await start_test_server()
+    try:
+        print("=== ПРОВЕРКИ НА ЛОКАЛЬНОМ СЕРВЕРЕ ===")
+        crawler = Crawler(retries=3, backoff=0.01)
+        results = [r async for r in crawler.crawl([f'{base}/flaky/a/2', f'{base}/status/404',
+                                                   f'{base}/status/500'])]
+        by_url = {r['url']: r for r in results}
+        assert by_url[f'{base}/flaky/a/2']['attempts'] == 3 and by_url[f'{base}/flaky/a/2']['error'] is None
+        assert by_url[f'{base}/status/404']['attempts'] == 1  # 404 не повторяется
+        assert by_url[f'{base}/status/500']['attempts'] == 4 and by_url[f'{base}/status/500']['error']
+        print(f"Повторы: {crawler.stats}")
+
+        crawler = Crawler(timeout=0.2, retries=1, backoff=0.01)
+        result = [r async for r in crawler.crawl([f'{base}/delay/1'])][0]
+        assert result['error'] and result['attempts'] == 2
+        print(f"Таймаут: {result['error']} после {result['attempts']} попыток")
+
+        crawler = Crawler(concurrency=20, rate=50)
+        start = time.monotonic()
+        count = sum([1 async for _ in crawler.crawl(f'{base}/delay/0' for _ in range(100))])
+        elapsed = time.monotonic() - start
+        print(f"Ограничение 50 запросов/сек: {count} запросов за {elapsed:.2f} сек")
+        assert elapsed >= 0.95  # 50 сразу из запаса, остальные 50 — за секунду
+
+        print("\n=== ПОТОКОВОЕ ЧТЕНИЕ ПРОТИВ response.text() ===")
+        urls = [f'{base}/bytes/{1024 * 1024}' for _ in range(100)]
+        for title, run in (("gather + text()", lambda: _naive_fetch_all(urls)),
+                           ("Crawler", lambda: _collect(Crawler(concurrency=20, per_host=20).crawl(urls)))):
+            tracemalloc.start()
+            start = time.monotonic()
+            sizes = await run()
+            elapsed = time.monotonic() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{title:16s}: {elapsed:.2f} сек, {sum(sizes) / 2 ** 20:.0f} МБ, "
+                  f"пик памяти {peak / 2 ** 20:.1f} МБ")
+
+        print("\n=== МНОГО URL ЧЕРЕЗ ОГРАНИЧЕННУЮ ОЧЕРЕДЬ ===")
+        for concurrency in (10, 50, 100):
+            crawler = Crawler(concurrency=concurrency, per_host=concurrency, queue_size=200)
+            start = time.monotonic()
+            count = sum([1 async for _ in crawler.crawl(f'{base}/delay/0.01' for _ in range(5000))])
+            elapsed = time.monotonic() - start
+            print(f"Параллельно {concurrency:3d}: {count} URL за {elapsed:.2f} сек, {count / elapsed:.0f} URL/сек")
+    finally:
+        await runner.cleanup()
+
+
+async def _collect(results):
+    return [result['size'] async for result in results]
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -0,0 +1,448 @@
+import concurrent.futures
+import hashlib
+import http.client
+import http.server
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import tracing
+
+BLOCK_SIZE = 64 * 1024
+
+
+class DownloadInterrupted(Exception):
+    """Загрузка остановлена по запросу; продолжить можно повторным вызовом download()"""
+
+
+class ConnectionPool:
+    """Пул постоянных HTTP-соединений к одному хосту (keep-alive)"""
+
+    def __init__(self, scheme, netloc, size=8, timeout=30.0):
+        self._factory = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self._netloc = netloc
+        self._timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = 0
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            self.created += 1
+            return self._factory(self._netloc, timeout=self._timeout)
+
+    def release(self, conn, broken=False):
+        if broken:
+            conn.close()
+        else:
+            self._idle.put_nowait(conn)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class Downloader:
+    """
+    Параллельная загрузка файлов диапазонами байтов (HTTP Range)
+
+    Файл делится на части по chunk_size, части качаются общим пулом
+    потоков (workers) через общие keep-alive соединения и пишутся сразу
+    на своё место в заранее выделенный файл (os.pwrite), без склейки.
+    Готовые части записываются в файл-спутник <путь>.part.json: если
+    загрузка прервалась, следующий вызов download() докачает только
+    недостающие части. Сервер без поддержки Range качается одним потоком.
+    """
+
+    def __init__(self, workers=8, chunk_size=4 * 1024 * 1024, retries=3, timeout=30.0):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                               thread_name_prefix='downloader')
+        self.metrics = {'bytes': 0, 'resumed_bytes': 0, 'chunks': 0, 'retries': 0, 'elapsed': 0.0}
+        self._metrics_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for pool in self._pools.values():
+            pool.close()
+
+    def _pool(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = ConnectionPool(parts.scheme, parts.netloc, self.workers, self.timeout)
+            return self._pools[key]
+
+    def _request(self, url, method='GET', headers=None):
+        """Выполнить запрос на соединении из пула; вернуть (соединение, ответ)"""
+        pool = self._pool(url)
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        conn = pool.acquire()
+        try:
+            conn.request(method, path, headers=headers or {})
+            return conn, conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            pool.release(conn, broken=True)
+            raise
+
+    def _probe(self, url):
+        """Размер файла, поддержка Range и валидатор (ETag или Last-Modified)"""
+        conn, response = self._request(url, 'HEAD')
+        response.read()
+        self._pool(url).release(conn, broken=response.will_close)
+        if response.status != 200:
+            raise OSError(f"HEAD {url}: HTTP {response.status}")
+        length = response.getheader('Content-Length')
+        return {
+            'size': int(length) if length is not None else None,
+            'ranges': response.getheader('Accept-Ranges', '').lower() == 'bytes',
+            'validator': response.getheader('ETag') or response.getheader('Last-Modified'),
+        }
+
+    def _fetch_range(self, url, fd, start, end, stopped, progress):
+        """Скачать байты [start, end] и записать их по тому же смещению в файл"""
+        with tracing.span(os.path.basename(urlsplit(url).path), 'range', start=start, end=end):
+            return self._fetch_range_retrying(url, fd, start, end, stopped, progress)
+
+    def _fetch_range_retrying(self, url, fd, start, end, stopped, progress):
+        """
+        Скачать часть с повторами
+
+        Повтор после обрыва запрашивает только недостающий хвост части —
+        записанные байты не качаются и не учитываются в прогрессе дважды.
+        Без Range (end is None) часть качается заново, и её прогресс
+        откатывается.
+        """
+        offset = start
+        for attempt in range(self.retries + 1):
+            if stopped():
+                raise DownloadInterrupted(url)
+            if end is None and offset != start:
+                progress(start - offset)
+                offset = start
+            headers = {'Range': f'bytes={offset}-{end}'} if end is not None else {}
+            conn = None
+            try:
+                conn, response = self._request(url, headers=headers)
+                if response.status != (206 if end is not None else 200):
+                    response.read()
+                    raise OSError(f"GET {url} [{offset}-{end}]: HTTP {response.status}")
+                while block := response.read(BLOCK_SIZE):
+                    if stopped():
+                        raise DownloadInterrupted(url)
+                    os.pwrite(fd, block, offset)
+                    offset += len(block)
+                    progress(len(block))
+                # http.client не сообщает об обрыве тела — недочитанное видно по response.length
+                if (end is not None and offset != end + 1) or response.length:
+                    expected = end + 1 - start if end is not None else offset - start + response.length
+                    raise OSError(f"GET {url}: получено {offset - start} байт из {expected}")
+                self._pool(url).release(conn, broken=response.will_close)
+                return offset - start
+            except DownloadInterrupted:
+                if conn is not None:
+                    self._pool(url).release(conn, broken=True)
+                raise
+            except (OSError, http.client.HTTPException):
+                if conn is not None:
+                    self._pool(url).release(conn, broken=True)
+                if attempt == self.retries:
+                    raise
+                with self._metrics_lock:
+                    self.metrics['retries'] += 1
+                time.sleep(0.1 * 2 ** attempt)
+
+    def download(self, url, path, stop=None, on_progress=None):
+        """Скачать один файл; см. download_many"""
+        return self.download_many([(url, path)], stop, on_progress)[path]
+
+    def download_many(self, items, stop=None, on_progress=None):
+        """
+        Скачать несколько файлов [(url, путь)] — части всех файлов качаются вместе
+
+        stop (threading.Event): если установить, загрузка прервётся с
+        DownloadInterrupted, а прогресс останется в файлах-спутниках.
+        on_progress(путь, скачано байт, всего байт) вызывается после каждого блока
+        (при повторе загрузки без Range скачанное уменьшается на откатанные байты).
+
+        Возвращает {путь: {'size', 'chunks', 'resumed_bytes', 'elapsed', 'throughput'}}.
+        """
+        started = time.perf_counter()
+        # Ошибка одной части останавливает остальные, не трогая чужой stop
+        abort = threading.Event()
+
+        def stopped():
+            return abort.is_set() or (stop is not None and stop.is_set())
+
+        jobs = []
+        futures = {}
+        try:
+            # Открытые файлы уже созданных заданий закрываются в finally,
+            # даже если проверка одного из следующих URL не удалась
+            for url, path in items:
+                jobs.append(_FileJob(self, url, path, on_progress))
+            for job in jobs:
+                for start, end in job.pending_ranges():
+                    future = self._executor.submit(self._fetch_range, job.url, job.fd, start, end, stopped,
+                                                   job.progress)
+                    futures[future] = (job, start)
+            for future in concurrent.futures.as_completed(futures):
+                job, start = futures[future]
+                future.result()
+                job.mark_done(start)
+        except BaseException:
+            # Дождаться уже запущенных частей, чтобы не писать в закрытый файл
+            abort.set()
+            for future in futures:
+                future.cancel()
+            concurrent.futures.wait(futures)
+            raise
+        finally:
+            for job in jobs:
+                job.close()
+
+        summary = {}
+        for job in jobs:
+            job.finish()
+            elapsed = time.perf_counter() - started
+            summary[job.path] = {
+                'size': job.size,
+                'chunks': len(job.chunks),
+                'resumed_bytes': job.resumed_bytes,
+                'elapsed': elapsed,
+                'throughput': (job.size - job.resumed_bytes) / elapsed if elapsed else 0.0,
+            }
+        with self._metrics_lock:
+            self.metrics['elapsed'] += time.perf_counter() - started
+        return summary
+
+    def throughput(self):
+        """Средняя скорость всех загрузок этого Downloader, байт/сек"""
+        with self._metrics_lock:
+            elapsed = self.metrics['elapsed']
+            return self.metrics['bytes'] / elapsed if elapsed else 0.0
+
+
+class _FileJob:
+    """Состояние загрузки одного файла: выделенный файл, части и файл-спутник"""
+
+    def __init__(self, downloader, url, path, on_progress):
+        self.downloader = downloader
+        self.url = url
+        self.path = path
+        self.sidecar = path + '.part.json'
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+
+        info = downloader._probe(url)
+        self.size = info['size']
+        chunk = downloader.chunk_size
+        if self.size is not None and info['ranges']:
+            self.chunks = [(start, min(start + chunk, self.size) - 1) for start in range(0, self.size, chunk)]
+        else:
+            self.chunks = [(0, None)]  # без Range — один поток, докачка невозможна
+
+        state = {'url': url, 'size': self.size, 'validator': info['validator'],
+                 'chunk_size': chunk, 'done': []}
+        self.done = set()
+        if os.path.exists(self.sidecar) and os.path.exists(path) and len(self.chunks) > 1:
+            with open(self.sidecar, encoding='utf-8') as f:
+                saved = json.load(f)
+            if all(saved.get(key) == state[key] for key in ('url', 'size', 'validator', 'chunk_size')):
+                self.done = set(saved['done'])
+        self.state = state
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+        if self.size is not None:
+            os.ftruncate(self.fd, self.size)
+        self.resumed_bytes = sum(end + 1 - start for start, end in self.chunks if start in self.done)
+        self.downloaded = self.resumed_bytes
+        with downloader._metrics_lock:
+            downloader.metrics['resumed_bytes'] += self.resumed_bytes
+        self._save()
+
+    def pending_ranges(self):
+        return [(start, end) for start, end in self.chunks if start not in self.done]
+
+    def progress(self, count):
+        with self._lock:
+            self.downloaded += count
+            downloaded = self.downloaded
+        with self.downloader._metrics_lock:
+            self.downloader.metrics['bytes'] += count
+        if self.on_progress is not None:
+            self.on_progress(self.path, downloaded, self.size)
+
+    def mark_done(self, start):
+        with self._lock:
+            self.done.add(start)
+            self._save()
+        with self.downloader._metrics_lock:
+            self.downloader.metrics['chunks'] += 1
+
+    def _save(self):
+        # Атомарная замена: файл-спутник не останется записанным наполовину
+        self.state['done'] = sorted(self.done)
+        temporary = self.sidecar + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.sidecar)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def finish(self):
+        if self.size is None:
+            self.size = self.downloaded
+        os.remove(self.sidecar)
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """
+    Раздача файлов с поддержкой Range и ограничением скорости одного соединения
+
+    rate — байт/сек на соединение (None — без ограничения); имитирует
+    медленный канал, на котором параллельные части дают выигрыш.
+    """
+    protocol_version = 'HTTP/1.1'
+    rate = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return None
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        header = self.headers.get('Range')
+        if header and header.startswith('bytes='):
+            first, _, last = header[6:].partition('-')
+            start = int(first) if first else max(0, size - int(last))
+            end = min(int(last), size - 1) if first and last else size - 1
+            if start > end:
+                self.send_error(416)
+                return None
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end + 1 - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Last-Modified', self.date_time_string(int(os.path.getmtime(path))))
+        self.end_headers()
+        f = open(path, 'rb')
+        f.seek(start)
+        self._remaining = end + 1 - start
+        return f
+
+    def copyfile(self, source, outputfile):
+        while self._remaining > 0:
+            block = source.read(min(BLOCK_SIZE, self._remaining))
+            if not block:
+                break
+            try:
+                outputfile.write(block)
+            except (BrokenPipeError, ConnectionResetError):
+                return  # клиент прервал загрузку — для докачки это нормально
+            self._remaining -= len(block)
+            if self.rate:
+                time.sleep(len(block) / self.rate)
+
+
+def start_test_server(directory, rate=None, handler=RangeRequestHandler):
+    """Локальный HTTP-сервер с Range в отдельном потоке; вернуть (server, базовый URL)"""
+    handler = type('Handler', (handler,), {'rate': rate})
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0), lambda *args: handler(*args, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def benchmark():
+    """Один поток против частей; прерывание и докачка; сверка контрольных сумм"""
+    root = tempfile.mkdtemp(prefix='downloader-')
+    served = os.path.join(root, 'served')
+    target = os.path.join(root, 'target')
+    os.makedirs(served)
+    os.makedirs(target)
+    try:
+        source = os.path.join(served, 'file.bin')
+        with open(source, 'wb') as f:
+            f.write(os.urandom(32 * 1024 * 1024))
+        expected = _sha256(source)
+        server, base = start_test_server(served, rate=8 * 1024 * 1024)  # 8 МБ/сек на соединение
+        url = f'{base}/file.bin'
+        output = os.path.join(target, 'file.bin')
+
+        print("=== ЗАГРУЗКА 32 МБ, 8 МБ/сек НА СОЕДИНЕНИЕ ===")
+        for workers, chunk in ((1, 32 * 1024 * 1024), (4, 2 * 1024 * 1024), (8, 2 * 1024 * 1024)):
+            with Downloader(workers=workers, chunk_size=chunk) as downloader:
+                result = downloader.download(url, output)
+            assert _sha256(output) == expected
+            os.remove(output)
+            print(f"Потоков: {workers}: {result['elapsed']:.2f} сек, "
+                  f"{result['throughput'] / 2 ** 20:.1f} МБ/сек, частей: {result['chunks']}")
+
+        print("\n=== ПРЕРЫВАНИЕ И ДОКАЧКА ===")
+        stop = threading.Event()
+        threading.Timer(0.5, stop.set).start()
+        with Downloader(workers=4, chunk_size=1024 * 1024) as downloader:
+            try:
+                downloader.download(url, output, stop=stop)
+            except DownloadInterrupted:
+                with open(output + '.part.json', encoding='utf-8') as f:
+                    print(f"Прервано, готово частей: {len(json.load(f)['done'])} из 32")
+            result = downloader.download(url, output)
+        assert _sha256(output) == expected
+        print(f"Докачано: {(result['size'] - result['resumed_bytes']) / 2 ** 20:.0f} МБ "
+              f"(уже было {result['resumed_bytes'] / 2 ** 20:.0f} МБ), контрольная сумма совпадает")
+        server.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    benchmark()
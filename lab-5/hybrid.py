@@ -0,0 +1,190 @@
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import os
+import time
+from multiprocessing import shared_memory
+
+
+def cpu_bound(func):
+    """Пометить шаг как CPU-bound: HybridEngine выполнит его в пуле процессов"""
+    func.cpu_bound = True
+    return func
+
+
+class SharedPayload:
+    """Ссылка на данные в общей памяти: в процесс передаётся имя и размер, а не сами байты"""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+def _run_cpu_step(func, payload):
+    """Выполняется в процессе пула: подключить общую память и вызвать шаг с memoryview"""
+    if not isinstance(payload, SharedPayload):
+        return func(payload)
+    shm = shared_memory.SharedMemory(payload.name)
+    try:
+        view = shm.buf[:payload.size]
+        try:
+            return func(view)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+
+class HybridEngine:
+    """
+    Конвейер шагов на цикле событий asyncio с выносом вычислений в процессы
+
+    Шаги — корутинные функции (I/O, выполняются в цикле событий),
+    обычные функции (быстрые, выполняются на месте) и функции, помеченные
+    @cpu_bound, — они уходят в ProcessPoolExecutor через run_in_executor.
+    Одновременно в пуле не больше max_cpu_inflight задач: остальные ждут
+    в цикле событий, не занимая память очереди пула.
+
+    Байтовые данные от shm_threshold байт передаются в процесс через
+    общую память (SharedPayload), а не сериализуются pickle; шаг получает
+    memoryview. Результат CPU-шага должен быть небольшим.
+    """
+
+    def __init__(self, processes=None, max_cpu_inflight=None, concurrency=64, shm_threshold=256 * 1024):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_cpu_inflight = max_cpu_inflight or self.processes * 2
+        self.concurrency = concurrency
+        self.shm_threshold = shm_threshold
+        self._executor = None
+        self._cpu_slots = None
+        self.stats = {'cpu_steps': 0, 'shared_bytes': 0, 'pickled_payloads': 0}
+
+    async def __aenter__(self):
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes)
+        self._cpu_slots = asyncio.Semaphore(self.max_cpu_inflight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Ожидание процессов пула — в потоке, чтобы не останавливать цикл событий
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(executor.shutdown, wait=True))
+
+    async def run_step(self, step, value):
+        if asyncio.iscoroutinefunction(step):
+            return await step(value)
+        if not getattr(step, 'cpu_bound', False):
+            return step(value)
+
+        async with self._cpu_slots:
+            loop = asyncio.get_running_loop()
+            self.stats['cpu_steps'] += 1
+            share = (self.shm_threshold is not None and isinstance(value, (bytes, bytearray, memoryview))
+                     and len(value) >= self.shm_threshold)
+            if not share:
+                self.stats['pickled_payloads'] += 1
+                return await loop.run_in_executor(self._executor, _run_cpu_step, step, value)
+
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(value)))
+            try:
+                shm.buf[:len(value)] = value
+                self.stats['shared_bytes'] += len(value)
+                return await loop.run_in_executor(self._executor, _run_cpu_step, step,
+                                                  SharedPayload(shm.name, len(value)))
+            finally:
+                shm.close()
+                shm.unlink()
+
+    async def run(self, steps, items):
+        """Провести каждый элемент через все шаги; результаты в порядке элементов"""
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def process(item):
+            async with limit:
+                value = item
+                for step in steps:
+                    value = await self.run_step(step, value)
+                return value
+
+        return await asyncio.gather(*(process(item) for item in items))
+
+
+# --- нагрузка "загрузить, затем посчитать" ---
+
+LATENCY = 0.1
+PAYLOAD_SIZE = 2 * 1024 * 1024
+HASH_ROUNDS = 4
+_BLOCK = bytes(range(256)) * (PAYLOAD_SIZE // 256)
+
+
+async def fetch(item):
+    """Имитация загрузки по сети: ожидание и крупный ответ"""
+    await asyncio.sleep(LATENCY)
+    return item.to_bytes(8, 'little') + _BLOCK[8:]
+
+
+def fetch_blocking(item):
+    time.sleep(LATENCY)
+    return item.to_bytes(8, 'little') + _BLOCK[8:]
+
+
+@cpu_bound
+def digest(data):
+    """CPU-bound обработка ответа: многократное хеширование"""
+    result = b''
+    for _ in range(HASH_ROUNDS):
+        result = hashlib.sha256(bytes(data[:64]) + result).digest() + hashlib.sha256(data).digest()
+    return result.hex()[:16]
+
+
+def fetch_and_digest(item):
+    return digest(fetch_blocking(item))
+
+
+async def pure_async(items, concurrency):
+    """Всё в цикле событий: вычисления блокируют загрузки"""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def process(item):
+        async with limit:
+            return digest(await fetch(item))
+
+    return await asyncio.gather(*(process(item) for item in items))
+
+
+def pure_process(items, processes):
+    """Всё в процессах: каждый процесс и ждёт сети, и считает"""
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(fetch_and_digest, items))
+
+
+def benchmark(count=120, concurrency=16):
+    processes = os.cpu_count() or 1
+    items = list(range(count))
+    print(f"=== ЗАГРУЗКА ({LATENCY * 1000:.0f} мс, {PAYLOAD_SIZE // 2 ** 20} МБ) + ВЫЧИСЛЕНИЕ, "
+          f"{count} элементов, процессов: {processes} ===")
+
+    start = time.perf_counter()
+    expected = asyncio.run(pure_async(items, concurrency))
+    print(f"{'Только asyncio':34s} {time.perf_counter() - start:.2f} сек")
+
+    # Процессам даём столько же одновременных загрузок, сколько корутинам
+    start = time.perf_counter()
+    assert pure_process(items, concurrency) == expected
+    print(f"{f'Только процессы ({concurrency})':34s} {time.perf_counter() - start:.2f} сек")
+
+    for title, threshold in (("asyncio + процессы (pickle)", None),
+                             ("asyncio + процессы (общая память)", 256 * 1024)):
+        async def main():
+            async with HybridEngine(processes, concurrency=concurrency, shm_threshold=threshold) as engine:
+                return await engine.run([fetch, digest], items), engine.stats
+
+        start = time.perf_counter()
+        results, stats = asyncio.run(main())
+        assert results == expected
+        print(f"{title:34s} {time.perf_counter() - start:.2f} сек "
+              f"(через общую память {stats['shared_bytes'] / 2 ** 20:.0f} МБ)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,303 @@
+import collections
+import functools
+import hashlib
+import math
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+# Как хранится значение на диске
+KIND_INT = 1           # int как байты дополнительного кода — без pickle
+KIND_PICKLE = 2
+KIND_PICKLE_ZLIB = 3   # pickle, сжатый zlib (если это заметно уменьшает размер)
+
+COMPRESS_FROM = 4096
+
+
+def encode_value(value):
+    """Значение -> (вид, байты) для хранения на диске"""
+    if type(value) is int:
+        length = (value.bit_length() + 8) // 8  # +1 бит на знак
+        return KIND_INT, value.to_bytes(length, 'little', signed=True)
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_FROM:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data) * 0.9:
+            return KIND_PICKLE_ZLIB, packed
+    return KIND_PICKLE, data
+
+
+def decode_value(kind, data):
+    if kind == KIND_INT:
+        return int.from_bytes(data, 'little', signed=True)
+    if kind == KIND_PICKLE_ZLIB:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+# Итоги в memo_stats. Запись перезаписывается через UPSERT, а не INSERT OR
+# REPLACE: при REPLACE триггеры удаления не срабатывают
+_STATS_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS memo_stats_insert AFTER INSERT ON memo BEGIN
+           UPDATE memo_stats SET entries = entries + 1, bytes = bytes + new.size;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS memo_stats_delete AFTER DELETE ON memo BEGIN
+           UPDATE memo_stats SET entries = entries - 1, bytes = bytes - old.size;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS memo_stats_update AFTER UPDATE OF size ON memo BEGIN
+           UPDATE memo_stats SET bytes = bytes + new.size - old.size;
+       END''',
+)
+
+
+class PersistentMemo:
+    """
+    Мемоизация чистых функций между запусками и процессами
+
+    Два уровня: LRU в памяти процесса (max_entries записей) и база SQLite
+    на диске (WAL, ожидание блокировки busy_timeout), общая для всех
+    процессов. Когда данные на диске превышают max_bytes, вытесняются
+    записи, к которым дольше всего не обращались. Число записей и их
+    общий размер ведут триггеры в однострочной таблице memo_stats, так
+    что проверка размера не перебирает всю таблицу.
+
+    Объект можно передавать в процессы (multiprocessing.Pool, executor):
+    соединение с базой и кеш в памяти у каждого процесса свои.
+
+    Использование:
+        memo = PersistentMemo('memo_cache.db')
+        cached_factorial = memo(math.factorial)
+    """
+
+    def __init__(self, path='memo_cache.db', max_entries=256, max_bytes=64 * 1024 * 1024, busy_timeout=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.busy_timeout = busy_timeout
+        self._reset()
+
+    def _reset(self):
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes, 'busy_timeout': self.busy_timeout}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def __call__(self, func):
+        return MemoizedFunction(self, func)
+
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя — открываем своё
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Схема создаётся одной транзакцией: другой процесс не увидит
+            # memo_stats без триггеров или незаполненной
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS memo (
+                    key TEXT PRIMARY KEY,
+                    kind INTEGER NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memo_accessed ON memo(accessed)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS memo_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+            ''')
+            # Базы, созданные до memo_stats: итоги считаются один раз
+            conn.execute("INSERT OR IGNORE INTO memo_stats SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM memo")
+            for trigger in _STATS_TRIGGERS:
+                conn.execute(trigger)
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+            self._memory.clear()
+        return self._conn
+
+    @staticmethod
+    def make_key(func, args, kwargs):
+        # Модуль запущенного скрипта в дочерних процессах spawn называется
+        # '__mp_main__' — ключ должен совпадать с ключом родителя
+        module = '__main__' if func.__module__ == '__mp_main__' else func.__module__
+        raw = pickle.dumps((module, func.__qualname__, args, sorted(kwargs.items())),
+                           protocol=pickle.HIGHEST_PROTOCOL)
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key):
+        """Вернуть (найдено, значение)"""
+        with self._lock:
+            conn = self._connection()
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return True, self._memory[key]
+            row = conn.execute("SELECT kind, value FROM memo WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return False, None
+            conn.execute("UPDATE memo SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self._stats['disk_hits'] += 1
+            value = decode_value(*row)
+            self._remember(key, value)
+            return True, value
+
+    def set(self, key, value):
+        kind, data = encode_value(value)
+        with self._lock:
+            conn = self._connection()
+            self._remember(key, value)
+            if len(data) > self.max_bytes:
+                return  # больше всего хранилища — только в памяти
+            with conn:
+                conn.execute('''
+                    INSERT INTO memo (key, kind, value, size, accessed) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET kind = excluded.kind, value = excluded.value,
+                                                    size = excluded.size, accessed = excluded.accessed
+                ''', (key, kind, data, len(data), time.time()))
+                self._evict(conn)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, conn):
+        """Удалить самые давние по обращению записи, пока размер не станет <= max_bytes"""
+        total = conn.execute("SELECT bytes FROM memo_stats").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM memo ORDER BY accessed"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM memo WHERE key = ?", victims)
+        self._stats['evictions'] += len(victims)
+
+    def stats(self):
+        """Попадания этого процесса (в память, на диск), промахи и доля попаданий"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['memory_entries'] = len(self._memory)
+        return stats
+
+    def disk_stats(self):
+        """Записей и байт в общем хранилище"""
+        with self._lock:
+            entries, size = self._connection().execute("SELECT entries, bytes FROM memo_stats").fetchone()
+        return {'entries': entries, 'bytes': size}
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM memo")
+            self._memory.clear()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class MemoizedFunction:
+    """Функция с постоянным кешем; объект передаётся в процессы, как и сама функция"""
+
+    def __init__(self, memo, func):
+        self.memo = memo
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        key = self.memo.make_key(self.func, args, kwargs)
+        found, value = self.memo.get(key)
+        if not found:
+            value = self.func(*args, **kwargs)
+            self.memo.set(key, value)
+        return value
+
+    def __getstate__(self):
+        return {'memo': self.memo, 'func': self.func}
+
+    def __setstate__(self, state):
+        self.__init__(state['memo'], state['func'])
+
+
+def _slow_prime(n):
+    return n >= 2 and all(n % i for i in range(2, math.isqrt(n) + 1))
+
+
+def _worker_stats(cached, numbers):
+    results = [cached(n) for n in numbers]
+    return results, cached.memo.stats()
+
+
+def benchmark(path='memo_cache_demo.db'):
+    """Процессы пула вычисляют пересекающиеся наборы чисел с общим кешем на диске"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    memo = PersistentMemo(path, max_entries=64, max_bytes=1024 * 1024)
+    cached_prime = memo(_slow_prime)
+    cached_factorial = memo(math.factorial)
+
+    start = time.perf_counter()
+    value = cached_factorial(20000)
+    first = time.perf_counter() - start
+    memo._memory.clear()  # как после перезапуска: только диск
+    start = time.perf_counter()
+    assert cached_factorial(20000) == value
+    second = time.perf_counter() - start
+    kind, data = encode_value(value)
+    print(f"20000!: вычисление {first * 1000:.1f} мс, с диска {second * 1000:.1f} мс, "
+          f"{len(data)} байт на диске (pickle: {len(pickle.dumps(value))})")
+
+    numbers = [10_000_019 + 2 * i for i in range(40)]
+    batches = [numbers[i:i + 20] for i in range(0, len(numbers), 10)] * 2
+    with multiprocessing.Pool(4) as pool:
+        start = time.perf_counter()
+        outputs = pool.starmap(_worker_stats, [(cached_prime, batch) for batch in batches])
+        elapsed = time.perf_counter() - start
+    hits = sum(stats['memory_hits'] + stats['disk_hits'] for _, stats in outputs)
+    misses = sum(stats['misses'] for _, stats in outputs)
+    print(f"Пул из 4 процессов: {len(batches)} порций за {elapsed:.2f} сек, "
+          f"попаданий {hits}, промахов {misses} (доля попаданий {hits / (hits + misses):.0%})")
+    assert all(result == [_slow_prime(n) for n in batch] for (result, _), batch in zip(outputs, batches))
+
+    for n in range(2, 400):
+        cached_factorial(n * 50)  # заполнить хранилище сверх max_bytes
+    print(f"На диске после вытеснения: {memo.disk_stats()}, статистика процесса: {memo.stats()}")
+    memo.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,189 @@
+import concurrent.futures
+import queue
+import threading
+import time
+
+# Маркер конца потока данных между стадиями
+_END = object()
+
+
+class _Failure:
+    """Исключение из потока-поставщика, которое нужно пробросить потребителю"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _apply_chunk(func, chunk):
+    """Обработать порцию элементов (функция верхнего уровня — её можно передать в процесс)"""
+    return [func(item) for item in chunk]
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Stage:
+    """
+    Стадия конвейера
+
+    Параметры:
+    func (callable): функция обработки одного элемента
+    executor (str): 'thread' (I/O-bound) или 'process' (CPU-bound)
+    workers (int): размер пула стадии
+    chunksize (int): сколько элементов передаётся в пул за один раз
+    """
+
+    def __init__(self, func, executor='thread', workers=4, chunksize=1, name=None):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Неизвестный тип исполнителя: {executor}")
+        self.func = func
+        self.executor = executor
+        self.workers = workers
+        self.chunksize = chunksize
+        self.name = name or getattr(func, '__name__', 'stage')
+
+    def _make_executor(self):
+        if self.executor == 'process':
+            return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                     thread_name_prefix=self.name)
+
+
+class Pipeline:
+    """
+    Конвейер из стадий, соединённых генераторами
+
+    Между стадиями — ограниченная очередь (queue_size порций): если
+    следующая стадия не успевает, предыдущая перестаёт отправлять работу
+    в пул (обратное давление), и память не растёт.
+
+    ordered=True сохраняет порядок элементов, ordered=False отдаёт
+    результаты по мере готовности.
+    """
+
+    def __init__(self, stages, queue_size=16, ordered=True):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.ordered = ordered
+
+    def run(self, items):
+        """Запустить конвейер; возвращает генератор результатов последней стадии"""
+        stream = iter(items)
+        for stage in self.stages:
+            stream = self._run_stage(stage, stream)
+        return stream
+
+    def _run_stage(self, stage, upstream):
+        out = queue.Queue(maxsize=self.queue_size)
+        # В неупорядоченном режиме очередь заполняется по готовности,
+        # поэтому число порций "в работе" ограничиваем семафором
+        in_flight = threading.BoundedSemaphore(self.queue_size)
+        stop = threading.Event()
+        executor = stage._make_executor()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def acquire():
+            while not in_flight.acquire(timeout=0.1):
+                if stop.is_set():
+                    return False
+            return True
+
+        def feed():
+            try:
+                for chunk in _chunks(upstream, stage.chunksize):
+                    if self.ordered:
+                        if not put(executor.submit(_apply_chunk, stage.func, chunk)):
+                            return
+                    else:
+                        if not acquire():
+                            return
+                        executor.submit(_apply_chunk, stage.func, chunk).add_done_callback(put)
+                # Конец данных; в неупорядоченном режиме — после завершения всех порций
+                if not self.ordered:
+                    for _ in range(self.queue_size):
+                        if not acquire():
+                            return
+                put(_END)
+            except BaseException as error:
+                put(_Failure(error))
+            finally:
+                # Остановить предыдущую стадию, если эту закрыли раньше времени
+                if hasattr(upstream, 'close'):
+                    upstream.close()
+
+        feeder = threading.Thread(target=feed, name=f'{stage.name}-feeder', daemon=True)
+        feeder.start()
+
+        def results():
+            try:
+                while True:
+                    item = out.get()
+                    if item is _END:
+                        return
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    chunk = item.result()
+                    if not self.ordered:
+                        in_flight.release()
+                    yield from chunk
+            finally:
+                stop.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        return results()
+
+
+def run_pipeline(items, *stages, queue_size=16, ordered=True):
+    """Короткая запись: run_pipeline(data, Stage(f), Stage(g, 'process'))"""
+    return Pipeline(stages, queue_size, ordered).run(items)
+
+
+def io_step(item):
+    """I/O-bound шаг (имитация запроса, как process_data в task7)"""
+    time.sleep(0.01)
+    return item * 2
+
+
+def cpu_step(item):
+    """CPU-bound шаг"""
+    return sum(i * i for i in range(2000 + item % 100))
+
+
+def benchmark_pipeline():
+    """
+    Пропускная способность конвейера в зависимости от числа стадий и размера пулов
+    """
+    data = list(range(400))
+    print("=== ПРОПУСКНАЯ СПОСОБНОСТЬ КОНВЕЙЕРА ===")
+    for stage_count in (1, 2, 3):
+        for pool_size in (2, 4, 8):
+            stages = [Stage(io_step, 'thread', workers=pool_size, chunksize=4)
+                      for _ in range(stage_count - 1)]
+            stages.append(Stage(cpu_step, 'process', workers=pool_size, chunksize=25))
+            for ordered in (True, False):
+                start = time.perf_counter()
+                count = sum(1 for _ in Pipeline(stages, ordered=ordered).run(data))
+                elapsed = time.perf_counter() - start
+                mode = 'по порядку' if ordered else 'по готовности'
+                print(f"Стадий: {stage_count}, пул: {pool_size}, {mode:13s}: "
+                      f"{elapsed:.2f} сек, {count / elapsed:.0f} элементов/сек")
+
+
+if __name__ == "__main__":
+    benchmark_pipeline()
@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+import tracing
+
+
+class TaskHandle:
+    """Задача в планировщике: её можно отменить и дождаться результата (await handle)"""
+
+    def __init__(self, name, priority, coro_fn, args, deadline, submitted):
+        self.name = name
+        self.priority = priority
+        self.coro_fn = coro_fn
+        self.args = args
+        self.deadline = deadline
+        self.submitted = submitted
+        self.started = None
+        self.finished = None
+        self.status = 'pending'  # pending, running, done, failed, cancelled, expired
+        self.future = asyncio.get_running_loop().create_future()
+        self._task = None
+        self._trace_submitted = tracing.now()
+
+    def cancel(self):
+        """Отменить задачу: ожидающая не запустится, выполняющаяся будет прервана"""
+        if self.status == 'pending':
+            self.status = 'cancelled'
+            self.future.cancel()
+        elif self.status == 'running' and self._task is not None:
+            self._task.cancel()
+
+    @property
+    def wait_time(self):
+        return None if self.started is None else self.started - self.submitted
+
+    def __await__(self):
+        return self.future.__await__()
+
+
+class PriorityScheduler:
+    """
+    Асинхронный планировщик с приоритетной очередью на куче
+
+    - фиксированное число рабочих корутин (workers) берут задачи из кучи
+    - приоритет: 1 — высший; задачи можно добавлять в любой момент, и новая
+      срочная задача обгонит все ожидающие
+    - старение (aging): каждую секунду ожидания приоритет задачи улучшается
+      на aging, поэтому низкоприоритетные задачи не голодают
+    - deadline: срок (в секундах от добавления), к которому задача должна
+      завершиться; просроченные не запускаются, выполняющиеся прерываются
+    """
+
+    def __init__(self, workers=2, aging=0.0):
+        self.workers = workers
+        self.aging = aging
+        self._heap = []
+        self._counter = itertools.count()
+        self._available = None
+        self._workers = []
+        self._unfinished = 0
+        self._idle = None
+        self._closing = False
+        self.completed = []  # задачи в порядке завершения (включая отменённые и просроченные)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.join()
+        await self.close()
+
+    def start(self):
+        self._available = asyncio.Semaphore(0)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = [asyncio.create_task(self._worker(), name=f'worker-{i}')
+                         for i in range(self.workers)]
+
+    def submit(self, coro_fn, *args, priority=3, name=None, deadline=None):
+        """Добавить задачу; coro_fn(*args) должна вернуть корутину"""
+        now = time.monotonic()
+        handle = TaskHandle(name or getattr(coro_fn, '__name__', 'task'), priority, coro_fn, args,
+                            now + deadline if deadline is not None else None, now)
+        # Эффективный приоритет priority - aging * (t - submitted) упорядочивает
+        # задачи так же, как priority + aging * submitted: ключ не меняется со временем
+        key = priority + self.aging * now
+        heapq.heappush(self._heap, (key, next(self._counter), handle))
+        self._unfinished += 1
+        self._idle.clear()
+        self._available.release()
+        return handle
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            _, _, handle = heapq.heappop(self._heap)
+            try:
+                await self._run(handle)
+            finally:
+                self._unfinished -= 1
+                if self._unfinished == 0:
+                    self._idle.set()
+
+    async def _run(self, handle):
+        if handle.status == 'cancelled':
+            # Отменённые задачи не удаляются из кучи сразу, а пропускаются здесь
+            handle.finished = time.monotonic()
+            self.completed.append(handle)
+            return
+        handle.started = time.monotonic()
+        # Ожидание в очереди — на отдельной дорожке, выполнение — на дорожке рабочей корутины
+        tracing.record(handle.name, handle._trace_submitted, tracing.now(), 'queue',
+                       {'priority': handle.priority}, lane=f'очередь {handle.name}')
+        if handle.deadline is not None and handle.started >= handle.deadline:
+            handle.status = 'expired'
+            handle.future.set_exception(asyncio.TimeoutError(f"Срок задачи '{handle.name}' истёк до запуска"))
+            handle.finished = handle.started
+            self.completed.append(handle)
+            return
+
+        handle.status = 'running'
+        handle._task = asyncio.ensure_future(handle.coro_fn(*handle.args))
+        try:
+            with tracing.span(handle.name, 'run', priority=handle.priority):
+                if handle.deadline is not None:
+                    result = await asyncio.wait_for(handle._task, handle.deadline - handle.started)
+                else:
+                    result = await handle._task
+        except asyncio.TimeoutError as error:
+            handle.status = 'expired'
+            handle.future.set_exception(error)
+        except asyncio.CancelledError:
+            handle.status = 'cancelled'
+            handle.future.cancel()
+            if self._closing or not handle._task.cancelled():
+                raise  # отменили сам планировщик
+        except Exception as error:
+            handle.status = 'failed'
+            handle.future.set_exception(error)
+        else:
+            handle.status = 'done'
+            handle.future.set_result(result)
+        finally:
+            handle.finished = time.monotonic()
+            self.completed.append(handle)
+
+    async def join(self):
+        """Дождаться завершения всех добавленных задач"""
+        await self._idle.wait()
+
+    async def close(self):
+        """Остановить рабочие корутины; выполняющиеся и ожидающие в куче задачи отменяются"""
+        self._closing = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while self._heap:
+            _, _, handle = heapq.heappop(self._heap)
+            handle.cancel()
+            handle.finished = time.monotonic()
+            self.completed.append(handle)
+            self._unfinished -= 1
+        self._idle.set()
+
+    def priority_inversions(self):
+        """
+        Сколько задач запустилось, пока ждала задача с более высоким приоритетом
+
+        Без старения таких запусков нет; со старением это цена того, что
+        давно ждущие задачи обгоняют более срочные.
+        """
+        events = []
+        for handle in self.completed:
+            if handle.started is not None:
+                # При равном времени запуск раньше добавления: задача ещё не ждала
+                events.append((handle.submitted, 1, handle))
+                events.append((handle.started, 0, handle))
+        events.sort(key=lambda event: event[:2])
+        waiting = {}
+        inversions = 0
+        for _, is_submit, handle in events:
+            if is_submit:
+                waiting[handle.priority] = waiting.get(handle.priority, 0) + 1
+                continue
+            waiting[handle.priority] -= 1
+            if any(count for priority, count in waiting.items() if priority < handle.priority):
+                inversions += 1
+        return inversions
+
+    def metrics(self):
+        """Время ожидания по приоритетам, статусы, порядок завершения и инверсии приоритетов"""
+        by_priority = {}
+        statuses = {}
+        for handle in self.completed:
+            statuses[handle.status] = statuses.get(handle.status, 0) + 1
+            if handle.wait_time is not None:
+                by_priority.setdefault(handle.priority, []).append(handle.wait_time)
+        waits = {}
+        for priority, values in sorted(by_priority.items()):
+            values.sort()
+            waits[priority] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+            }
+        return {
+            'statuses': statuses,
+            'wait_time': waits,
+            'completion_order': [handle.name for handle in self.completed],
+            'priority_inversions': self.priority_inversions(),
+        }
+
+
+async def benchmark(tasks=5000, workers=8, aging=0.0):
+    """
+    Тысячи задач со случайными приоритетами, прибывающих порциями во время работы;
+    часть задач отменяется, часть — со сроком выполнения
+    """
+    async def job(duration):
+        await asyncio.sleep(duration)
+
+    rng = random.Random(7)
+    start = time.monotonic()
+    handles = []
+    async with PriorityScheduler(workers, aging) as scheduler:
+        for i in range(tasks):
+            handle = scheduler.submit(job, rng.uniform(0, 0.002), priority=rng.randint(1, 4), name=f'task-{i}',
+                                      deadline=0.5 if i % 10 == 0 else None)
+            handles.append(handle)
+            if i % 100 == 0:
+                handle.cancel()
+            if i % 250 == 0:
+                await asyncio.sleep(0.02)  # задачи прибывают порциями
+        await asyncio.gather(*(handle.future for handle in handles), return_exceptions=True)
+    elapsed = time.monotonic() - start
+
+    metrics = scheduler.metrics()
+    print(f"Задач: {tasks}, исполнителей: {workers}, старение: {aging}, время: {elapsed:.2f} сек")
+    print(f"  итоги: {metrics['statuses']}")
+    order = metrics['completion_order']
+    print(f"  порядок завершения: {', '.join(order[:8])}, ... {', '.join(order[-3:])}")
+    print(f"  инверсий приоритета: {metrics['priority_inversions']} из {len(order)} завершений")
+    for priority, stats in metrics['wait_time'].items():
+        print(f"  приоритет {priority}: ожидание среднее {stats['mean'] * 1000:7.1f} мс, "
+              f"p95 {stats['p95'] * 1000:7.1f} мс, макс {stats['max'] * 1000:7.1f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(aging=0.0))
+    asyncio.run(benchmark(aging=10.0))
@@ -1,5 +1,28 @@
 import time
 
+def calculate(operation, a, b):
+    """
+    Выполняет математическую операцию (без задержки и вывода)
+
+    Для массовых вычислений см. batch_calc.evaluate — та же логика над колонками.
+
+    Параметры:
+    operation (str): тип операции ('+', '-', '*', '/')
+    a, b (float): числа для операции
+
+    Возвращает:
+    float: результат операции или строку с описанием ошибки
+    """
+    if operation == '+':
+        return a + b
+    elif operation == '-':
+        return a - b
+    elif operation == '*':
+        return a * b
+    elif operation == '/':
+        return a / b if b != 0 else 'Ошибка: деление на ноль'
+    return 'Неизвестная операция'
+
 def sync_calculate(operation, a, b, delay):
     """
     Выполняет математическую операцию с задержкой
@@ -15,16 +38,7 @@ def sync_calculate(operation, a, b, delay):
     print(f"Начало операции {a} {operation} {b}")
     time.sleep(delay)  # Имитация долгого вычисления
     
-    if operation == '+':
-        result = a + b
-    elif operation == '-':
-        result = a - b
-    elif operation == '*':
-        result = a * b
-    elif operation == '/':
-        result = a / b if b != 0 else 'Ошибка: деление на ноль'
-    else:
-        result = 'Неизвестная операция'
+    result = calculate(operation, a, b)
     
     print(f"Конец операции {a} {operation} {b} = {result}")
     return result
@@ -54,4 +68,5 @@ def task1_sync_calculations():
     print(f"Общее время выполнения: {end_time - start_time:.2f} секунд")
     print(f"Результаты: {results}")
 
-task1_sync_calculations()
\ No newline at end of file
+if __name__ == "__main__":
+    task1_sync_calculations()
@@ -1,25 +1,27 @@
-import threading
+import os
+import shutil
+import tempfile
 import time
-import random
 
-def download_file(filename, size):
+import tracing
+from downloader import Downloader, start_test_server
+
+# Последний выведенный процент по каждому файлу
+reported = {}
+
+def report_progress(path, downloaded, total):
     """
-    Имитирует загрузку файла
-    
+    Выводит прогресс загрузки файла с шагом 20%
+
     Параметры:
-    filename (str): имя файла
-    size (int): размер файла в МБ
+    path (str): путь к файлу
+    downloaded (int): скачано байт
+    total (int): размер файла в байтах
     """
-    download_time = size * 0.1  # 0.1 сек на МБ
-    print(f"Начало загрузки {filename} ({size} МБ)")
-    
-    # Имитация прогресса загрузки
-    for i in range(5):
-        time.sleep(download_time / 5)
-        progress = (i + 1) * 20
-        print(f"{filename}: {progress}% загружено")
-    
-    print(f"Завершена загрузка {filename}")
+    progress = downloaded * 100 // total // 20 * 20
+    if progress > reported.get(path, 0):
+        reported[path] = progress
+        print(f"{os.path.basename(path)}: {progress}% загружено")
 
 def task2_threaded_downloader():
     """
@@ -42,18 +44,34 @@ def task2_threaded_downloader():
         ("archive.zip", 15)
     ]
     
-    start_time = time.time()
-    threads = []
-    
+    # Файлы раздаёт локальный HTTP-сервер со скоростью 10 МБ/сек на соединение
+    # (как 0.1 сек на МБ в исходной имитации)
+    root = tempfile.mkdtemp(prefix='task2-')
+    served = os.path.join(root, 'served')
+    os.makedirs(served)
     for filename, size in files:
-        thread = threading.Thread(target=download_file, args=(filename, size))
-        threads.append(thread)
-        thread.start()
-    
-    for thread in threads:
-        thread.join()
-    
-    end_time = time.time()
-    print(f"Общее время загрузки: {end_time - start_time:.2f} секунд")
+        with open(os.path.join(served, filename), 'wb') as f:
+            f.write(os.urandom(size * 1024 * 1024))
+    server, base = start_test_server(served, rate=10 * 1024 * 1024)
+
+    start_time = time.time()
+    try:
+        # Части всех файлов качаются вместе ограниченным пулом потоков
+        with Downloader(workers=8, chunk_size=2 * 1024 * 1024) as downloader:
+            for filename, size in files:
+                print(f"Начало загрузки {filename} ({size} МБ)")
+            results = downloader.download_many(
+                [(f"{base}/{filename}", os.path.join(root, filename)) for filename, _ in files],
+                on_progress=report_progress)
+            for path in results:
+                print(f"Завершена загрузка {os.path.basename(path)}")
+        # Выход из with дожидается завершения всех потоков загрузчика
+        end_time = time.time()
+        print(f"Общее время загрузки: {end_time - start_time:.2f} секунд")
+        print(f"Средняя скорость: {downloader.throughput() / 2 ** 20:.1f} МБ/сек, "
+              f"частей: {downloader.metrics['chunks']}, повторов: {downloader.metrics['retries']}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
 
-task2_threaded_downloader()
\ No newline at end of file
+tracing.run(task2_threaded_downloader)
@@ -1,7 +1,12 @@
-import multiprocessing
 import time
 import math
 
+import tracing
+
+from autoscaler import AutoscalingExecutor
+from memo_cache import PersistentMemo
+
+@tracing.traced
 def calculate_factorial(n):
     """
     Вычисляет факториал числа (CPU-intensive операция)
@@ -11,6 +16,7 @@ def calculate_factorial(n):
     print(f"Завершено вычисление факториала {n}!")
     return result
 
+@tracing.traced
 def calculate_prime(n):
     """
     Проверяет, является ли число простым
@@ -50,8 +56,10 @@ def task3_multiprocess_calculations():
     print("=== МНОГОПРОЦЕССНОЕ ВЫПОЛНЕНИЕ ===")
     start_time = time.time()
     
-    with multiprocessing.Pool(processes=len(calculations)) as pool:
-        results = pool.starmap(run_task, calculations)
+    # Число процессов подбирается по загрузке CPU и очереди, а не по числу задач
+    with AutoscalingExecutor('process') as executor:
+        funcs, args = zip(*calculations)
+        results = list(executor.map(run_task, funcs, args))
     
     end_time = time.time()
     multiprocess_time = end_time - start_time
@@ -74,8 +82,23 @@ def task3_multiprocess_calculations():
     else:
         print("Не удалось измерить время многопроцессного выполнения")
 
+    # Функции чистые: результат можно сохранить между запусками и процессами.
+    # При повторном запуске программы значения берутся из memo_cache.db
+    print("\n=== С ПОСТОЯННЫМ КЕШЕМ ===")
+    memo = PersistentMemo('memo_cache.db')
+    cached = [(memo(func), arg) for func, arg in calculations]
+    for attempt in ("первый проход", "повторный проход"):
+        start_time = time.perf_counter()
+        cached_results = [func(arg) for func, arg in cached]
+        assert cached_results == results
+        print(f"{attempt}: {(time.perf_counter() - start_time) * 1000:.1f} мс")
+    stats = memo.stats()
+    disk = memo.disk_stats()
+    print(f"Попаданий в кеш: {stats['hit_rate']:.0%} (память {stats['memory_hits']}, диск {stats['disk_hits']}, "
+          f"промахов {stats['misses']}); на диске {disk['entries']} значений, {disk['bytes'] / 1024:.0f} КБ")
+
 def run_task(func, arg):
     return func(arg)
 
 if __name__ == "__main__":
-    task3_multiprocess_calculations()
\ No newline at end of file
+    tracing.run(task3_multiprocess_calculations)
\ No newline at end of file
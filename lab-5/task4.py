@@ -1,23 +1,7 @@
 import asyncio
-import aiohttp
 import time
 
-async def fetch_url(session, url, name):
-    """
-    Асинхронно загружает веб-страницу
-    """
-    # Уберём лишние пробелы в URL (они есть в исходных данных)
-    url = url.strip()
-    print(f"Начало загрузки {name}")
-    
-    try:
-        async with session.get(url) as response:
-            content = await response.text()
-            print(f"Завершена загрузка {name}, статус: {response.status}")
-            return len(content)
-    except Exception as e:
-        print(f"Ошибка при загрузке {name}: {e}")
-        return 0
+from crawler import Crawler
 
 async def task4_async_scraper():
     """
@@ -44,9 +28,17 @@ async def task4_async_scraper():
     
     start_time = time.time()
     
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_url(session, url, name) for url, name in urls]
-        results = await asyncio.gather(*tasks)
+    # Ограничения соединений на хост, повторы с джиттером и таймауты — в Crawler;
+    # лишние пробелы в URL (они есть в исходных данных) он тоже убирает
+    crawler = Crawler(per_host=4, retries=2, timeout=10)
+    sizes = {}
+    async for result in crawler.crawl(urls):
+        if result['error']:
+            print(f"Ошибка при загрузке {result['name']}: {result['error']}")
+        else:
+            print(f"Завершена загрузка {result['name']}, статус: {result['status']}")
+        sizes[result['name']] = result['size']
+    results = [sizes[name] for _, name in urls]
     
     end_time = time.time()
     print(f"Общее время выполнения: {end_time - start_time:.2f} секунд")
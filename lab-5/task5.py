@@ -1,14 +1,17 @@
 import time
-import threading
-import multiprocessing
 import asyncio
-import requests
 
+import tracing
+
+from benchmark import Workload, conclusions, default_workloads, run_benchmark
+
+@tracing.traced
 def io_task(name, duration):
     """I/O-bound задача (имитация)"""
     time.sleep(duration)
     return f"{name} completed"
 
+@tracing.traced
 async def async_io_task(name, duration):
     """Асинхронная I/O-bound задача"""
     await asyncio.sleep(duration)
@@ -19,16 +22,6 @@ def run_io_task_sync(task):
     name, duration = task
     return io_task(name, duration)
 
-def run_io_task_thread(task):
-    """Обёртка для потоков"""
-    name, duration = task
-    return io_task(name, duration)
-
-def run_io_task_process(task):
-    """Обёртка для процессов"""
-    name, duration = task
-    return io_task(name, duration)
-
 async def run_async_task(task):
     """Обёртка для асинхронного выполнения"""
     name, duration = task
@@ -54,68 +47,31 @@ def task5_performance_comparison():
     - Сделать выводы о эффективности
     """
     tasks = [("Task1", 2), ("Task2", 3), ("Task3", 1), ("Task4", 2), ("Task5", 1)]
-    
-    # === 1. Синхронное выполнение (один поток) ===
-    print("=== СИНХРОННОЕ ВЫПОЛНЕНИЕ ===")
-    start = time.time()
-    sync_results = [run_io_task_sync(task) for task in tasks]
-    sync_time = time.time() - start
-    print(f"Результаты: {sync_results}")
-
-    # === 2. Многопоточное выполнение ===
-    print("\n=== МНОГОПОТОЧНОЕ ВЫПОЛНЕНИЕ ===")
-    start = time.time()
-    threads = []
-    results = [None] * len(tasks)
-    
-    def worker(idx, task):
-        results[idx] = run_io_task_thread(task)
-    
-    for i, task in enumerate(tasks):
-        thread = threading.Thread(target=worker, args=(i, task))
-        threads.append(thread)
-        thread.start()
-    
-    for thread in threads:
-        thread.join()
-    
-    thread_time = time.time() - start
-    print(f"Результаты: {results}")
 
-    # === 3. Многопроцессное выполнение ===
-    print("\n=== МНОГОПРОЦЕССНОЕ ВЫПОЛНЕНИЕ ===")
-    start = time.time()
-    with multiprocessing.Pool(processes=len(tasks)) as pool:
-        process_results = pool.map(run_io_task_process, tasks)
-    process_time = time.time() - start
-    print(f"Результаты: {process_results}")
+    # Каждый подход запускается несколько раз: одного замера time.time()
+    # недостаточно, чтобы отличить разницу от шума. Многопроцессный вариант
+    # замеряется и с фиксированным пулом, и с автомасштабированием
+    io_workload = Workload('io', run_io_task_sync, run_async_task, tasks)
+    cpu_workload = default_workloads(size=len(tasks))['cpu']
 
-    # === 4. Асинхронное выполнение ===
-    print("\n=== АСИНХРОННОЕ ВЫПОЛНЕНИЕ ===")
-    async def run_async():
-        tasks_async = [run_async_task(task) for task in tasks]
-        return await asyncio.gather(*tasks_async)
-    
-    start = time.time()
-    async_results = asyncio.run(run_async())
-    async_time = time.time() - start
-    print(f"Результаты: {async_results}")
+    print("=== ЗАМЕР ПОДХОДОВ (I/O-bound задачи) ===")
+    report = run_benchmark([io_workload], ('sync', 'thread', 'process', 'autoscale', 'async'),
+                           repeats=3, warmup=0, workers=len(tasks))
+    print("\n=== ДЛЯ СРАВНЕНИЯ: CPU-bound задачи ===")
+    report += run_benchmark([cpu_workload], ('sync', 'thread', 'process', 'async'),
+                            repeats=3, warmup=1, workers=len(tasks))
 
-    # === ВЫВОД РЕЗУЛЬТАТОВ ===
-    print("\n=== АНАЛИЗ РЕЗУЛЬТАТОВ ===")
-    print(f"Синхронное время: {sync_time:.2f} сек")
-    print(f"Многопоточное время: {thread_time:.2f} сек") 
-    print(f"Многопроцессное время: {process_time:.2f} сек")
-    print(f"Асинхронное время: {async_time:.2f} сек")
-    
-    # === ВЫВОДЫ ===
+    # === ВЫВОДЫ (по данным замера, а не заранее) ===
     print("\n=== ВЫВОДЫ ===")
-    print("Для I/O-bound задач синхронное выполнение самое медленное")
-    print("Многопоточность и асинхронность дают почти одинаковый результат")
-    print("Асинхронность наиболее эффективна по ресурсам (один поток, нет переключения контекста)")
-    print("Многопроцессность избыточна для I/O-bound задач (накладные расходы на IPC)")
-    print("\nНаилучший выбор для I/O-bound задач: асинхронное программирование")
+    for line in conclusions(report):
+        print(line)
+    io_rows = [row for row in report if row['workload'] == 'io']
+    best = min(io_rows, key=lambda row: row['mean'])
+    frugal = min((row for row in io_rows if row['mean'] <= best['ci95_high'] * 1.05),
+                 key=lambda row: (row['cpu_time'], row['peak_rss_mb']))
+    print(f"\nНаилучший выбор для I/O-bound задач: {frugal['mode']} "
+          f"({frugal['mean']:.2f} сек, CPU {frugal['cpu_time']:.2f} сек, память {frugal['peak_rss_mb']:.0f} МБ)")
 
 # Запуск задачи
 if __name__ == "__main__":
-    task5_performance_comparison()
\ No newline at end of file
+    tracing.run(task5_performance_comparison)
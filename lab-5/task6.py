@@ -2,7 +2,10 @@ import asyncio
 import time
 from datetime import datetime
 
-async def scheduled_task(name, priority, duration, semaphore):
+import tracing
+from scheduler import PriorityScheduler
+
+async def scheduled_task(name, priority, duration):
     """
     Задача с приоритетом и временем выполнения
     
@@ -10,13 +13,11 @@ async def scheduled_task(name, priority, duration, semaphore):
     name (str): название задачи
     priority (int): приоритет (1 - высший)
     duration (float): время выполнения
-    semaphore (asyncio.Semaphore): семафор для ограничения параллелизма
     """
-    async with semaphore:  # Ограничиваем одновременное выполнение
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Задача '{name}' (приоритет {priority}) начата")
-        await asyncio.sleep(duration)
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Задача '{name}' завершена")
-        return f"Результат {name}"
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Задача '{name}' (приоритет {priority}) начата")
+    await asyncio.sleep(duration)
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] Задача '{name}' завершена")
+    return f"Результат {name}"
 
 async def task6_async_scheduler():
     """
@@ -43,26 +44,25 @@ async def task6_async_scheduler():
         ("Фоновая задача", 4, 5)
     ]
     
-    # Сортируем задачи по приоритету (чем меньше число — тем выше приоритет)
-    sorted_tasks = sorted(tasks_with_priority, key=lambda x: x[1])
-    
-    # Ограничение: не более 2 задач одновременно
-    semaphore = asyncio.Semaphore(2)
-    
-    # Создаём асинхронные задачи в порядке приоритета
-    pending = [
-        asyncio.create_task(scheduled_task(name, prio, dur, semaphore))
-        for name, prio, dur in sorted_tasks
-    ]
-    
     results = []
     start_time = time.monotonic()
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Запуск планировщика...")
-    
-    while pending:
-        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-        for task in done:
-            result = await task
+
+    # Ограничение: не более 2 задач одновременно — два исполнителя у планировщика.
+    # Порядок запуска определяет куча по приоритету, а не порядок добавления
+    async with PriorityScheduler(workers=2) as scheduler:
+        handles = [
+            scheduler.submit(scheduled_task, name, prio, dur, priority=prio, name=name)
+            for name, prio, dur in tasks_with_priority
+        ]
+
+        # Задача, пришедшая позже, обгоняет все ожидающие с более низким приоритетом
+        await asyncio.sleep(1.5)
+        handles.append(scheduler.submit(scheduled_task, "Поздняя экстренная задача", 1, 1,
+                                        priority=1, name="Поздняя экстренная задача"))
+
+        for finished in asyncio.as_completed([handle.future for handle in handles]):
+            result = await finished
             results.append(result)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Получен результат: {result}")
 
@@ -72,4 +72,8 @@ async def task6_async_scheduler():
     for i, res in enumerate(results, 1):
         print(f"  {i}. {res}")
 
-asyncio.run(task6_async_scheduler())
\ No newline at end of file
+    print("Время ожидания в очереди:")
+    for handle in scheduler.completed:
+        print(f"  {handle.name} (приоритет {handle.priority}): {handle.wait_time:.2f} сек")
+
+tracing.run(lambda: asyncio.run(task6_async_scheduler()))
\ No newline at end of file
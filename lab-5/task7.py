@@ -2,6 +2,10 @@ import concurrent.futures
 import time
 import random
 
+import tracing
+from autoscaler import AutoscalingExecutor
+
+@tracing.traced
 def process_data(item):
     """
     Обрабатывает элемент данных (имитация CPU-bound операции)
@@ -44,8 +48,16 @@ def task7_thread_pool():
         results[pool_size] = elapsed
         print(f"Результаты: {processed}")
     
+    print("\n--- Пул с автоматическим размером ---")
+    start_time = time.time()
+    with AutoscalingExecutor('thread', max_workers=len(data)) as executor:
+        processed = list(executor.map(process_data, data))
+    results['авто'] = time.time() - start_time
+    print(f"Результаты: {processed}")
+    print(f"Решения автоскейлера: {[(old, new) for _, old, new, _ in executor.decisions]}")
+    
     print("\n=== СРАВНЕНИЕ ПРОИЗВОДИТЕЛЬНОСТИ ===")
     for pool_size, elapsed in results.items():
         print(f"Пул {pool_size} потоков: {elapsed:.2f} сек")
 
-task7_thread_pool()
\ No newline at end of file
+tracing.run(task7_thread_pool)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import time
+import unittest
+
+import aiohttp
+
+from crawler import Crawler, start_test_server
+
+
+def _expected(size):
+    return bytes(i % 251 for i in range(size))
+
+
+class CrawlerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.runner, self.base = await start_test_server()
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.runner.cleanup()
+
+    async def fetch(self, crawler, path):
+        chunks = []
+        result = await crawler.fetch(self.session, f'{self.base}{path}', on_chunk=chunks.append)
+        return result, b''.join(chunks)
+
+    async def test_retries_retryable_statuses_only(self):
+        crawler = Crawler(retries=3, backoff=0.01)
+        result, body = await self.fetch(crawler, '/flaky/a/2')
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(body, b'ok after 3 attempts')
+
+        result, _ = await self.fetch(crawler, '/status/404')
+        self.assertEqual((result['status'], result['attempts']), (404, 1))
+
+        result, _ = await self.fetch(crawler, '/status/500')
+        self.assertEqual(result['attempts'], 4)
+        self.assertEqual(result['error'], 'HTTP 500')
+        self.assertEqual(crawler.stats['errors'], 1)
+
+    async def test_partial_body_resumed_with_range(self):
+        crawler = Crawler(retries=3, backoff=0.01, chunk_size=1024)
+        result, body = await self.fetch(crawler, '/broken/r/100000/2')
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(result['status'], 206)
+        self.assertEqual(result['size'], 100000)
+        self.assertEqual(body, _expected(100000))
+        self.assertEqual(crawler.stats['bytes'], 100000)
+
+    async def test_partial_body_without_range_support(self):
+        crawler = Crawler(retries=3, backoff=0.01, chunk_size=1000)
+        result, body = await self.fetch(crawler, '/broken/n/100000/1?ranges=0')
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(result['size'], 100000)
+        self.assertEqual(body, _expected(100000))
+
+    async def test_partial_body_retries_exhausted(self):
+        crawler = Crawler(retries=1, backoff=0.01)
+        result, _ = await self.fetch(crawler, '/broken/x/100000/5')
+        self.assertEqual(result['attempts'], 2)
+        self.assertIsNotNone(result['error'])
+        self.assertEqual(result['size'], 0)
+
+    async def test_retry_after_capped_by_backoff(self):
+        crawler = Crawler(retries=2, backoff=0.05)
+        start = time.monotonic()
+        result, _ = await self.fetch(crawler, '/flaky/slow/2?retry_after=3600')
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['attempts'], 3)
+        # Каждый повтор ждёт не дольше backoff * 2^(retries - 1) = 0.1 сек
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    async def test_retry_after_honoured_below_cap(self):
+        crawler = Crawler(retries=1, backoff=2.0)
+        start = time.monotonic()
+        result, _ = await self.fetch(crawler, '/flaky/wait/1?retry_after=1')
+        self.assertIsNone(result['error'])
+        self.assertGreaterEqual(time.monotonic() - start, 1.0)
+
+    async def test_crawl_yields_every_url(self):
+        crawler = Crawler(concurrency=5, queue_size=3, backoff=0.01)
+        urls = [(f'{self.base}/bytes/{n}', str(n)) for n in range(0, 50000, 5000)]
+        results = [result async for result in crawler.crawl(urls)]
+        self.assertEqual(sorted(int(r['name']) for r in results), list(range(0, 50000, 5000)))
+        self.assertTrue(all(r['size'] == int(r['name']) for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from downloader import DownloadInterrupted, Downloader, RangeRequestHandler, start_test_server
+
+SIZE = 3 * 1024 * 1024 + 12345
+
+
+class BrokenHandler(RangeRequestHandler):
+    """Первые broken['left'] ответов на GET обрываются на середине тела"""
+    broken = {'left': 0}
+    lock = threading.Lock()
+
+    def copyfile(self, source, outputfile):
+        with self.lock:
+            broken = self.broken['left'] > 0
+            if broken:
+                self.broken['left'] -= 1
+        if broken:
+            self._remaining //= 2
+            self.close_connection = True
+        super().copyfile(source, outputfile)
+
+
+class NoRangeHandler(BrokenHandler):
+    """Сервер без поддержки Range: заголовок Range игнорируется"""
+
+    def send_header(self, keyword, value):
+        if keyword != 'Accept-Ranges':
+            super().send_header(keyword, value)
+
+    def send_head(self):
+        del self.headers['Range']
+        return super().send_head()
+
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='test-downloader-')
+        self.served = os.path.join(self.root, 'served')
+        os.makedirs(self.served)
+        self.data = os.urandom(SIZE)
+        with open(os.path.join(self.served, 'file.bin'), 'wb') as f:
+            f.write(self.data)
+        self.output = os.path.join(self.root, 'file.bin')
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(self.root)
+
+    def serve(self, handler=RangeRequestHandler, broken=0):
+        handler = type('Handler', (handler,), {'broken': {'left': broken}})
+        server, base = start_test_server(self.served, handler=handler)
+        self.servers.append(server)
+        return f'{base}/file.bin'
+
+    def assertDownloaded(self):
+        with open(self.output, 'rb') as f:
+            self.assertEqual(hashlib.sha256(f.read()).digest(), hashlib.sha256(self.data).digest())
+        self.assertFalse(os.path.exists(self.output + '.part.json'))
+
+    def download(self, url, downloader, **kwargs):
+        progress = []
+        result = downloader.download(url, self.output,
+                                     on_progress=lambda path, done, total: progress.append(done), **kwargs)
+        return result, progress
+
+    def test_concurrent_ranges(self):
+        url = self.serve()
+        with Downloader(workers=4, chunk_size=256 * 1024) as downloader:
+            result, progress = self.download(url, downloader)
+            self.assertEqual(downloader.metrics['bytes'], SIZE)
+            self.assertEqual(downloader.metrics['chunks'], 13)
+            self.assertLessEqual(downloader._pool(url).created, 4)
+        self.assertDownloaded()
+        self.assertEqual((result['size'], result['chunks'], result['resumed_bytes']), (SIZE, 13, 0))
+        self.assertEqual(max(progress), SIZE)
+
+    def test_retry_after_partial_range_counts_bytes_once(self):
+        url = self.serve(BrokenHandler, broken=3)
+        with Downloader(workers=2, chunk_size=1024 * 1024, retries=3) as downloader:
+            result, progress = self.download(url, downloader)
+            self.assertEqual(downloader.metrics['retries'], 3)
+            self.assertEqual(downloader.metrics['bytes'], SIZE)
+            self.assertAlmostEqual(downloader.throughput() * downloader.metrics['elapsed'], SIZE, delta=1)
+        self.assertDownloaded()
+        self.assertEqual(progress[-1], SIZE)
+        self.assertEqual(progress, sorted(progress))
+
+    def test_retry_without_range_support(self):
+        url = self.serve(NoRangeHandler, broken=1)
+        with Downloader(workers=4, chunk_size=256 * 1024) as downloader:
+            result, progress = self.download(url, downloader)
+            self.assertEqual(downloader.metrics['retries'], 1)
+            self.assertEqual(downloader.metrics['bytes'], SIZE)
+        self.assertDownloaded()
+        self.assertEqual(result['chunks'], 1)
+        self.assertEqual(progress[-1], SIZE)
+
+    def test_retries_exhausted(self):
+        url = self.serve(BrokenHandler, broken=100)
+        with Downloader(workers=1, chunk_size=SIZE, retries=1) as downloader:
+            with self.assertRaises(OSError):
+                downloader.download(url, self.output)
+            self.assertEqual(downloader.metrics['retries'], 1)
+
+    def test_resume_after_interrupt(self):
+        url = self.serve()
+        stop = threading.Event()
+
+        def on_progress(path, done, total):
+            if done >= SIZE // 2:
+                stop.set()
+
+        with Downloader(workers=1, chunk_size=256 * 1024) as downloader:
+            with self.assertRaises(DownloadInterrupted):
+                downloader.download(url, self.output, stop=stop, on_progress=on_progress)
+            self.assertTrue(os.path.exists(self.output + '.part.json'))
+
+        with Downloader(workers=4, chunk_size=256 * 1024) as downloader:
+            result, progress = self.download(url, downloader)
+            self.assertGreater(result['resumed_bytes'], 0)
+            self.assertEqual(downloader.metrics['bytes'], SIZE - result['resumed_bytes'])
+        self.assertDownloaded()
+        self.assertEqual(progress[-1], SIZE)
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'нужен /proc/self/fd')
+    def test_failed_probe_closes_opened_files(self):
+        url = self.serve()
+        before = len(os.listdir('/proc/self/fd'))
+        with Downloader(workers=2) as downloader:
+            with self.assertRaises(OSError):
+                downloader.download_many([(url, self.output), (url + '.missing', self.output + '.2')])
+        self.assertEqual(len(os.listdir('/proc/self/fd')), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+"""
+Трассировка выполнения потоков, процессов и корутин
+
+Каждый процесс пишет интервалы (span) в свой кольцевой буфер в памяти:
+collections.deque с maxlen — добавление без блокировок, старые записи
+вытесняются при переполнении. Дочерние процессы multiprocessing при
+завершении сбрасывают буфер в общий каталог, export() собирает все
+процессы в один файл формата Chrome trace events (chrome://tracing,
+https://ui.perfetto.dev).
+
+Буфер дочернего процесса сбрасывается только при его штатном выходе:
+пул multiprocessing.Pool нужно закрывать через close() и join(), а не
+terminate() (его вызывает выход из блока with). ProcessPoolExecutor
+завершает процессы штатно.
+
+    tracing.enable()
+    with tracing.span('загрузка', file=name):
+        ...
+    tracing.export('trace.json')
+
+Время берётся из time.perf_counter_ns: в Linux и macOS это монотонные
+часы, общие для всех процессов машины, поэтому интервалы разных
+процессов можно сравнивать.
+"""
+import argparse
+import asyncio
+import collections
+import functools
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from multiprocessing import util
+
+# Каталог сброса буферов: через окружение его видят и процессы, запущенные через spawn
+SPOOL_ENV = 'LAB5_TRACE_SPOOL'
+
+enabled = False
+_buffer = collections.deque(maxlen=100_000)
+_recorded = 0
+_spool = None
+
+
+def now():
+    return time.perf_counter_ns()
+
+
+def _task_name():
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # вне цикла событий
+        return None
+    return task.get_name() if task is not None else None
+
+
+def record(name, start, end, category='task', args=None, lane=None):
+    """
+    Записать готовый интервал [start, end] (в единицах now())
+
+    lane — имя отдельной дорожки вместо имени текущей задачи asyncio
+    (например, для ожидания в очереди, которое пересекается с работой).
+    """
+    global _recorded
+    if not enabled:
+        return
+    thread = threading.current_thread()
+    _buffer.append((name, category, start, end, os.getpid(), thread.ident, thread.name,
+                    lane or _task_name(), args))
+    _recorded += 1
+
+
+class span:
+    """
+    Интервал: контекстный менеджер (with span('имя'):) или декоратор
+    функции (@span('имя')), в том числе корутинной
+    """
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category='task', **args):
+        self.name = name
+        self.category = category
+        self.args = args or None
+
+    def __enter__(self):
+        self.start = now() if enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            record(self.name, self.start, now(), self.category, self.args)
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(self.name, self.category, **(self.args or {})):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(self.name, self.category, **(self.args or {})):
+                    return func(*args, **kwargs)
+        return wrapper
+
+
+def traced(func):
+    """Декоратор: интервал с именем функции и её аргументами"""
+    name = func.__qualname__
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not enabled:
+                return await func(*args, **kwargs)
+            with span(name, 'call', args=repr(args)[:200]):
+                return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with span(name, 'call', args=repr(args)[:200]):
+                return func(*args, **kwargs)
+    return wrapper
+
+
+def _flush():
+    """Сбросить буфер процесса в каталог сброса (вызывается при выходе дочернего процесса)"""
+    if _spool is None or not _buffer:
+        return
+    path = os.path.join(_spool, f'spans-{os.getpid()}-{now()}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'spans': list(_buffer), 'dropped': _recorded - len(_buffer)}, f)
+    _buffer.clear()
+
+
+def _activate(spool, capacity=None):
+    global enabled, _spool, _buffer, _recorded
+    if capacity is not None:
+        _buffer = collections.deque(maxlen=capacity)
+    _buffer.clear()
+    _recorded = 0
+    _spool = spool
+    enabled = True
+
+
+class _ForkHook:
+    """Вызывается multiprocessing в каждом дочернем процессе, созданном через fork"""
+
+    def __call__(self):
+        util.register_after_fork(self, _ForkHook._after_fork)
+
+    @staticmethod
+    def _after_fork(_):
+        # Буфер родителя скопирован в дочерний процесс — его интервалы не наши
+        if enabled:
+            _activate(_spool)
+            util.Finalize(None, _flush, exitpriority=100)
+
+
+def enable(capacity=100_000):
+    """Включить трассировку в этом процессе и во всех, что он запустит"""
+    spool = tempfile.mkdtemp(prefix='lab5-trace-')
+    os.environ[SPOOL_ENV] = spool
+    _activate(spool, capacity)
+
+
+def export(path):
+    """
+    Собрать интервалы всех процессов и записать Chrome trace JSON
+
+    Каждая корутина получает свою дорожку внутри потока: интервалы
+    разных задач asyncio в одном потоке пересекаются и на одной дорожке
+    не читались бы. Возвращает число интервалов.
+    """
+    global enabled
+    spans = list(_buffer)
+    dropped = _recorded - len(_buffer)
+    for spool_file in glob.glob(os.path.join(_spool, 'spans-*.json')):
+        with open(spool_file, encoding='utf-8') as f:
+            data = json.load(f)
+        spans.extend(tuple(item) for item in data['spans'])
+        dropped += data['dropped']
+    origin = min((item[2] for item in spans), default=0)
+
+    lanes = {}
+    events = []
+    for name, category, start, end, pid, tid, thread_name, task_name, args in spans:
+        key = (pid, tid, task_name)
+        if key not in lanes:
+            lanes[key] = len(lanes) + 1
+            label = thread_name if task_name is None else f'{thread_name} / {task_name}'
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lanes[key],
+                           'args': {'name': label}})
+        events.append({
+            'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': lanes[key],
+            'ts': (start - origin) / 1000, 'dur': (end - start) / 1000, 'args': args or {},
+        })
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                   'otherData': {'dropped_spans': dropped}}, f, ensure_ascii=False)
+
+    enabled = False
+    shutil.rmtree(_spool, ignore_errors=True)
+    os.environ.pop(SPOOL_ENV, None)
+    return len(spans)
+
+
+def run(main, argv=None):
+    """
+    Запустить main(); с флагом --trace ПУТЬ — с трассировкой и экспортом в файл
+
+    Для запуска заданий lab-5: tracing.run(task2_threaded_downloader)
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--trace', metavar='PATH', help="записать трассу в формате Chrome trace JSON")
+    args, _ = parser.parse_known_args(argv)
+    if args.trace:
+        enable()
+    try:
+        return main()
+    finally:
+        if args.trace:
+            count = export(args.trace)
+            print(f"Трасса ({count} интервалов) сохранена в {args.trace}")
+
+
+_fork_hook = _ForkHook()
+_fork_hook()
+
+# Процесс, запущенный через spawn/forkserver, включает трассировку сам
+if os.environ.get(SPOOL_ENV) and not enabled and os.path.isdir(os.environ[SPOOL_ENV]):
+    _activate(os.environ[SPOOL_ENV])
+    util.Finalize(None, _flush, exitpriority=100)
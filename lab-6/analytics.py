@@ -0,0 +1,297 @@
+import argparse
+import array
+import math
+import random
+import sqlite3
+import time
+from collections import Counter, defaultdict
+
+from main import LibraryManager
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy работаем на array.array и Counter
+    np = None
+
+
+def _month_label(month):
+    """Номер месяца (год * 12 + месяц - 1) -> 'YYYY-MM'"""
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+# Номер месяца даты в SQL: год * 12 + месяц - 1 (в скобках, чтобы подставлять в выражения)
+_SQL_MONTH = "(CAST(strftime('%Y', {0}) AS INTEGER) * 12 + CAST(strftime('%m', {0}) AS INTEGER) - 1)"
+
+
+class LibraryAnalytics:
+    """
+    Аналитика выдач по истории borrowings
+
+    Таблицы читаются не построчно через LibraryManager, а порциями
+    (fetchmany) в колонки: массивы NumPy или, если NumPy не установлен,
+    array.array. Агрегаты считаются над колонками целиком.
+    """
+
+    def __init__(self, db_path='library.db', chunk_size=100000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.loaded = False
+
+    def _read_columns(self, conn, query, count):
+        """Прочитать результат запроса в count целочисленных колонок"""
+        cursor = conn.execute(query)
+        chunks = [[] for _ in range(count)] if np is not None else [array.array('q') for _ in range(count)]
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            for column, values in zip(chunks, zip(*rows)):
+                if np is not None:
+                    column.append(np.array(values, dtype=np.int64))
+                else:
+                    column.extend(values)
+        if np is not None:
+            return [np.concatenate(c) if c else np.empty(0, dtype=np.int64) for c in chunks]
+        return chunks
+
+    def load(self):
+        """
+        Загрузить колонки выдач, книг и читателей
+
+        Таблицы жанров и когорт индексируются id и покрывают также id из
+        выдач: у удалённой книги или читателя там -1, такие выдачи
+        отбрасываются, как при JOIN.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            (self.book_id, self.reader_id, self.borrow_day,
+             self.return_day, self.borrow_month) = self._read_columns(conn, f'''
+                SELECT book_id, reader_id,
+                       CAST(julianday(borrow_date) AS INTEGER),
+                       COALESCE(CAST(julianday(return_date) AS INTEGER), -1),
+                       {_SQL_MONTH.format('borrow_date')}
+                FROM borrowings
+            ''', 5)
+
+            # Жанры кодируются числами, чтобы считать их как колонку
+            self.genres = []
+            genre_codes = {}
+            self.titles = {}
+            max_book = max(conn.execute("SELECT COALESCE(MAX(id), 0) FROM books").fetchone()[0],
+                           max(self.book_id) if len(self.book_id) else 0)
+            genre_of_book = [-1] * (max_book + 1)
+            for book_id, title, genre in conn.execute("SELECT id, title, genre FROM books"):
+                if genre not in genre_codes:
+                    genre_codes[genre] = len(self.genres)
+                    self.genres.append(genre)
+                genre_of_book[book_id] = genre_codes[genre]
+                self.titles[book_id] = title
+            self.genre_of_book = np.array(genre_of_book, dtype=np.int64) if np is not None \
+                else array.array('q', genre_of_book)
+
+            reader_ids, cohorts = self._read_columns(
+                conn, f"SELECT id, {_SQL_MONTH.format('registration_date')} FROM readers", 2)
+            max_reader = max(max(reader_ids) if len(reader_ids) else 0,
+                             max(self.reader_id) if len(self.reader_id) else 0)
+            cohort_of_reader = [-1] * (max_reader + 1)
+            for reader_id, cohort in zip(reader_ids, cohorts):
+                cohort_of_reader[reader_id] = cohort
+            self.cohort_of_reader = np.array(cohort_of_reader, dtype=np.int64) if np is not None \
+                else array.array('q', cohort_of_reader)
+
+        self.loaded = True
+        return self
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def most_borrowed_books(self, top=10):
+        """Самые популярные книги: [{'book_id', 'title', 'count'}]"""
+        self._ensure_loaded()
+        if np is not None:
+            counts = np.bincount(self.book_id, minlength=len(self.genre_of_book))
+            top_ids = np.argsort(counts, kind='stable')[::-1][:top]
+            pairs = [(int(i), int(counts[i])) for i in top_ids if counts[i] > 0]
+        else:
+            pairs = Counter(self.book_id).most_common(top)
+        return [{'book_id': b, 'title': self.titles.get(b), 'count': c} for b, c in pairs]
+
+    def genre_popularity(self):
+        """Число выдач по месяцам и жанрам: {'YYYY-MM': {жанр: count}}"""
+        self._ensure_loaded()
+        result = defaultdict(dict)
+        if np is not None and len(self.book_id):
+            genre = self.genre_of_book[self.book_id]
+            known = genre >= 0
+            months = self.borrow_month[known]
+            first = int(months.min()) if len(months) else 0
+            width = max(len(self.genres), 1)
+            counts = np.bincount((months - first) * width + genre[known])
+            for key in np.nonzero(counts)[0]:
+                month, code = divmod(int(key), width)
+                result[_month_label(first + month)][self.genres[code]] = int(counts[key])
+        elif np is None:
+            counts = Counter(zip(self.borrow_month, (self.genre_of_book[b] for b in self.book_id)))
+            for (month, code), count in counts.items():
+                if code < 0:
+                    continue
+                result[_month_label(month)][self.genres[code]] = count
+        return dict(result)
+
+    def reader_cohorts(self):
+        """
+        Активность когорт читателей
+
+        Когорта — месяц регистрации. Для каждой когорты список: сколько
+        разных читателей брали книги через 0, 1, 2... месяцев после регистрации.
+        """
+        self._ensure_loaded()
+        result = {}
+        if np is not None and len(self.reader_id):
+            cohort = self.cohort_of_reader[self.reader_id]
+            offset = self.borrow_month - cohort
+            valid = (cohort >= 0) & (offset >= 0)
+            # Уникальные пары (читатель, смещение), затем подсчёт по (когорта, смещение)
+            span = int(offset[valid].max()) + 1 if valid.any() else 1
+            pairs = np.unique(self.reader_id[valid] * span + offset[valid])
+            readers, offsets = np.divmod(pairs, span)
+            cohorts = self.cohort_of_reader[readers]
+            first = int(cohorts.min()) if len(cohorts) else 0
+            counts = np.bincount((cohorts - first) * span + offsets)
+            for key in np.nonzero(counts)[0]:
+                c, o = divmod(int(key), span)
+                row = result.setdefault(_month_label(first + c), [0] * span)
+                row[o] = int(counts[key])
+        elif np is None:
+            active = set()
+            for reader, month in zip(self.reader_id, self.borrow_month):
+                cohort = self.cohort_of_reader[reader]
+                if cohort >= 0 and month >= cohort:
+                    active.add((cohort, reader, month - cohort))
+            counts = Counter((cohort, offset) for cohort, _, offset in active)
+            span = max((o for _, o in counts), default=-1) + 1
+            for (cohort, offset), count in counts.items():
+                result.setdefault(_month_label(cohort), [0] * span)[offset] = count
+        return dict(sorted(result.items()))
+
+    def average_loan_duration(self):
+        """Средняя длительность завершённых выдач в днях (None, если возвратов нет)"""
+        self._ensure_loaded()
+        if np is not None:
+            returned = self.return_day >= 0
+            if not returned.any():
+                return None
+            return float((self.return_day[returned] - self.borrow_day[returned]).mean())
+        durations = [r - b for b, r in zip(self.borrow_day, self.return_day) if r >= 0]
+        return sum(durations) / len(durations) if durations else None
+
+
+# Эквивалентные запросы GROUP BY для сравнения
+SQL_QUERIES = {
+    'most_borrowed_books': '''
+        SELECT book_id, COUNT(*) AS c FROM borrowings
+        GROUP BY book_id ORDER BY c DESC LIMIT 10
+    ''',
+    'genre_popularity': '''
+        SELECT strftime('%Y-%m', br.borrow_date) AS month, b.genre, COUNT(*)
+        FROM borrowings br JOIN books b ON br.book_id = b.id
+        GROUP BY month, b.genre
+    ''',
+    'reader_cohorts': f'''
+        SELECT strftime('%Y-%m', r.registration_date) AS cohort,
+               {_SQL_MONTH.format('br.borrow_date')} - {_SQL_MONTH.format('r.registration_date')} AS offset,
+               COUNT(DISTINCT br.reader_id)
+        FROM borrowings br JOIN readers r ON br.reader_id = r.id
+        GROUP BY cohort, offset HAVING offset >= 0
+    ''',
+    'average_loan_duration': '''
+        SELECT AVG(julianday(return_date) - julianday(borrow_date))
+        FROM borrowings WHERE return_date IS NOT NULL
+    ''',
+}
+
+
+def _same_result(name, result, rows):
+    """Совпадает ли результат метода LibraryAnalytics с результатом запроса SQL_QUERIES[name]"""
+    if name == 'most_borrowed_books':
+        # При равном числе выдач порядок книг может отличаться — сравниваются сами числа
+        return [item['count'] for item in result] == [count for _, count in rows]
+    if name == 'genre_popularity':
+        expected = defaultdict(dict)
+        for month, genre, count in rows:
+            expected[month][genre] = count
+        return result == expected
+    if name == 'reader_cohorts':
+        expected = defaultdict(dict)
+        for cohort, offset, count in rows:
+            expected[cohort][offset] = count
+        return {cohort: {o: c for o, c in enumerate(row) if c} for cohort, row in result.items()} == expected
+    (average,), = rows
+    return result == average or (result is not None and average is not None and math.isclose(result, average))
+
+
+def generate(db_path, borrowings, books=10000, readers=50000, batch=100000):
+    """Заполнить базу синтетической историей выдач за 3 года"""
+    LibraryManager(db_path, cache_size=0)
+    genres = ['Роман', 'Антиутопия', 'Поэзия', 'Фантастика', 'Детектив', 'Нон-фикшн']
+    rng = random.Random(42)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executemany(
+            "INSERT INTO books (title, author, genre) VALUES (?, ?, ?)",
+            ((f"Книга {i}", f"Автор {i % 500}", rng.choice(genres)) for i in range(books))
+        )
+        conn.executemany(
+            "INSERT INTO readers (name, registration_date) VALUES (?, date('2023-01-01', ?))",
+            ((f"Читатель {i}", f"+{rng.randrange(365)} days") for i in range(readers))
+        )
+        for start in range(0, borrowings, batch):
+            rows = []
+            for _ in range(min(batch, borrowings - start)):
+                day = rng.randrange(365, 3 * 365)
+                returned = day + rng.randrange(1, 60) if rng.random() < 0.9 else None
+                rows.append((rng.randint(1, books), rng.randint(1, readers), day, returned))
+            conn.executemany('''
+                INSERT INTO borrowings (book_id, reader_id, borrow_date, return_date)
+                VALUES (?1, ?2, date('2023-01-01', '+' || ?3 || ' days'),
+                        CASE WHEN ?4 IS NULL THEN NULL ELSE date('2023-01-01', '+' || ?4 || ' days') END)
+            ''', rows)
+            conn.commit()
+
+
+def benchmark(db_path):
+    """Сравнить колоночную аналитику с эквивалентными запросами GROUP BY"""
+    backend = 'NumPy' if np is not None else 'array.array'
+    analytics = LibraryAnalytics(db_path)
+    start = time.perf_counter()
+    analytics.load()
+    load_time = time.perf_counter() - start
+    print(f"Загрузка колонок ({backend}): {load_time:.2f} сек, выдач: {len(analytics.book_id)}")
+
+    with sqlite3.connect(db_path) as conn:
+        for name, query in SQL_QUERIES.items():
+            start = time.perf_counter()
+            result = getattr(analytics, name)()
+            vector_time = time.perf_counter() - start
+            start = time.perf_counter()
+            rows = conn.execute(query).fetchall()
+            sql_time = time.perf_counter() - start
+            assert _same_result(name, result, rows), f"{name}: результаты колонок и SQL расходятся"
+            print(f"{name:25s} колонки: {vector_time:7.3f} сек | SQL GROUP BY: {sql_time:7.3f} сек")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Аналитика выдач и сравнение с SQL GROUP BY')
+    parser.add_argument('--db', default='analytics.db')
+    parser.add_argument('--generate', type=int, metavar='N',
+                        help='сначала сгенерировать N выдач (например, 10000000)')
+    args = parser.parse_args()
+
+    if args.generate:
+        print(f"Генерация {args.generate} выдач...")
+        generate(args.db, args.generate)
+    benchmark(args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import asyncio
+import copy
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import LibraryManager
+
+
+class AsyncLibraryManager:
+    """
+    Асинхронный фронтенд для LibraryManager
+
+    - Все записи идут через один поток-писатель (SQLite допускает
+      только одного писателя, так мы избегаем SQLITE_BUSY внутри процесса)
+    - Чтения выполняются в пуле потоков-читателей
+    - Одинаковые одновременные чтения объединяются в один запрос к БД;
+      каждый ожидающий получает свою копию результата
+    """
+
+    def __init__(self, db_path='library.db', readers=4, manager=None):
+        self.manager = manager if manager is not None else LibraryManager(db_path)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='library-reader')
+        # Чтения "в полёте": ключ запроса -> future с результатом
+        self._inflight = {}
+        self.coalesced_reads = 0
+
+    async def _write(self, method, *args):
+        # Чтение, начатое до записи или во время неё, может не увидеть её
+        # результат, поэтому читатели после записи не должны присоединяться
+        # к таким запросам: список сбрасывается и до, и после записи
+        self._inflight.clear()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._writer, getattr(self.manager, method), *args)
+        finally:
+            self._inflight.clear()
+
+    async def _read(self, method, *args):
+        key = (method, args)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced_reads += 1
+            # shield: отмена одного ожидающего не должна отменять запрос для остальных
+            return copy.deepcopy(await asyncio.shield(future))
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._readers, getattr(self.manager, method), *args)
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        # Копия и для первого: к этому же результату могут присоединиться другие
+        return copy.deepcopy(await asyncio.shield(future))
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def add_book(self, title, author, year=None, genre=None):
+        """Добавить новую книгу в библиотеку"""
+        return await self._write('add_book', title, author, year, genre)
+
+    async def add_reader(self, name, email=None, phone=None):
+        """Зарегистрировать нового читателя"""
+        return await self._write('add_reader', name, email, phone)
+
+    async def borrow_book(self, book_id, reader_id, loan_days=None):
+        """Выдать книгу читателю"""
+        return await self._write('borrow_book', book_id, reader_id, loan_days)
+
+    async def return_book(self, borrowing_id):
+        """Вернуть книгу в библиотеку"""
+        return await self._write('return_book', borrowing_id)
+
+    async def find_available_books(self, author=None, genre=None):
+        """Найти доступные книги (с фильтрацией по автору/жанру)"""
+        return await self._read('find_available_books', author, genre)
+
+    async def get_reader_borrowings(self, reader_id):
+        """Получить список текущих выдач читателя"""
+        return await self._read('get_reader_borrowings', reader_id)
+
+    async def get_overdue_borrowings(self, days=None):
+        """Найти просроченные выдачи (по сроку возврата или старше N дней)"""
+        return await self._read('get_overdue_borrowings', days)
+
+    def close(self):
+        """Дождаться завершения операций и остановить пулы потоков"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def benchmark(coroutines=5000, books=200, readers=50, write_ratio=0.1):
+    """
+    Замер задержки при тысячах одновременных корутин
+
+    Смесь чтений (поиск книг, выдачи читателя) и записей (выдача/возврат),
+    дополнительно измеряется задержка самого event loop.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        genres = ['Роман', 'Антиутопия', 'Поэзия', 'Фантастика']
+
+        # Отказы в выдаче занятых книг в бенчмарке ожидаемы — не логируем их
+        library_logger = logging.getLogger('library')
+        level = library_logger.level
+        library_logger.setLevel(logging.CRITICAL)
+        try:
+            async with AsyncLibraryManager(db_path) as library:
+                for i in range(books):
+                    await library.add_book(f"Книга {i}", f"Автор {i % 20}", 1900 + i % 120, genres[i % len(genres)])
+                for i in range(readers):
+                    await library.add_reader(f"Читатель {i}", f"reader{i}@mail.com")
+
+                latencies = []
+                loop_lag = []
+                done = asyncio.Event()
+
+                async def heartbeat():
+                    while not done.is_set():
+                        start = time.perf_counter()
+                        await asyncio.sleep(0.01)
+                        loop_lag.append(time.perf_counter() - start - 0.01)
+
+                async def one_request(i):
+                    start = time.perf_counter()
+                    if random.random() < write_ratio:
+                        await library.borrow_book(random.randint(1, books), random.randint(1, readers))
+                    elif i % 2:
+                        await library.find_available_books(genre=random.choice(genres))
+                    else:
+                        await library.get_reader_borrowings(random.randint(1, readers))
+                    latencies.append(time.perf_counter() - start)
+
+                monitor = asyncio.create_task(heartbeat())
+                start = time.perf_counter()
+                await asyncio.gather(*(one_request(i) for i in range(coroutines)))
+                total = time.perf_counter() - start
+                done.set()
+                await monitor
+        finally:
+            library_logger.setLevel(level)
+
+    print(f"Корутин: {coroutines}, общее время: {total:.2f} сек, "
+          f"пропускная способность: {coroutines / total:.0f} запросов/сек")
+    print(f"Задержка p50: {_percentile(latencies, 50) * 1000:.1f} мс, "
+          f"p95: {_percentile(latencies, 95) * 1000:.1f} мс, "
+          f"p99: {_percentile(latencies, 99) * 1000:.1f} мс")
+    print(f"Объединено чтений: {library.coalesced_reads}")
+    if loop_lag:
+        print(f"Максимальная задержка event loop: {max(loop_lag) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    for n in (1000, 5000, 10000):
+        asyncio.run(benchmark(coroutines=n))
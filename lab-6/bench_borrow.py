@@ -0,0 +1,113 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from main import LibraryManager
+
+
+def _worker(db_path, operations, books, readers, seed, results):
+    """Процесс-читатель: берёт случайные книги и иногда возвращает свои"""
+    logging.getLogger('library').setLevel(logging.CRITICAL)
+    rng = random.Random(seed)
+    library = LibraryManager(db_path)
+    borrowed = []
+    stats = {'borrowed': 0, 'rejected': 0, 'returned': 0}
+    for _ in range(operations):
+        if borrowed and rng.random() < 0.4:
+            if library.return_book(borrowed.pop(rng.randrange(len(borrowed)))):
+                stats['returned'] += 1
+        else:
+            borrowing_id = library.borrow_book(rng.randint(1, books), rng.randint(1, readers))
+            if borrowing_id is None:
+                stats['rejected'] += 1
+            else:
+                borrowed.append(borrowing_id)
+                stats['borrowed'] += 1
+    results.put(stats)
+
+
+def _prepare(db_path, books, readers):
+    logging.getLogger('library').setLevel(logging.CRITICAL)
+    LibraryManager(db_path)
+    with sqlite3.connect(db_path) as conn:
+        # WAL позволяет читателям не мешать писателю
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executemany(
+            "INSERT INTO books (title, author) VALUES (?, ?)",
+            [(f"Книга {i}", f"Автор {i % 50}") for i in range(books)]
+        )
+        conn.executemany(
+            "INSERT INTO readers (name, email) VALUES (?, ?)",
+            [(f"Читатель {i}", f"reader{i}@mail.com") for i in range(readers)]
+        )
+
+
+def _check_consistency(db_path):
+    """Нет двойных выдач, и статус книг совпадает с открытыми выдачами"""
+    with sqlite3.connect(db_path) as conn:
+        double_loans = conn.execute('''
+            SELECT book_id, COUNT(*) FROM borrowings
+            WHERE return_date IS NULL
+            GROUP BY book_id HAVING COUNT(*) > 1
+        ''').fetchall()
+        mismatched = conn.execute('''
+            SELECT COUNT(*) FROM books b
+            WHERE b.is_available != NOT EXISTS (
+                SELECT 1 FROM borrowings br WHERE br.book_id = b.id AND br.return_date IS NULL
+            )
+        ''').fetchone()[0]
+    return double_loans, mismatched
+
+
+def run(workers, operations=500, books=100, readers=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'contention.db')
+        _prepare(db_path, books, readers)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_worker, args=(db_path, operations, books, readers, seed, results))
+            for seed in range(workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        stats = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        double_loans, mismatched = _check_consistency(db_path)
+
+    total = {key: sum(s[key] for s in stats) for key in stats[0]}
+    total_ops = workers * operations
+    print(f"Процессов: {workers:2d} | операций: {total_ops:6d} | {elapsed:6.2f} сек | "
+          f"{total_ops / elapsed:8.0f} опер/сек | выдано: {total['borrowed']}, "
+          f"отказов: {total['rejected']}, возвращено: {total['returned']}")
+    if double_loans or mismatched:
+        raise AssertionError(f"Нарушена согласованность: двойные выдачи {double_loans}, "
+                             f"несовпадений статуса {mismatched}")
+    return total_ops / elapsed
+
+
+def main():
+    """Стресс-тест borrow_book/return_book в нескольких процессах над одной базой"""
+    parser = argparse.ArgumentParser(description='Бенчмарк конкурентной выдачи книг')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--operations', type=int, default=500, help='операций на процесс')
+    parser.add_argument('--books', type=int, default=100)
+    args = parser.parse_args()
+
+    print("=== КОНКУРЕНТНАЯ ВЫДАЧА КНИГ ===")
+    for workers in args.workers:
+        run(workers, args.operations, args.books)
+    print("Двойных выдач не обнаружено")
+
+
+if __name__ == "__main__":
+    main()
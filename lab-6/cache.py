@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def approx_size(value):
+    """Приблизительный размер значения в байтах (строки, числа, dict/list/tuple)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(item) for item in value)
+    return size
+
+
+class LookupCache:
+    """
+    LRU-кэш с временем жизни записей (TTL) и ограничением по памяти
+
+    Ключи — кортежи, первый элемент которых задаёт пространство имён
+    ('book', 'reader', 'available'), что позволяет точечно инвалидировать записи.
+
+    Каждая инвалидация увеличивает generation. Значение, прочитанное из
+    базы, сохраняется через set(key, value, generation) с номером,
+    взятым до чтения: если за время чтения что-то инвалидировали, set
+    ничего не делает, и устаревшие данные не попадают в кэш.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # ключ -> (значение, размер, время истечения)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """Вернуть (True, значение) при попадании или (False, None) при промахе"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, size, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, generation=None):
+        if not self.enabled:
+            return
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._data:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_where(self, namespace, predicate):
+        """Удалить записи пространства имён, для ключей которых predicate(key) истинен"""
+        with self._lock:
+            self.generation += 1
+            stale = [key for key in self._data if key[0] == namespace and predicate(key)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        """Статистика попаданий и текущий объём кэша"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._data),
+                'bytes': self._bytes,
+            }
@@ -1,11 +1,67 @@
+import functools
+import logging
+import random
 import sqlite3
+import threading
+import time
 from datetime import datetime, date
 from contextlib import contextmanager
 
+from cache import LookupCache
+
+logger = logging.getLogger('library')
+
+
+def _matches_filter(value, pattern):
+    """Может ли значение попасть под фильтр LIKE '%pattern%' (с запасом)"""
+    if not pattern:
+        return True
+    if '%' in pattern or '_' in pattern:
+        return True
+    return pattern.casefold() in (value or '').casefold()
+
+
+def _is_busy(error):
+    """SQLITE_BUSY / SQLITE_LOCKED: база занята другим писателем"""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _instrumented(method):
+    """Замер времени, ошибок и затронутых строк метода (если метрики включены)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, *args, **kwargs)
+        state = self._local
+        state.rows = 0
+        state.error = False
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        if isinstance(result, list):
+            state.rows += len(result)
+        self.metrics.record_call(method.__name__, time.perf_counter() - start,
+                                 state.rows, state.error)
+        return result
+    return wrapper
+
 
 class LibraryManager:
-    def __init__(self, db_path='library.db'):
+    def __init__(self, db_path='library.db', cache_size=1024, cache_ttl=60.0,
+                 cache_max_bytes=8 * 1024 * 1024, loan_days=30, metrics=None,
+                 busy_timeout=5.0, busy_retries=5, busy_backoff=0.01):
         self.db_path = db_path
+        # Ожидание блокировки внутри SQLite (сек) и повторы транзакции поверх него
+        self.busy_timeout = busy_timeout
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        # Срок выдачи по умолчанию, дней
+        self.loan_days = loan_days
+        # cache_size=0 отключает кэш
+        self.cache = LookupCache(cache_size, cache_ttl, cache_max_bytes)
+        # LibraryMetrics или None — тогда инструментирование полностью отключено
+        self.metrics = metrics
+        self._local = threading.local()
         self._init_db()
     
     def _init_db(self):
@@ -43,20 +99,49 @@ class LibraryManager:
                     book_id INTEGER NOT NULL,
                     reader_id INTEGER NOT NULL,
                     borrow_date DATE DEFAULT CURRENT_DATE,
+                    due_date DATE,
                     return_date DATE,
                     FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE,
                     FOREIGN KEY (reader_id) REFERENCES readers(id) ON DELETE CASCADE
                 )
             ''')
             
+            # Базы, созданные до появления срока возврата: добавляем колонку
+            # и заполняем её для уже существующих выдач
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(borrowings)")}
+            if 'due_date' not in columns:
+                cursor.execute("ALTER TABLE borrowings ADD COLUMN due_date DATE")
+                cursor.execute(
+                    "UPDATE borrowings SET due_date = date(borrow_date, ?) WHERE due_date IS NULL",
+                    (f'{self.loan_days:+d} days',)
+                )
+            
+            # Частичный индекс только по открытым выдачам: поиск просроченных
+            # идёт по диапазону due_date и не читает закрытые выдачи
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_borrowings_open_due
+                ON borrowings (due_date) WHERE return_date IS NULL
+            ''')
+            
             conn.commit()
     
     @contextmanager
-    def _get_connection(self):
-        """Контекстный менеджер для подключения к БД с настройкой row_factory"""
-        conn = sqlite3.connect(self.db_path)
+    def _get_connection(self, immediate=False):
+        """
+        Контекстный менеджер для подключения к БД с настройкой row_factory
+        
+        immediate=True открывает транзакцию BEGIN IMMEDIATE: блокировка записи
+        берётся сразу, и транзакция не может упасть с SQLITE_BUSY посередине
+        при попытке перейти от чтения к записи. Все методы, изменяющие
+        данные, открывают соединение именно так.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               isolation_level=None if immediate else '')
         conn.row_factory = sqlite3.Row
+        finish_trace = self.metrics.trace_connection(conn) if self.metrics is not None else None
         try:
+            if immediate:
+                conn.execute("BEGIN IMMEDIATE")
             yield conn
         except Exception:
             conn.rollback()
@@ -64,90 +149,175 @@ class LibraryManager:
         else:
             conn.commit()
         finally:
+            if finish_trace is not None:
+                finish_trace()
+                self._local.rows = getattr(self._local, 'rows', 0) + conn.total_changes
             conn.close()
     
+    def _write_transaction(self, work):
+        """
+        Выполнить work(conn) в транзакции BEGIN IMMEDIATE
+        
+        Если база занята дольше busy_timeout, транзакция повторяется
+        до busy_retries раз с экспоненциальной задержкой и случайным разбросом.
+        """
+        for attempt in range(self.busy_retries + 1):
+            try:
+                with self._get_connection(immediate=True) as conn:
+                    return work(conn)
+            except sqlite3.OperationalError as e:
+                if attempt == self.busy_retries or not _is_busy(e):
+                    raise
+                delay = self.busy_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.debug("База занята (%s), повтор через %.3f сек", e, delay)
+                time.sleep(delay)
+    
+    def _error(self, level, message, *args):
+        """Записать ошибку в лог и отметить вызов как неуспешный в метриках"""
+        logger.log(level, message, *args)
+        if self.metrics is not None:
+            self._local.error = True
+    
+    def _cached(self, key, load):
+        """Прочитать запись из кэша или загрузить её и сохранить (None не кэшируется).
+        Вызывающему отдаётся копия, чтобы его правки не попали в кэш"""
+        hit, value = self.cache.get(key)
+        if hit:
+            return dict(value)
+        generation = self.cache.generation
+        value = load()
+        if value is None:
+            return None
+        self.cache.set(key, value, generation)
+        return dict(value)
+    
+    def _invalidate_book(self, book):
+        """Сбросить запись о книге и списки доступных книг, в которые она может входить"""
+        self.cache.invalidate(('book', book['id']))
+        self.cache.invalidate_where(
+            'available',
+            lambda key: _matches_filter(book['author'], key[1]) and _matches_filter(book['genre'], key[2])
+        )
+    
+    def _load_row(self, query, params):
+        with self._get_connection() as conn:
+            row = conn.execute(query, params).fetchone()
+            return dict(row) if row else None
+    
+    def get_book(self, book_id):
+        """Получить запись о книге (через кэш)"""
+        return self._cached(
+            ('book', book_id),
+            lambda: self._load_row("SELECT * FROM books WHERE id = ?", (book_id,))
+        )
+    
+    def get_reader(self, reader_id):
+        """Получить запись о читателе (через кэш)"""
+        return self._cached(
+            ('reader', reader_id),
+            lambda: self._load_row("SELECT * FROM readers WHERE id = ?", (reader_id,))
+        )
+    
+    def cache_stats(self):
+        """Статистика кэша: попадания, промахи, доля попаданий, объём"""
+        return self.cache.stats()
+    
+    @_instrumented
     def add_book(self, title, author, year=None, genre=None):
         """Добавить новую книгу в библиотеку"""
         try:
-            with self._get_connection() as conn:
+            with self._get_connection(immediate=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO books (title, author, year, genre) 
                     VALUES (?, ?, ?, ?)
                 ''', (title, author, year, genre))
                 book_id = cursor.lastrowid
-                print(f"Книга '{title}' добавлена с ID {book_id}")
-                return book_id
+            self._invalidate_book({'id': book_id, 'author': author, 'genre': genre})
+            logger.info("Книга '%s' добавлена с ID %s", title, book_id)
+            return book_id
         except sqlite3.IntegrityError as e:
-            print(f"Ошибка при добавлении книги: {e}")
+            self._error(logging.WARNING, "Ошибка при добавлении книги: %s", e)
             return None
         except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
+            self._error(logging.ERROR, "Ошибка базы данных: %s", e)
             return None
     
+    @_instrumented
     def add_reader(self, name, email=None, phone=None):
         """Зарегистрировать нового читателя"""
         try:
-            with self._get_connection() as conn:
+            with self._get_connection(immediate=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO readers (name, email, phone) 
                     VALUES (?, ?, ?)
                 ''', (name, email, phone))
                 reader_id = cursor.lastrowid
-                print(f"Читатель '{name}' зарегистрирован с ID {reader_id}")
+                logger.info("Читатель '%s' зарегистрирован с ID %s", name, reader_id)
                 return reader_id
         except sqlite3.IntegrityError as e:
-            print(f"Ошибка: Email '{email}' уже зарегистрирован")
+            self._error(logging.WARNING, "Ошибка: Email '%s' уже зарегистрирован", email)
             return None
         except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
+            self._error(logging.ERROR, "Ошибка базы данных: %s", e)
             return None
     
-    def borrow_book(self, book_id, reader_id):
+    @_instrumented
+    def borrow_book(self, book_id, reader_id, loan_days=None):
         """
         Выдать книгу читателю
         - Проверить, что книга доступна
         - Обновить статус книги
-        - Создать запись о выдаче
+        - Создать запись о выдаче со сроком возврата
         - Использовать транзакцию
         """
+        if loan_days is None:
+            loan_days = self.loan_days
         try:
-            with self._get_connection() as conn:
+            # Название книги и имя читателя берём из кэша
+            book = self.get_book(book_id)
+            reader = self.get_reader(reader_id)
+            
+            if not book:
+                raise ValueError(f"Книга с ID {book_id} не найдена")
+            if not reader:
+                raise ValueError(f"Читатель с ID {reader_id} не найден")
+            
+            def borrow(conn):
                 cursor = conn.cursor()
                 
-                # Получаем информацию о книге и читателе
-                cursor.execute("SELECT title, is_available FROM books WHERE id = ?", (book_id,))
-                book = cursor.fetchone()
-                cursor.execute("SELECT name FROM readers WHERE id = ?", (reader_id,))
-                reader = cursor.fetchone()
-                
-                if not book:
-                    raise ValueError(f"Книга с ID {book_id} не найдена")
-                if not reader:
-                    raise ValueError(f"Читатель с ID {reader_id} не найден")
-                
-                if not book['is_available']:
+                # Проверка и смена статуса одним условным UPDATE: из двух
+                # конкурирующих выдач строку изменит только одна
+                cursor.execute(
+                    "UPDATE books SET is_available = 0 WHERE id = ? AND is_available = 1",
+                    (book_id,)
+                )
+                if cursor.rowcount == 0:
+                    # Книгу выдал другой процесс — кэш о ней устарел
+                    self._invalidate_book(book)
                     raise ValueError("Книга уже выдана другому читателю")
                 
-                # Выдаем книгу
-                cursor.execute("UPDATE books SET is_available = 0 WHERE id = ?", (book_id,))
                 cursor.execute(
-                    "INSERT INTO borrowings (book_id, reader_id) VALUES (?, ?)",
-                    (book_id, reader_id)
+                    "INSERT INTO borrowings (book_id, reader_id, due_date) VALUES (?, ?, date('now', ?))",
+                    (book_id, reader_id, f'{loan_days:+d} days')
                 )
-                
-                borrowing_id = cursor.lastrowid
-                print(f"Книга '{book['title']}' успешно выдана читателю {reader['name']}")
-                return borrowing_id
+                return cursor.lastrowid
+            
+            borrowing_id = self._write_transaction(borrow)
+            
+            self._invalidate_book(book)
+            logger.info("Книга '%s' успешно выдана читателю %s", book['title'], reader['name'])
+            return borrowing_id
                 
         except ValueError as e:
-            print(f"Ошибка: {e}")
+            self._error(logging.WARNING, "Ошибка: %s", e)
             return None
         except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
+            self._error(logging.ERROR, "Ошибка базы данных: %s", e)
             return None
     
+    @_instrumented
     def return_book(self, borrowing_id):
         """
         Вернуть книгу в библиотеку
@@ -156,12 +326,12 @@ class LibraryManager:
         - Использовать транзакцию
         """
         try:
-            with self._get_connection() as conn:
+            def give_back(conn):
                 cursor = conn.cursor()
                 
                 # Получаем информацию о выдаче
                 cursor.execute('''
-                    SELECT b.id as book_id, b.title, r.name as reader_name
+                    SELECT b.id as book_id, b.title, b.author, b.genre, r.name as reader_name
                     FROM borrowings br
                     JOIN books b ON br.book_id = b.id
                     JOIN readers r ON br.reader_id = r.id
@@ -178,19 +348,30 @@ class LibraryManager:
                     "UPDATE borrowings SET return_date = CURRENT_DATE WHERE id = ?",
                     (borrowing_id,)
                 )
-                
-                print(f"Книга '{borrowing['title']}' возвращена в библиотеку")
-                return True
+                return borrowing
+            
+            borrowing = self._write_transaction(give_back)
+            
+            self._invalidate_book({'id': borrowing['book_id'], 'author': borrowing['author'],
+                                   'genre': borrowing['genre']})
+            logger.info("Книга '%s' возвращена в библиотеку", borrowing['title'])
+            return True
                 
         except ValueError as e:
-            print(f"Ошибка: {e}")
+            self._error(logging.WARNING, "Ошибка: %s", e)
             return False
         except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
+            self._error(logging.ERROR, "Ошибка базы данных: %s", e)
             return False
     
+    @_instrumented
     def find_available_books(self, author=None, genre=None):
         """Найти доступные книги (с фильтрацией по автору/жанру)"""
+        key = ('available', author, genre)
+        hit, books = self.cache.get(key)
+        if hit:
+            return [dict(book) for book in books]
+        generation = self.cache.generation
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
@@ -207,12 +388,14 @@ class LibraryManager:
                 
                 cursor.execute(query, params)
                 books = [dict(row) for row in cursor.fetchall()]
-                return books
+            self.cache.set(key, books, generation)
+            return [dict(book) for book in books]
                 
         except sqlite3.Error as e:
-            print(f"Ошибка при поиске книг: {e}")
+            self._error(logging.ERROR, "Ошибка при поиске книг: %s", e)
             return []
     
+    @_instrumented
     def get_reader_borrowings(self, reader_id):
         """Получить список текущих выдач читателя"""
         try:
@@ -230,33 +413,48 @@ class LibraryManager:
                 return borrowings
                 
         except sqlite3.Error as e:
-            print(f"Ошибка при получении выдач читателя: {e}")
+            self._error(logging.ERROR, "Ошибка при получении выдач читателя: %s", e)
             return []
     
-    def get_overdue_borrowings(self, days=30):
-        """Найти просроченные выдачи (больше N дней)"""
+    @_instrumented
+    def get_overdue_borrowings(self, days=None):
+        """
+        Найти просроченные выдачи
+        
+        По умолчанию — выдачи с истёкшим сроком возврата (due_date).
+        Если задано days — выдачи старше N дней, как раньше.
+        """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT br.id, b.title, r.name as reader_name, br.borrow_date
+                # Условия без функций над колонками, чтобы работали индексы
+                if days is None:
+                    condition = "br.due_date < date('now')"
+                    params = ()
+                else:
+                    condition = "br.borrow_date < date('now', ?)"
+                    params = (f'-{days} days',)
+                
+                cursor.execute(f'''
+                    SELECT br.id, b.title, r.name as reader_name, br.borrow_date, br.due_date
                     FROM borrowings br
                     JOIN books b ON br.book_id = b.id
                     JOIN readers r ON br.reader_id = r.id
                     WHERE br.return_date IS NULL 
-                    AND date(br.borrow_date) < date('now', '-' || ? || ' days')
-                ''', (days,))
+                    AND {condition}
+                ''', params)
                 
                 overdue = [dict(row) for row in cursor.fetchall()]
                 return overdue
                 
         except sqlite3.Error as e:
-            print(f"Ошибка при поиске просроченных выдач: {e}")
+            self._error(logging.ERROR, "Ошибка при поиске просроченных выдач: %s", e)
             return []
 
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     library = LibraryManager()
     
     # Добавляем книги
@@ -0,0 +1,136 @@
+import json
+import re
+import threading
+import time
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Заменить литералы на '?' и схлопнуть пробелы, чтобы метки не плодились"""
+    return _SQL_SPACES.sub(' ', _SQL_LITERALS.sub('?', sql)).strip()
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """Пары (граница, накопленное число наблюдений), последняя граница — +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class LibraryMetrics:
+    """
+    Метрики LibraryManager: вызовы методов, задержки, ошибки,
+    время отдельных SQL-запросов и число затронутых строк
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}       # метод -> Histogram
+        self.errors = {}      # метод -> число ошибок
+        self.rows = {}        # метод -> затронуто строк
+        self.statements = {}  # нормализованный SQL -> Histogram
+
+    def record_call(self, method, seconds, rows=0, error=False):
+        with self._lock:
+            self.calls.setdefault(method, Histogram()).observe(seconds)
+            self.rows[method] = self.rows.get(method, 0) + rows
+            if error:
+                self.errors[method] = self.errors.get(method, 0) + 1
+
+    def record_statement(self, sql, seconds):
+        sql = normalize_sql(sql)
+        with self._lock:
+            self.statements.setdefault(sql, Histogram()).observe(seconds)
+
+    def trace_connection(self, conn):
+        """
+        Подключить set_trace_callback к соединению
+
+        sqlite3 сообщает только о начале запроса, поэтому запрос считается
+        выполняющимся до начала следующего или до закрытия соединения
+        (в это время входит и чтение результатов). Возвращает функцию,
+        которую нужно вызвать перед закрытием соединения.
+        """
+        pending = []
+
+        def finish():
+            if pending:
+                sql, started = pending.pop()
+                self.record_statement(sql, time.perf_counter() - started)
+
+        def callback(sql):
+            finish()
+            pending.append((sql, time.perf_counter()))
+
+        conn.set_trace_callback(callback)
+        return finish
+
+    def snapshot(self):
+        with self._lock:
+            def histogram(h):
+                return {
+                    'count': h.count,
+                    'sum': h.total,
+                    'buckets': {('+Inf' if b == float('inf') else str(b)): c for b, c in h.cumulative()},
+                }
+            return {
+                'methods': {
+                    name: dict(histogram(h), errors=self.errors.get(name, 0), rows=self.rows.get(name, 0))
+                    for name, h in self.calls.items()
+                },
+                'statements': {sql: histogram(h) for sql, h in self.statements.items()},
+            }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), ensure_ascii=False, **kwargs)
+
+    def to_prometheus(self):
+        """Снимок в текстовом формате Prometheus"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(name, labels, data):
+            for bound, count in data['buckets'].items():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {data["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {data["count"]}')
+
+        lines.append('# TYPE library_call_seconds histogram')
+        for method, data in snapshot['methods'].items():
+            histogram('library_call_seconds', f'method="{method}"', data)
+        lines.append('# TYPE library_call_errors_total counter')
+        for method, data in snapshot['methods'].items():
+            lines.append(f'library_call_errors_total{{method="{method}"}} {data["errors"]}')
+        lines.append('# TYPE library_rows_total counter')
+        for method, data in snapshot['methods'].items():
+            lines.append(f'library_rows_total{{method="{method}"}} {data["rows"]}')
+        lines.append('# TYPE library_sql_seconds histogram')
+        for sql, data in snapshot['statements'].items():
+            escaped = sql.replace('\\', '\\\\').replace('"', '\\"')
+            histogram('library_sql_seconds', f'statement="{escaped}"', data)
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,128 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import date
+
+from main import LibraryManager
+
+
+class OverdueReport:
+    """
+    Инкрементальный отчёт о просроченных выдачах
+
+    Каждый запуск обрабатывает только выдачи, срок возврата которых истёк
+    после предыдущего запуска: due_date в [дата прошлого запуска, as_of).
+    Дата последнего запуска хранится в таблице overdue_report_runs.
+    Строки читаются курсором порциями и сразу пишутся в вывод,
+    поэтому память не зависит от числа выдач.
+    """
+
+    def __init__(self, db_path='library.db', name='nightly', batch_size=10000):
+        self.db_path = db_path
+        self.name = name
+        self.batch_size = batch_size
+        # Создаёт таблицы и индекс по due_date, если их ещё нет
+        LibraryManager(db_path, cache_size=0)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS overdue_report_runs (
+                    name TEXT PRIMARY KEY,
+                    last_run_date DATE NOT NULL
+                )
+            ''')
+
+    def last_run_date(self):
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT last_run_date FROM overdue_report_runs WHERE name = ?", (self.name,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def iter_rows(self, as_of=None, full=False):
+        """
+        Выдачи, ставшие просроченными с прошлого запуска (или все при full=True)
+
+        Генератор: дата запуска сохраняется только после того, как все строки прочитаны.
+        """
+        as_of = as_of or date.today().isoformat()
+        since = None if full else self.last_run_date()
+
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            query = '''
+                SELECT br.id, br.book_id, b.title, br.reader_id, r.name AS reader_name,
+                       r.email, br.borrow_date, br.due_date
+                FROM borrowings br
+                JOIN books b ON br.book_id = b.id
+                JOIN readers r ON br.reader_id = r.id
+                WHERE br.return_date IS NULL AND br.due_date < ?
+            '''
+            params = [as_of]
+            if since:
+                query += " AND br.due_date >= ?"
+                params.append(since)
+            query += " ORDER BY br.due_date"
+
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+            conn.execute('''
+                INSERT INTO overdue_report_runs (name, last_run_date) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET last_run_date = MAX(last_run_date, excluded.last_run_date)
+            ''', (self.name, as_of))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def write(self, output, fmt='csv', as_of=None, full=False):
+        """Записать отчёт в файловый объект в формате csv или ndjson, вернуть число строк"""
+        count = 0
+        rows = self.iter_rows(as_of, full)
+        if fmt == 'csv':
+            writer = None
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(output, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+        elif fmt == 'ndjson':
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False))
+                output.write('\n')
+                count += 1
+        else:
+            raise ValueError(f"Неизвестный формат отчёта: {fmt}")
+        return count
+
+
+def main(argv=None):
+    """Запуск из cron: python overdue_report.py --format ndjson --output overdue.ndjson"""
+    parser = argparse.ArgumentParser(description='Отчёт о просроченных выдачах')
+    parser.add_argument('--db', default='library.db')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--output', help='файл отчёта (по умолчанию stdout)')
+    parser.add_argument('--as-of', help='дата отчёта YYYY-MM-DD (по умолчанию сегодня)')
+    parser.add_argument('--full', action='store_true', help='все просроченные, а не только новые')
+    parser.add_argument('--name', default='nightly', help='имя отчёта для хранения даты запуска')
+    args = parser.parse_args(argv)
+
+    report = OverdueReport(args.db, args.name)
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as output:
+            count = report.write(output, args.format, args.as_of, args.full)
+    else:
+        count = report.write(sys.stdout, args.format, args.as_of, args.full)
+    print(f"Просроченных выдач в отчёте: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
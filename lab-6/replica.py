@@ -0,0 +1,158 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from main import LibraryManager
+
+logger = logging.getLogger('library')
+
+
+class _TeeCursor:
+    """Курсор, повторяющий каждый запрос на копии в памяти; результат — с диска"""
+
+    def __init__(self, disk, memory):
+        self._disk = disk
+        self._memory = memory
+
+    def execute(self, sql, params=()):
+        self._disk.execute(sql, params)
+        self._memory.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        return self._disk.fetchone()
+
+    def fetchall(self):
+        return self._disk.fetchall()
+
+    @property
+    def lastrowid(self):
+        return self._disk.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._disk.rowcount
+
+
+class _TeeConnection:
+    def __init__(self, disk, memory):
+        self._disk = disk
+        self._memory = memory
+
+    def cursor(self):
+        return _TeeCursor(self._disk.cursor(), self._memory.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+
+class ReplicaLibraryManager(LibraryManager):
+    """
+    LibraryManager с копией базы в памяти для чтения
+
+    При запуске файл базы копируется в соединение ':memory:' через
+    backup API, и все чтения обслуживаются из памяти.
+
+    Режимы записи (durability):
+    - 'full' — запись идёт в файл в транзакции BEGIN IMMEDIATE и повторяется
+      на копии в памяти; копия в памяти фиксируется только после COMMIT на диске
+    - 'interval' — запись идёт только в память, на диск копия сбрасывается
+      через backup каждые sync_interval секунд и при close(); при сбое
+      теряются изменения за последний интервал
+
+    Предполагается, что в файл базы пишет только этот процесс: изменения
+    других процессов в копию в памяти не попадают (до refresh()).
+    """
+
+    def __init__(self, db_path='library.db', durability='full', sync_interval=5.0, **kwargs):
+        if durability not in ('full', 'interval'):
+            raise ValueError(f"Неизвестный режим durability: {durability}")
+        self.durability = durability
+        self.sync_interval = sync_interval
+        super().__init__(db_path, **kwargs)
+
+        self._lock = threading.RLock()
+        self._memory = sqlite3.connect(':memory:', check_same_thread=False)
+        self._memory.row_factory = sqlite3.Row
+        self._dirty = False
+        self.refresh()
+
+        self._stop = threading.Event()
+        self._sync_thread = None
+        if durability == 'interval':
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='library-replica-sync',
+                                                 daemon=True)
+            self._sync_thread.start()
+
+    def refresh(self):
+        """
+        Перечитать файл базы в память
+
+        В режиме 'interval' несохранённые изменения из памяти сначала
+        сбрасываются на диск (snapshot), иначе чтение файла их затёрло бы.
+        """
+        with self._lock:
+            if self._dirty:
+                self.snapshot()
+            with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as disk:
+                disk.backup(self._memory)
+            self.cache.clear()
+
+    def snapshot(self, path=None):
+        """Сохранить копию из памяти в файл (по умолчанию — в сам файл базы)"""
+        with self._lock:
+            target = sqlite3.connect(path or self.db_path, timeout=self.busy_timeout)
+            try:
+                self._memory.backup(target)
+            finally:
+                target.close()
+            if path is None:
+                self._dirty = False
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            if self._dirty:
+                try:
+                    self.snapshot()
+                except sqlite3.Error as e:
+                    logger.error("Не удалось сохранить копию базы на диск: %s", e)
+
+    def close(self):
+        """Остановить фоновое сохранение и сбросить несохранённые изменения на диск"""
+        if self._sync_thread is not None:
+            self._stop.set()
+            self._sync_thread.join()
+            self._sync_thread = None
+        with self._lock:
+            if self._dirty:
+                self.snapshot()
+            self._memory.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextmanager
+    def _get_connection(self, immediate=False):
+        with self._lock:
+            if not immediate:
+                # Чтение: только из памяти
+                yield self._memory
+                return
+
+            try:
+                if self.durability == 'interval':
+                    yield self._memory
+                else:
+                    with super()._get_connection(immediate=True) as disk:
+                        yield _TeeConnection(disk, self._memory)
+            except BaseException:
+                self._memory.rollback()
+                raise
+            else:
+                self._memory.commit()
+                if self.durability == 'interval':
+                    self._dirty = True
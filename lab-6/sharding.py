@@ -0,0 +1,223 @@
+import logging
+import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from main import LibraryManager
+
+logger = logging.getLogger('library')
+
+
+class ShardedLibraryManager:
+    """
+    LibraryManager, разделённый на несколько файлов SQLite
+
+    Книги и читатели привязаны к филиалу (branch), он хранится в колонке
+    branch. Филиал определяет шард: по явной таблице branches
+    {филиал: номер шарда} или, если филиала в ней нет, по хешу названия.
+    Выдавать книгу можно только читателю того же филиала, поэтому выдача
+    всегда целиком лежит в одном шарде, и филиал можно переносить целиком.
+
+    Глобальный ID записи = локальный ID * число шардов + номер шарда,
+    так что по ID сразу понятно, в какой шард идти.
+    """
+
+    def __init__(self, db_paths, branches=None, max_workers=None, **manager_kwargs):
+        self.db_paths = list(db_paths)
+        self.branches = dict(branches or {})
+        self.shards = [LibraryManager(path, **manager_kwargs) for path in self.db_paths]
+        for path in self.db_paths:
+            _ensure_branch_columns(path)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(self.shards),
+                                        thread_name_prefix='library-shard')
+
+    # --- маршрутизация ---
+
+    def shard_for_branch(self, branch):
+        if branch in self.branches:
+            return self.branches[branch]
+        # crc32 стабилен между запусками, в отличие от hash()
+        return zlib.crc32(str(branch).encode('utf-8')) % len(self.shards)
+
+    def _to_global(self, shard, local_id):
+        return None if local_id is None else local_id * len(self.shards) + shard
+
+    def _to_local(self, global_id):
+        """Глобальный ID -> (номер шарда, локальный ID)"""
+        local_id, shard = divmod(global_id, len(self.shards))
+        return shard, local_id
+
+    def _globalize(self, shard, rows, *fields):
+        for row in rows:
+            for field in fields:
+                row[field] = self._to_global(shard, row[field])
+        return rows
+
+    def _fan_out(self, method, *args):
+        """Вызвать метод на всех шардах параллельно; результаты по порядку шардов"""
+        futures = [self._pool.submit(getattr(shard, method), *args) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    # --- операции ---
+
+    def _insert(self, shard, table, values):
+        """Вставить строку вместе с филиалом одной транзакцией; локальный ID"""
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' * len(values))
+        return self.shards[shard]._write_transaction(
+            lambda conn: conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                                      tuple(values.values())).lastrowid
+        )
+
+    def add_book(self, title, author, year=None, genre=None, branch=None):
+        shard = self.shard_for_branch(branch)
+        try:
+            local_id = self._insert(shard, 'books', {'title': title, 'author': author, 'year': year,
+                                                     'genre': genre, 'branch': branch})
+        except sqlite3.Error as e:
+            logger.error("Ошибка базы данных: %s", e)
+            return None
+        self.shards[shard]._invalidate_book({'id': local_id, 'author': author, 'genre': genre})
+        logger.info("Книга '%s' добавлена в шард %s с ID %s", title, shard, local_id)
+        return self._to_global(shard, local_id)
+
+    def add_reader(self, name, email=None, phone=None, branch=None):
+        """
+        Зарегистрировать читателя в шарде филиала
+
+        Уникальность email проверяется только внутри шарда.
+        """
+        shard = self.shard_for_branch(branch)
+        try:
+            local_id = self._insert(shard, 'readers', {'name': name, 'email': email, 'phone': phone,
+                                                       'branch': branch})
+        except sqlite3.IntegrityError:
+            logger.warning("Ошибка: Email '%s' уже зарегистрирован", email)
+            return None
+        except sqlite3.Error as e:
+            logger.error("Ошибка базы данных: %s", e)
+            return None
+        logger.info("Читатель '%s' зарегистрирован в шарде %s с ID %s", name, shard, local_id)
+        return self._to_global(shard, local_id)
+
+    def borrow_book(self, book_id, reader_id, loan_days=None):
+        shard, local_book = self._to_local(book_id)
+        reader_shard, local_reader = self._to_local(reader_id)
+        # Читатель проверяется до передачи в шард книги: локальный ID читателя
+        # из другого шарда в шарде книги принадлежит постороннему человеку
+        reader = self.shards[reader_shard].get_reader(local_reader)
+        if reader is None:
+            logger.warning("Ошибка: читатель с ID %s не найден", reader_id)
+            return None
+        book = self.shards[shard].get_book(local_book)
+        if shard != reader_shard or (book and book['branch'] != reader['branch']):
+            logger.warning("Ошибка: книга %s и читатель %s относятся к разным филиалам", book_id, reader_id)
+            return None
+        return self._to_global(shard, self.shards[shard].borrow_book(local_book, local_reader, loan_days))
+
+    def return_book(self, borrowing_id):
+        shard, local_id = self._to_local(borrowing_id)
+        return self.shards[shard].return_book(local_id)
+
+    def get_book(self, book_id):
+        shard, local_id = self._to_local(book_id)
+        book = self.shards[shard].get_book(local_id)
+        return self._globalize(shard, [dict(book)], 'id')[0] if book else None
+
+    def find_available_books(self, author=None, genre=None):
+        """Глобальный поиск доступных книг: запрос во все шарды параллельно"""
+        books = []
+        for shard, rows in enumerate(self._fan_out('find_available_books', author, genre)):
+            books.extend(self._globalize(shard, rows, 'id'))
+        books.sort(key=lambda book: book['id'])
+        return books
+
+    def get_reader_borrowings(self, reader_id):
+        shard, local_id = self._to_local(reader_id)
+        return self._globalize(shard, self.shards[shard].get_reader_borrowings(local_id), 'id')
+
+    def get_overdue_borrowings(self, days=None):
+        overdue = []
+        for shard, rows in enumerate(self._fan_out('get_overdue_borrowings', days)):
+            overdue.extend(self._globalize(shard, rows, 'id'))
+        overdue.sort(key=lambda row: row['due_date'] or '')
+        return overdue
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def _ensure_branch_columns(db_path):
+    with sqlite3.connect(db_path) as conn:
+        for table in ('books', 'readers'):
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if 'branch' not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN branch TEXT")
+
+
+def rebalance(source, db_paths, branches=None, batch_size=10000):
+    """
+    Перенести данные в новую раскладку шардов
+
+    Каждая книга и читатель переезжают в шард своего филиала по новой
+    раскладке, выдачи — вместе с книгой. Новые базы не должны содержать данных.
+    Записи без филиала (branch IS NULL) остаются вместе под именем 'shard-N'.
+
+    Выдача, у которой книга и читатель оказываются в разных шардах, не
+    может быть перенесена без битой ссылки на читателя: тогда перенос
+    прерывается с ValueError, и в новые базы ничего не записывается.
+
+    Возвращает (новый менеджер, {таблица: {старый глобальный ID: новый глобальный ID}}).
+    """
+    target = ShardedLibraryManager(db_paths, branches)
+    id_map = {'books': {}, 'readers': {}, 'borrowings': {}}
+    targets = [sqlite3.connect(path) for path in target.db_paths]
+    tables = (
+        ('books', 'title, author, year, genre, is_available, branch'),
+        ('readers', 'name, email, phone, registration_date, branch'),
+    )
+    try:
+        for old_shard, manager in enumerate(source.shards):
+            with sqlite3.connect(manager.db_path) as src:
+                for table, columns in tables:
+                    placeholders = ', '.join('?' * len(columns.split(',')))
+                    cursor = src.execute(f"SELECT id, {columns} FROM {table} ORDER BY id")
+                    while rows := cursor.fetchmany(batch_size):
+                        for old_id, *values in rows:
+                            branch = values[-1] if values[-1] is not None else f'shard-{old_shard}'
+                            new_shard = target.shard_for_branch(branch)
+                            new_id = targets[new_shard].execute(
+                                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", values
+                            ).lastrowid
+                            id_map[table][source._to_global(old_shard, old_id)] = \
+                                target._to_global(new_shard, new_id)
+
+                cursor = src.execute('''
+                    SELECT id, book_id, reader_id, borrow_date, due_date, return_date
+                    FROM borrowings ORDER BY id
+                ''')
+                while rows := cursor.fetchmany(batch_size):
+                    for old_id, book_id, reader_id, *values in rows:
+                        new_shard, new_book = target._to_local(id_map['books'][source._to_global(old_shard, book_id)])
+                        reader_shard, new_reader = target._to_local(
+                            id_map['readers'][source._to_global(old_shard, reader_id)])
+                        if reader_shard != new_shard:
+                            raise ValueError(
+                                f"Выдача {source._to_global(old_shard, old_id)}: книга попадает в шард {new_shard}, "
+                                f"а читатель — в шард {reader_shard}; перенесите их филиалы вместе")
+                        new_id = targets[new_shard].execute('''
+                            INSERT INTO borrowings (book_id, reader_id, borrow_date, due_date, return_date)
+                            VALUES (?, ?, ?, ?, ?)
+                        ''', (new_book, new_reader, *values)).lastrowid
+                        id_map['borrowings'][source._to_global(old_shard, old_id)] = \
+                            target._to_global(new_shard, new_id)
+            logger.info("Шард %s перенесён", old_shard)
+        for conn in targets:
+            conn.commit()
+    except BaseException:
+        target.close()
+        raise
+    finally:
+        for conn in targets:
+            conn.close()
+    return target, id_map